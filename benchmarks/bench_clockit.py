@@ -0,0 +1,58 @@
+"""Compares the per call overhead of `clockit` recording into a
+`TimingRegistry` against the previous `clockit` that printed every call.
+
+    python benchmarks/bench_clockit.py [CALL_COUNT]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from pytest_baseline.helpers.timer import Timer, TimingRegistry, clockit
+
+
+def legacy_clockit(func):
+    """Previous `clockit` implementation, kept here for comparison"""
+    def new(*args, **kw):
+        t = Timer()
+        retval = func(*args, **kw)
+        t.stop()
+        print('%s in %s' % (func.__name__, t))
+        del t
+        return retval
+    return new
+
+
+def helper(a, b):
+    return a + b
+
+
+def ns_per_call(func, call_count):
+    start = time.perf_counter()
+    for index in range(call_count):
+        func(index, 1)
+    return (time.perf_counter() - start) / call_count * 1e9
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    registry = TimingRegistry()
+    print(f"{call_count:,} calls")
+    undecorated = ns_per_call(helper, call_count)
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = ns_per_call(legacy_clockit(helper), call_count)
+    registry_ns = ns_per_call(clockit(registry=registry)(helper), call_count)
+    for label, value in [
+        ("undecorated", undecorated),
+        ("printing clockit", legacy),
+        ("registry clockit", registry_ns),
+    ]:
+        print(
+            f"{label:>18}: {value:8.1f} ns/call "
+            f"(+{value - undecorated:8.1f} ns)"
+        )
+    print(registry.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Compares `generate_table_iter` against the previous implementation, which
+made a pass to size the columns and a second pass copying every row, and
+split every cell on new lines up to three times and rebuilt its format
+strings on every call: time and peak traced memory to render a table of
+ROW_COUNT rows, the streaming mode writing the rows of a generator straight to
+a file, ROW_COUNT / 20 small tables of the same layout as printed in
+reporting loops, and a 100 row preview (`max_rows`) of the whole table.
+
+    python benchmarks/bench_generate_table.py [ROW_COUNT]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Generator, Iterable, List, Union
+
+from pytest_baseline.helpers.printing import generate_table_iter
+
+
+def legacy_generate_table_iter(
+    headers: Union[List[str], None],
+    content: List[List[str]],
+    border: bool = True,
+    column_padding: int = 0,
+    justification: Union[str, List[str]] = "^",
+    use_checks: bool = False,
+    cell_limit: int = 500
+) -> Generator[str, None, None]:
+    """Previous `generate_table_iter` implementation, kept for comparison"""
+
+    # Check for No Headers
+    if headers is None:
+        include_header = False
+        headers = [
+            "" for _ in range(max([len(x) for x in content if x != "break"]))
+        ]
+    else:
+        include_header = True
+
+    # Check for correct Types
+    if not isinstance(headers, list):
+        raise TypeError(f"Headers must be of type 'list': {type(content)}")
+    if not isinstance(content, list):
+        raise TypeError(f"Content must be of type 'list': {type(content)}")
+
+    # Set Checks and Crosses if Desired
+    if use_checks:
+        check = "\u2713"
+        check_replace = ["y", "Y"]
+        cross = "\u2717"
+        cross_replace = ["n", "N"]
+        for l_index, line in enumerate(content):
+            if line != "break":
+                for i_index, item in enumerate(line):
+                    if item in check_replace:
+                        content[l_index][i_index] = check
+                    elif item in cross_replace:
+                        content[l_index][i_index] = cross
+
+    # Determine max Width of column
+    widths = [len(str(x)) for x in headers]
+    for line in content:
+        if not isinstance(line, (list, tuple)):
+            if line != "break":
+                raise TypeError("Content line item must be of type 'list'")
+        elif len(line) != len(headers):
+            raise TypeError(
+                "Content line item must be same length as 'headers'"
+            )
+        else:
+            # max_nl = max([len(str(x).split("\n")) for x in line])
+            for item_index, line_item in enumerate(line):
+                split_nl = str(line_item).split("\n")
+                max_width = max([
+                    len(x) if len(x) <= cell_limit else cell_limit
+                    for x in split_nl
+                ])
+                if (max_width > widths[item_index]):
+                    widths[item_index] = max_width
+
+    # Handle New Lines in cell
+    new_content = []
+    for line in content:
+        max_nl = max([len(str(x).split("\n")) for x in line])
+        if max_nl > 1:
+            split_cells = [str(x).split("\n") for x in line]
+            for nl_cnt in range(max_nl):
+                nl_line = []
+                for cell in split_cells:
+                    if len(cell) <= nl_cnt:
+                        nl_line.append("")
+                    else:
+                        nl_line.append(cell[nl_cnt][0:cell_limit])
+                new_content.append(nl_line)
+        else:
+            new_content.append(line)
+
+    # Add Column Padding to widths
+    widths = [x + column_padding for x in widths]
+
+    # Create justifications array
+    if isinstance(justification, list):
+        if len(justification) != len(headers):
+            raise TypeError(
+                "justification passed as array and must be "
+                f"same length as headers: headers length {len(headers)}, "
+                f"justification length {len(justification)}"
+            )
+        justifications = justification
+    else:
+        justifications = [justification for _ in headers]
+
+    # Generate Formatting strings
+    line_item = " | ".join(
+        [
+            f"{{x[{index}]:{justifications[index]}{width}}}"
+            for index, width in enumerate(widths)
+        ]
+    )
+    header_line = " | ".join(
+        [f"{{x[{index}]:^{width}}}" for index, width in enumerate(widths)]
+    )
+    divider = "-+-".join(
+        [f"{{x[{index}]:-^{width}}}" for index, width in enumerate(widths)]
+    )
+
+    # Add Border
+    if border:
+        line_item = "| " + line_item + " |"
+        header_line = "| " + header_line + " |"
+        divider = "|-" + divider + "-|"
+        border = "___".join(
+            [f"{{x[{index}]:_^{width}}}" for index, width in enumerate(widths)]
+        )
+        yield "._" + border.format(x=["" for x in headers]) + "_."
+        border = "_|_".join(
+            [f"{{x[{index}]:_^{width}}}" for index, width in enumerate(widths)]
+        )
+
+    # Add Header and Divider
+    if include_header:
+        yield header_line.format(x=[str(x) for x in headers])
+        yield divider.format(x=["" for x in headers])
+
+    # Add Line Items
+    for line in new_content:
+        if line == "break":
+            yield divider.format(x=["" for x in headers])
+        else:
+            yield line_item.format(x=[str(x) for x in line])
+
+    # Add Border
+    if border:
+        yield "|_" + border.format(x=["" for x in headers]) + "_|"
+
+
+def make_rows(row_count: int):
+    for index in range(row_count):
+        yield [
+            f"query {index % 97}", f"{index * 1.5e-6:.6f}s", index,
+            "multi\nline" if index % 1000 == 0 else "io"
+        ]
+
+
+def write_lines(lines) -> int:
+    line_count = 0
+    with open(os.devnull, "w") as output:
+        for line in lines:
+            output.write(line)
+            output.write("\n")
+            line_count += 1
+    return line_count
+
+
+def small_tables(generate, headers, rows):
+    for start in range(0, len(rows), 20):
+        yield from generate(headers, rows[start:start + 20])
+
+
+def measure(label: str, make_lines: Callable[[], Iterable[str]]) -> None:
+    """Times writing the lines to /dev/null, then measures the peak traced
+    memory of a second run
+    """
+    start = time.perf_counter()
+    line_count = write_lines(make_lines())
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    write_lines(make_lines())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{label:>30}: {seconds:6.3f}s {peak / 1024 ** 2:7.1f} MiB peak "
+        f"({line_count:,} lines)"
+    )
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    headers = ["Lap Name", "Lap Time", "Index", "Tag"]
+    rows = list(make_rows(row_count))
+    print(f"{row_count:,} rows")
+    assert (
+        list(legacy_generate_table_iter(headers, rows))
+        == list(generate_table_iter(headers, rows))
+    )
+    measure(
+        "previous, list",
+        lambda: legacy_generate_table_iter(headers, rows)
+    )
+    measure("single pass, list", lambda: generate_table_iter(headers, rows))
+    measure(
+        "previous, generator to list",
+        lambda: legacy_generate_table_iter(
+            headers, list(make_rows(row_count))
+        )
+    )
+    measure(
+        "streaming, generator",
+        lambda: generate_table_iter(
+            headers, make_rows(row_count), sample_size=1_000
+        )
+    )
+    measure(
+        "previous, 20 row tables",
+        lambda: small_tables(legacy_generate_table_iter, headers, rows)
+    )
+    measure(
+        "compiled, 20 row tables",
+        lambda: small_tables(generate_table_iter, headers, rows)
+    )
+    measure(
+        "100 row preview, list",
+        lambda: generate_table_iter(headers, rows, max_rows=100)
+    )
+    measure(
+        "100 row preview, generator",
+        lambda: generate_table_iter(
+            headers, make_rows(row_count), max_rows=100
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
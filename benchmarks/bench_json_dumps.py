@@ -0,0 +1,80 @@
+"""Compares `json_dumps` and `json_dump_iter` on the json module against the
+fastest installed backend: time to serialize a nested fixture dictionary of
+RECORD_COUNT records (about 250 bytes each with an object that is not JSON
+serializable), and peak traced memory to write it to a file in chunks.
+
+    python benchmarks/bench_json_dumps.py [RECORD_COUNT]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from pytest_baseline.helpers.json_backends import DEFAULT_JSON_BACKEND
+from pytest_baseline.helpers.printing import json_dump_iter, json_dumps
+
+
+def make_fixture(record_count: int):
+    return {
+        "environment": {"name": "staging", "region": "eu-west-1"},
+        "records": {
+            f"record-{index}": {
+                "id": index,
+                "name": f"customer {index}",
+                "email": f"customer.{index}@example.com",
+                "balance": index * 1.25,
+                "active": index % 3 != 0,
+                "tags": ["a", "b", f"t{index % 17}"],
+                "created": datetime(2020, 1, 1 + index % 28),
+                "address": {"city": "Springfield", "zip": f"{index:05d}"},
+            }
+            for index in range(record_count)
+        },
+    }
+
+
+def timed(label: str, function) -> None:
+    start = time.perf_counter()
+    size = function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{label:>30}: {seconds:6.3f}s {peak / 1024 ** 2:7.1f} MiB peak "
+        f"({size / 1024 ** 2:.1f} MiB)"
+    )
+
+
+def write_chunks(chunks) -> int:
+    size = 0
+    with open(os.devnull, "w") as output:
+        for chunk in chunks:
+            output.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    fixture = make_fixture(record_count)
+    print(f"{record_count:,} records, fast backend: {DEFAULT_JSON_BACKEND}")
+    assert (
+        json_dumps(fixture, backend="json")
+        == "".join(json_dump_iter(fixture))
+    )
+    for backend in sorted({"json", DEFAULT_JSON_BACKEND}, reverse=True):
+        timed(
+            f"json_dumps, {backend}",
+            lambda: len(json_dumps(fixture, backend=backend))
+        )
+        timed(
+            f"json_dump_iter, {backend}",
+            lambda: write_chunks(json_dump_iter(fixture, backend=backend))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compares memory use and `lap()` cost of the array backed `LapList` against
+the previous list of namedtuples implementation, and the cost of recording a
+lap in each: `LapList.add` against creating and appending the namedtuple.
+Times are the best of REPEAT runs.  `LapWatch.lap()` also looks up the
+calling thread or task and takes the LapWatch's lock so it can be shared by
+concurrent code, which the previous implementation did not, that is most of
+the difference between the two `lap()` times.
+
+    python benchmarks/bench_lap_list.py [LAP_COUNT]
+"""
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+from pytest_baseline.helpers.timer import Timer
+from pytest_baseline.helpers.timer_laps import LapList, LapWatch
+
+REPEAT = 5
+
+LegacyLap = namedtuple(
+    "TimerLap", ["total_time", "lap_time", "lap_name", "tag"]
+)
+
+
+class LegacyLapWatch(Timer):
+    """Previous `LapWatch.lap` implementation, kept here for comparison"""
+
+    def __init__(self):
+        self.laps = []
+        super().__init__()
+
+    def lap(self, lap_name=None, tag=None):
+        total = self.elapsed
+        if not lap_name:
+            lap_name = "Lap %d" % (len(self.laps) + 1)
+        if len(self.laps) == 0:
+            lap_time = total
+        else:
+            lap_time = total - self.laps[-1][0]
+        self.laps.append(LegacyLap(total, lap_time, lap_name, tag))
+        return lap_time
+
+
+def record_laps(watch_cls, lap_count):
+    watch = watch_cls()
+    for index in range(lap_count):
+        watch.lap("query", "odd" if index % 2 else "even")
+    return watch
+
+
+def best_of(function, *args):
+    """Returns the best time in seconds of REPEAT calls"""
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(watch_cls, lap_count):
+    """Returns bytes per lap and nanoseconds per `lap()` call, memory is
+    measured in a separate pass as tracemalloc slows down allocations
+    """
+    tracemalloc.start()
+    watch = record_laps(watch_cls, lap_count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del watch
+    elapsed = best_of(record_laps, watch_cls, lap_count)
+    return current / lap_count, elapsed / lap_count * 1e9
+
+
+def append_laps(lap_count):
+    laps = []
+    append = laps.append
+    for _ in range(lap_count):
+        append(LegacyLap(1.0, 0.5, "query", "even"))
+
+
+def add_laps(lap_count):
+    add = LapList().add
+    for _ in range(lap_count):
+        add(1.0, 0.5, "query", "even", None, "MainThread")
+
+
+def main():
+    lap_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{lap_count:,} laps, best of {REPEAT}")
+    for label, watch_cls in [
+        ("list of namedtuples", LegacyLapWatch),
+        ("array LapList", LapWatch),
+    ]:
+        bytes_per_lap, ns_per_lap = measure(watch_cls, lap_count)
+        print(
+            f"{label:>20}: {bytes_per_lap:7.1f} bytes/lap "
+            f"{ns_per_lap:7.1f} ns/lap()"
+        )
+    for label, function in [
+        ("namedtuple append", append_laps),
+        ("LapList.add", add_laps),
+    ]:
+        ns_per_lap = best_of(function, lap_count) / lap_count * 1e9
+        print(f"{label:>20}: {ns_per_lap:7.1f} ns/lap")
+
+
+if __name__ == "__main__":
+    main()
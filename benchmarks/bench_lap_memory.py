@@ -0,0 +1,56 @@
+"""Measures the overhead of recording memory per lap with tracemalloc:
+the cost of a `lap()` call and the slowdown of an allocation heavy workload
+between laps, without memory tracking, with deltas only and with the
+allocation site snapshots.
+
+    python benchmarks/bench_lap_memory.py [LAP_COUNT] [LIVE_OBJECTS]
+"""
+import sys
+import time
+
+from pytest_baseline.helpers.lap_memory import LapMemoryTracker
+from pytest_baseline.helpers.timer_laps import LapWatch
+
+
+def workload():
+    """Allocates and frees a few thousand small objects"""
+    return len([{"index": x, "name": str(x)} for x in range(1_000)])
+
+
+def run(tracker, lap_count, with_workload):
+    watch = LapWatch()
+    if tracker is not None:
+        watch.attach_memory_tracker(tracker)
+    start = time.perf_counter()
+    for _ in range(lap_count):
+        if with_workload:
+            workload()
+        watch.lap("step")
+    elapsed = time.perf_counter() - start
+    watch.close_memory_tracker()
+    return elapsed / lap_count * 1e6
+
+
+def main():
+    lap_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    live_objects = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    # Snapshots cost grows with the number of live allocations
+    live = [str(x) for x in range(live_objects)]
+    print(f"{lap_count:,} laps, {len(live):,} live objects")
+    for label, make_tracker in [
+        ("no memory tracking", lambda: None),
+        ("deltas only", lambda: LapMemoryTracker(top_laps=0)),
+        ("deltas and sites", lambda: LapMemoryTracker(top_laps=3)),
+    ]:
+        # snapshots are slow, use fewer laps to keep the run short
+        laps = lap_count // 20 if "sites" in label else lap_count
+        empty = run(make_tracker(), laps, with_workload=False)
+        loaded = run(make_tracker(), laps, with_workload=True)
+        print(
+            f"{label:>20}: {empty:9.1f} us/lap() {loaded:9.1f} us/lap with "
+            "workload"
+        )
+
+
+if __name__ == "__main__":
+    main()
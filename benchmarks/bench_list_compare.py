@@ -0,0 +1,96 @@
+"""Compares `list_compare_printout` against the previous implementation,
+which checked `item in sub_list` against the plain lists for every item of
+the union: time to compare two lists of LEGACY_COUNT primary keys, then the
+new implementation alone on KEY_COUNT keys, the full table streamed to a file
+and the differences only.
+
+    python benchmarks/bench_list_compare.py [KEY_COUNT] [LEGACY_COUNT]
+"""
+import os
+import sys
+import time
+from typing import List
+
+from pytest_baseline.helpers.printing import (generate_table,
+                                              list_compare_iter,
+                                              list_compare_printout)
+
+
+def legacy_list_compare_printout(
+    list_names: List[str],
+    list_1: List[str],
+    list_2: List[str],
+    *args
+) -> str:
+    """Previous `list_compare_printout` implementation, kept for comparison"""
+    full_set = set()
+    full_set.update(list_1)
+    full_set.update(list_2)
+    for extra_list in args:
+        full_set.update(extra_list)
+    list_o_lists = [list_1, list_2, *args]
+    output = []
+    for item in sorted(list(full_set)):
+        line = []
+        for sub_list in list_o_lists:
+            if item in sub_list:
+                line.append(item)
+            else:
+                line.append("--")
+        output.append(line)
+    return generate_table(list_names, output)
+
+
+def make_keys(key_count: int):
+    """Primary keys of two environments, one in a thousand differs"""
+    dev = [f"key-{x:08d}" for x in range(key_count)]
+    prod = [
+        f"key-{x:08d}" if x % 1000 else f"new-{x:08d}"
+        for x in range(key_count)
+    ]
+    return dev, prod
+
+
+def timed(label: str, function) -> None:
+    start = time.perf_counter()
+    function()
+    print(f"{label:>32}: {time.perf_counter() - start:7.3f}s")
+
+
+def stream_to_devnull(lines) -> None:
+    with open(os.devnull, "w") as output:
+        for line in lines:
+            output.write(line)
+            output.write("\n")
+
+
+def main():
+    key_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    legacy_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    names = ["Dev", "Prod"]
+
+    dev, prod = make_keys(legacy_count)
+    print(f"{legacy_count:,} keys")
+    assert (
+        legacy_list_compare_printout(names, dev, prod)
+        == list_compare_printout(names, dev, prod)
+    )
+    timed("previous", lambda: legacy_list_compare_printout(names, dev, prod))
+    timed("set based", lambda: list_compare_printout(names, dev, prod))
+
+    dev, prod = make_keys(key_count)
+    print(f"{key_count:,} keys")
+    timed(
+        "set based, streamed",
+        lambda: stream_to_devnull(list_compare_iter(names, dev, prod))
+    )
+    timed(
+        "set based, differences only",
+        lambda: list_compare_printout(
+            names, dev, prod, differences_only=True, sample=20
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,38 @@
 import time
 import warnings
 from pathlib import Path
-from typing import List, Union
+from typing import List, Optional, Union
 
 import pytest
 from _pytest.config import Config
 from _pytest.main import Session
 from _pytest.nodes import Item
 from _pytest.python import Metafunc
+from _pytest.reports import TestReport
 from _pytest.runner import CallInfo
+from _pytest.terminal import TerminalReporter
 from pytest_metadata.plugin import metadata_key
 
 from .helpers.framework import (
     FixtureExtraList, construct_parametrized_args_from_module_variable,
     get_fixtures_of_type, get_items_to_mark)
+from .helpers.gc_monitor import GCMonitor, GCTotals
+from .helpers.lap_baseline import LapBaselineStore, LapRegressionWarning
+from .helpers.lap_matrix import LapMatrix, lap_matrix_keys
+from .helpers.lap_profiler import LAP_PROFILERS, LapProfiler, safe_file_name
+from .helpers.perf_env import NoiseReduction, parse_cpu_list
+from .helpers.printing import SLOW_ATTRIBUTES, secs_to_str
+from .helpers.time_budget import (LapBudgetWarning, time_budget_action,
+                                  time_budget_breaches, unchecked_lap_budgets)
+from .helpers.timer import CPU_CLOCKS, TIMING_REGISTRY, TimingRegistry
+from .helpers.timer_laps import LapWatch, calibrate_lap_overhead
+from .helpers.timer_rollup import LapWatchRollup
 
 NL = "\n"
 
+# Number of rows in the tables of the clockit, lap matrix and GC summaries
+SUMMARY_TOP = 10
+
 
 class BaselineTestManager:
     def __init__(self, config: Config) -> None:
@@ -45,6 +61,67 @@ class BaselineTestManager:
             fixtures_extra_config=self.fixtures_extra_config
         )
 
+        # Cost of a `LapWatch.lap()` call, measured once per session when it
+        # is subtracted from lap times
+        self.subtract_overhead = self._config.getoption(
+            "BASELINE_SUBTRACT_OVERHEAD", False
+        )
+        self.lap_overhead: Optional[float] = None
+        if self.subtract_overhead:
+            self.lap_overhead = calibrate_lap_overhead(
+                cpu_clock=CPU_CLOCKS.get(
+                    self._config.getoption("BASELINE_CPU_TIME", None)
+                )
+            )
+
+        # Session wide rollup of all `timer` fixtures
+        self.timer_rollup = LapWatchRollup(
+            top=self._config.getoption("BASELINE_TIMER_SUMMARY", 10)
+        )
+
+        # Laps of the same test across modules and parametrizations
+        self.lap_matrix: Optional[LapMatrix] = None
+        self.lap_matrix_csv = self._config.getoption(
+            "BASELINE_LAP_MATRIX_CSV", None
+        )
+        self._lap_matrix_csv_path: Optional[Path] = None
+        matrix_factor = self._config.getoption(
+            "BASELINE_LAP_MATRIX_FACTOR", 3.0
+        )
+        if matrix_factor > 0 or self.lap_matrix_csv is not None:
+            self.lap_matrix = LapMatrix(factor=matrix_factor)
+
+        # Session wide totals of the functions decorated with `clockit`
+        self.function_timings = TimingRegistry()
+
+        # Garbage collections by test and by `timer` fixture lap
+        self.gc_monitor: Optional[GCMonitor] = None
+        if self._config.getoption("BASELINE_GC_MONITOR", False):
+            self.gc_monitor = GCMonitor(top=SUMMARY_TOP)
+        self._gc_test_start: Optional[GCTotals] = None
+
+        # Default action for tests over their module configured time budget
+        self.budget_action = self._config.getoption(
+            "BASELINE_BUDGET_ACTION", "fail"
+        )
+
+        # Persisted lap baselines for the `timer` fixture
+        self.baseline_update = self._config.getoption("BASELINE_UPDATE", False)
+        self.baseline_regression = self._config.getoption(
+            "BASELINE_REGRESSION", "off"
+        )
+        self.lap_baselines = LapBaselineStore(
+            self._config,
+            self.env,
+            directory=self._config.getoption("BASELINE_DIR", None),
+            rel_threshold=self._config.getoption(
+                "BASELINE_REL_THRESHOLD", 0.25
+            ),
+            abs_threshold=self._config.getoption(
+                "BASELINE_ABS_THRESHOLD", 0.005
+            )
+        )
+
     @property
     def has_html(self) -> bool:
         if self._has_html is None:
@@ -54,6 +131,83 @@ class BaselineTestManager:
                 self._has_html = True
         return self._has_html
 
+    def lap_profiler_for(self, item: Item) -> Optional[LapProfiler]:
+        """Returns a new profiler for the `timer` fixture of a test, from the
+        `baseline_profile` marker or `--baseline-profile-laps`, None when
+        laps are not profiled
+        """
+        mode = self._config.getoption("BASELINE_PROFILE_LAPS", None)
+        marker = item.get_closest_marker("baseline_profile")
+        if marker is not None:
+            mode = marker.kwargs.get(
+                "mode", marker.args[0] if marker.args else "cprofile"
+            )
+        if mode is None:
+            return None
+        if mode not in LAP_PROFILERS:
+            raise ValueError(
+                f"Unknown lap profiler `{mode}`, expected one of: "
+                f"{', '.join(sorted(LAP_PROFILERS))}"
+            )
+        top = self._config.getoption("BASELINE_PROFILE_TOP", 10)
+        if mode == "sample":
+            return LAP_PROFILERS[mode](
+                top=top, root_code=getattr(item.function, "__code__", None)
+            )
+        return LAP_PROFILERS[mode](top=top)
+
+    def noise_reduction_for(self, item: Item) -> Optional[NoiseReduction]:
+        """Returns the noise reduction to run a test in, from the
+        `baseline_perf` marker or `--baseline-perf`, None when the test runs
+        as is
+        """
+        marker = item.get_closest_marker("baseline_perf")
+        if marker is None and not self._config.getoption(
+            "BASELINE_PERF", False
+        ):
+            return None
+        cpus = self._config.getoption("BASELINE_PERF_CPUS", None)
+        if marker is not None:
+            cpus = marker.kwargs.get(
+                "cpus", marker.args[0] if marker.args else cpus
+            )
+        if isinstance(cpus, str):
+            cpus = parse_cpu_list(cpus)
+        return NoiseReduction(cpus=cpus)
+
+    def dump_lap_profiles(self, item: Item) -> None:
+        """Stops the profiler of a test's `timer` fixture and writes its lap
+        profiles to `--baseline-profile-dir` or the pytest cache
+        """
+        watch = getattr(item, "funcargs", {}).get("timer")
+        if not isinstance(watch, LapWatch) or watch.profiler is None:
+            return
+        watch.close_profiler()
+        if not watch.profiler.lap_names:
+            return
+        directory = self._config.getoption("BASELINE_PROFILE_DIR", None)
+        if directory is not None:
+            directory = Path(directory)
+        elif getattr(self._config, "cache", None) is not None:
+            directory = self._config.cache.mkdir("pytest_baseline_profiles")
+        else:
+            return
+        watch.profiler.dump(directory, safe_file_name(item.nodeid))
+
+    def add_lap_watch(self, item: Item, watch: LapWatch) -> None:
+        """Adds a `timer` fixture's LapWatch to the session rollup and to
+        the lap matrix, called at fixture teardown
+        """
+        if self.timer_rollup.top > 0:
+            self.timer_rollup.add(
+                watch,
+                node_id=item.nodeid,
+                module_name=item.module.__name__,
+                class_name=item.cls.__name__ if item.cls is not None else None
+            )
+        if self.lap_matrix is not None and watch.laps.keep_laps:
+            self.lap_matrix.add(watch, *lap_matrix_keys(item))
+
     def pytest_report_header(
         self,
         config: Config,
@@ -89,6 +243,11 @@ class BaselineTestManager:
         if self.logo != "":
             hdr_lines.append(self.logo)
             hdr_lines.append("")
+        if self.lap_overhead is not None:
+            hdr_lines.append(
+                f"baseline lap overhead: {secs_to_str(self.lap_overhead)} "
+                "per `timer` lap, subtracted from lap times"
+            )
         return hdr_lines
 
     def pytest_configure(self, config: Config) -> None:
@@ -125,12 +284,28 @@ class BaselineTestManager:
         config.addinivalue_line(
             "markers", "env(name): mark test to run only on named environment"
         )
+        config.addinivalue_line(
+            "markers",
+            "baseline_profile(mode='cprofile'): profile the code between "
+            "the laps of the test's `timer` fixture, mode is `cprofile` or "
+            "`sample`"
+        )
+        config.addinivalue_line(
+            "markers",
+            "baseline_perf(cpus=None): run the test with the cyclic GC "
+            "disabled (collected between `timer` fixture laps) and pinned to "
+            "the `cpus` CPU set (default: one CPU), recording the load "
+            "average and CPU frequency"
+        )
 
     def pytest_html_results_table_header(self, cells):
         """Adding columns to HTML Report, Description"""
         if self.add_description_html and self.has_html:
             cells.insert(2, "<th>Desciption</th>")
             cells.insert(1, '<th class="sortable">Parametrization ID</th>')
+        if self.gc_monitor is not None:
+            cells.append('<th class="sortable">GC Collections</th>')
+            cells.append('<th class="sortable">GC Pause</th>')
 
     def pytest_html_results_table_row(self, report, cells):
         """Adding values to columns of HTML Report, Description"""
@@ -147,6 +322,17 @@ class BaselineTestManager:
             else:
                 param = "not a parametrized test"
             cells.insert(1, f'<td>{param}</td>')
+        if self.gc_monitor is not None:
+            gc_collections = getattr(report, "gc_collections", None)
+            gc_pause = getattr(report, "gc_pause", None)
+            cells.append(
+                f"<td>{'--' if gc_collections is None else gc_collections}"
+                "</td>"
+            )
+            cells.append(
+                f"<td>{'--' if gc_pause is None else secs_to_str(gc_pause)}"
+                "</td>"
+            )
 
     def pytest_generate_tests(self, metafunc: Metafunc):
         """Generate (multiple) parametrized calls to a test function."""
@@ -263,6 +449,39 @@ class BaselineTestManager:
             if self.env not in env_names:
                 pytest.skip("test requires env in {!r}".format(env_names))
 
+    def pytest_sessionstart(self, session: Session) -> None:
+        """Called after the ``Session`` object has been created and before
+        performing collection and entering the run test loop.
+
+        :param pytest.Session session: The pytest session object.
+        """
+        if self.gc_monitor is not None:
+            self.gc_monitor.install()
+
+    def pytest_runtest_logstart(self, nodeid: str, location) -> None:
+        """Called at the start of running the runtest protocol for a single
+        item, the test's garbage collections are counted from here
+        """
+        if self.gc_monitor is not None:
+            self._gc_test_start = self.gc_monitor.totals()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item: Item):
+        """Called to run the test for test item (the call phase), tests
+        marked with `baseline_perf` run with reduced timing noise
+        """
+        noise_reduction = self.noise_reduction_for(item)
+        if noise_reduction is None:
+            yield
+            return
+        watches = get_fixtures_of_type(
+            funcargs=item.funcargs, fixture_type=LapWatch
+        )
+        for *_, watch in watches:
+            watch.attach_noise_reduction(noise_reduction)
+        with noise_reduction:
+            yield
+
     @pytest.hookimpl(hookwrapper=True)
     def pytest_runtest_makereport(self, item: Item, call: CallInfo):
         """Called to create a :py:class:`_pytest.reports.TestReport` for each
@@ -278,6 +497,19 @@ class BaselineTestManager:
         outcome = yield
         report = outcome.get_result()
 
+        # Garbage collections since the start of the test, up to this phase
+        if self.gc_monitor is not None and self._gc_test_start is not None:
+            totals = self.gc_monitor.since(self._gc_test_start)
+            report.gc_collections, report.gc_pause = totals
+            if report.when == "teardown":
+                self.gc_monitor.add_test(item.nodeid, totals)
+
+        # Compare the test's laps to the persisted baselines
+        if report.when == "call":
+            self.dump_lap_profiles(item)
+            self.check_time_budgets(item, report)
+            self.check_lap_baselines(item, report)
+
         # Make sure there is even a report to generate stuff for
         if self.has_html:
 
@@ -328,6 +560,172 @@ class BaselineTestManager:
                 # originally
                 report.extra = extra
 
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item: Item, nextitem: Optional[Item]):
+        """Called to perform the teardown phase for a test item, once the
+        test's fixtures are torn down the `clockit` timings recorded since the
+        previous test are added to the session totals and reset, and the slow
+        attributes of bounded `dir_str_of_object` dumps are forgotten
+        """
+        yield
+        self.function_timings.merge(TIMING_REGISTRY)
+        TIMING_REGISTRY.reset()
+        SLOW_ATTRIBUTES.reset()
+
+    def check_time_budgets(self, item: Item, report: TestReport) -> None:
+        """Fails or xfails a passed test that took longer than its
+        `time_budget` or whose `timer` fixture laps took longer than their
+        `lap_budget_data` budget, the breaches are added to the LapWatch
+        findings.  Lap budgets need the laps to be kept, a warning is issued
+        otherwise.
+        """
+        if not report.passed or getattr(item, "module", None) is None:
+            return
+        action = time_budget_action(item, self.budget_action)
+        if action == "off":
+            return
+        watch = getattr(item, "funcargs", {}).get("timer")
+        if not isinstance(watch, LapWatch):
+            watch = None
+        else:
+            lap_names = unchecked_lap_budgets(item, watch)
+            if lap_names:
+                item.warn(LapBudgetWarning(
+                    f"Lap budgets of {', '.join(map(repr, lap_names))} are "
+                    "not checked, the `timer` fixture laps are not kept"
+                ))
+        messages = time_budget_breaches(item, report.duration, watch)
+        if not messages:
+            return
+        if watch is not None:
+            watch.findings.extend(messages)
+        if action == "xfail":
+            report.outcome = "skipped"
+            report.wasxfail = f"reason: {'; '.join(messages)}"
+        else:
+            report.outcome = "failed"
+            report.longrepr = NL.join(messages)
+
+    def check_lap_baselines(self, item: Item, report: TestReport) -> None:
+        """Compares the laps of a passed test's `timer` fixture to the
+        persisted baselines, regressions are added to the LapWatch findings
+        and warn or fail the test depending on `--baseline-regression`.
+        Profiled or memory tracked laps are slowed down and are skipped.
+        """
+        watch = getattr(item, "funcargs", {}).get("timer")
+        if (
+            not isinstance(watch, LapWatch)
+            or watch.profiler is not None
+            or watch.memory_tracker is not None
+            or not report.passed
+            or self.baseline_regression == "off"
+            or not self.lap_baselines.enabled
+        ):
+            return
+        messages = self.lap_baselines.compare(item.nodeid, watch)
+        if self.baseline_update or not messages:
+            return
+        watch.findings.extend(messages)
+        if self.baseline_regression == "fail":
+            report.outcome = "failed"
+            report.longrepr = NL.join(messages)
+        else:
+            for message in messages:
+                item.warn(LapRegressionWarning(message))
+
+    def pytest_sessionfinish(self, session: Session, exitstatus: int) -> None:
+        """Called after whole test run finished, right before returning the
+        exit status to the system.
+
+        :param pytest.Session session: The pytest session object.
+        :param int exitstatus: The status which pytest will return to the
+            system.
+        """
+        if self.baseline_regression != "off":
+            self.lap_baselines.save(update=self.baseline_update)
+        if self.gc_monitor is not None:
+            self.gc_monitor.uninstall()
+        if self.lap_matrix is not None and self.lap_matrix_csv is not None:
+            self._lap_matrix_csv_path = self.lap_matrix.write_csv(
+                Path(self.lap_matrix_csv)
+            )
+
+    def pytest_terminal_summary(
+        self,
+        terminalreporter: TerminalReporter,
+        exitstatus: int,
+        config: Config
+    ) -> None:
+        """Add a section to terminal summary reporting.
+
+        :param _pytest.terminal.TerminalReporter terminalreporter:
+            The internal terminal reporter object.
+        :param int exitstatus: The exit status that will be reported back to
+            the OS.
+        :param pytest.Config config: The pytest config object.
+        """
+        sections = self.timer_rollup.summary_sections()
+        if sections:
+            terminalreporter.write_sep(
+                "=",
+                f"baseline timer summary ({self.timer_rollup.lap_count:,} "
+                f"laps in {self.timer_rollup.watch_count:,} tests)"
+            )
+            for title, table in sections:
+                terminalreporter.write_line(f"{NL}{title}:")
+                terminalreporter.write_line(table)
+        top = SUMMARY_TOP
+        function_stats = self.function_timings.stats()
+        if function_stats:
+            calls = sum(x.count for x in function_stats.values())
+            terminalreporter.write_sep(
+                "=",
+                f"baseline clockit summary ({calls:,} calls of "
+                f"{len(function_stats):,} functions)"
+            )
+            terminalreporter.write_line(
+                f"{NL}Top {top} functions by total time:"
+            )
+            terminalreporter.write_line(self.function_timings.report(top))
+        self.lap_matrix_summary(terminalreporter)
+        if self.gc_monitor is not None:
+            totals = self.gc_monitor.totals()
+            terminalreporter.write_sep(
+                "=",
+                f"baseline GC summary ({totals.collections:,} collections, "
+                f"{secs_to_str(totals.pause)} paused)"
+            )
+            terminalreporter.write_line(self.gc_monitor.summary())
+
+    def lap_matrix_summary(self, terminalreporter: TerminalReporter) -> None:
+        """Writes the outliers of the lap matrix, the laps much slower in
+        one module or parametrization than in the others, and the path of
+        the matrix csv file
+        """
+        matrix = self.lap_matrix
+        if matrix is None:
+            return
+        outliers = matrix.outliers()
+        if not outliers and self._lap_matrix_csv_path is None:
+            return
+        terminalreporter.write_sep(
+            "=",
+            f"baseline lap matrix ({len(matrix):,} laps x "
+            f"{len(matrix.columns):,} modules/params)"
+        )
+        if outliers:
+            top = SUMMARY_TOP
+            terminalreporter.write_line(
+                f"{NL}{len(outliers):,} laps over {matrix.factor:g}x the "
+                f"median of the same lap in the other modules/params, top "
+                f"{top}:"
+            )
+            terminalreporter.write_line(matrix.outliers_table(top))
+        if self._lap_matrix_csv_path is not None:
+            terminalreporter.write_line(
+                f"{NL}Lap matrix written to: {self._lap_matrix_csv_path}"
+            )
+
 
 def pytest_html_results_table_header(cells):
     """Adding columns to HTML Report, Description"""
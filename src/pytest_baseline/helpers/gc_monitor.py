@@ -0,0 +1,136 @@
+import gc
+import heapq
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from .printing import generate_table, secs_to_str
+from .timer import NS_PER_SEC
+
+NL = "\n"
+
+
+class GCTotals(NamedTuple):
+    collections: int
+    pause: float
+
+
+class GCMonitor:
+    """Measures the cyclic garbage collector through `gc.callbacks`: the
+    number of collections and the time the collections paused the program,
+    by generation.
+
+    The totals are process wide, `totals()` is read before and after a test
+    or a lap to attribute the collections in between to it.  GC pauses land
+    in whatever code triggers the collection, so they tell apart GC induced
+    latency (for example of large objects kept alive by module scoped
+    fixtures) from slowness of the code under test.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], int] = time.perf_counter_ns,
+        top: int = 10
+    ) -> None:
+        self.top = top
+        self.collections = [0] * len(gc.get_count())
+        self.pause_ns = [0] * len(gc.get_count())
+        self.max_pause_ns = 0
+        self._clock = clock
+        self._started_at = 0
+        self._installed = False
+        # (pause, collections, test name) of the tests with the longest
+        # GC pauses
+        self._tests: List[Tuple[float, int, str]] = []
+
+    def __len__(self) -> int:
+        return sum(self.collections)
+
+    def _callback(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self._started_at = self._clock()
+            return
+        pause = self._clock() - self._started_at
+        generation = info["generation"]
+        self.collections[generation] += 1
+        self.pause_ns[generation] += pause
+        if pause > self.max_pause_ns:
+            self.max_pause_ns = pause
+
+    @property
+    def installed(self) -> bool:
+        return self._installed
+
+    def install(self) -> None:
+        if not self._installed:
+            gc.callbacks.append(self._callback)
+            self._installed = True
+
+    def uninstall(self) -> None:
+        if self._installed:
+            gc.callbacks.remove(self._callback)
+            self._installed = False
+
+    def totals(self) -> GCTotals:
+        """Returns the collections and GC pause in seconds so far"""
+        return GCTotals(
+            sum(self.collections), sum(self.pause_ns) / NS_PER_SEC
+        )
+
+    def since(self, start: GCTotals) -> GCTotals:
+        """Returns the collections and GC pause since the `start` totals"""
+        end = self.totals()
+        return GCTotals(
+            end.collections - start.collections, end.pause - start.pause
+        )
+
+    def add_test(self, test_name: str, totals: GCTotals) -> None:
+        """Keeps the GC totals of a test if it is one of the `top` tests
+        with the longest GC pauses
+        """
+        if self.top <= 0 or totals.collections == 0:
+            return
+        item = (totals.pause, totals.collections, test_name)
+        if len(self._tests) < self.top:
+            heapq.heappush(self._tests, item)
+        elif item > self._tests[0]:
+            heapq.heapreplace(self._tests, item)
+
+    def summary(self) -> str:
+        """Returns a table of the collections and GC pauses by generation and
+        of the tests with the longest GC pauses
+        """
+        rows = []
+        for generation, collections in enumerate(self.collections):
+            pause = self.pause_ns[generation] / NS_PER_SEC
+            rows.append([
+                str(generation),
+                f"{collections:,}",
+                secs_to_str(pause),
+                secs_to_str(pause / collections) if collections else "--",
+            ])
+        total = self.totals()
+        rows.append("break")
+        rows.append([
+            "All",
+            f"{total.collections:,}",
+            secs_to_str(total.pause),
+            secs_to_str(self.max_pause_ns / NS_PER_SEC) + " max",
+        ])
+        sections = [generate_table(
+            ["Generation", "Collections", "GC Pause", "Mean Pause"],
+            rows,
+            justification=[">", ">", ">", ">"]
+        )]
+        if self._tests:
+            sections.append(f"{NL}Top {self.top} tests by GC pause:")
+            sections.append(generate_table(
+                ["Test", "Collections", "GC Pause"],
+                [
+                    [name, f"{collections:,}", secs_to_str(pause)]
+                    for pause, collections, name in sorted(
+                        self._tests, reverse=True
+                    )
+                ],
+                justification=["<", ">", ">"]
+            ))
+        return NL.join(sections)
@@ -0,0 +1,96 @@
+import heapq
+from itertools import count as counter
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional
+
+
+class HeavyHitter(NamedTuple):
+    value: Any
+    count: int
+    error: int
+
+    @property
+    def min_count(self) -> int:
+        """Guaranteed lower bound of the true count"""
+        return self.count - self.error
+
+
+class SpaceSaving:
+    """Approximate counts of the most frequent values of a stream in
+    constant memory (the Space-Saving algorithm): at most `capacity` values
+    are counted, a new value replaces the value with the lowest count and
+    inherits that count as its error.
+
+    Counts are over-estimates by at most their `error`, which is at most
+    `total / capacity`, every value seen more often than that is guaranteed
+    to be counted.
+    """
+
+    def __init__(self, capacity: int = 1000) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1: {capacity}")
+        self.capacity = capacity
+        self.total = 0
+        # number of values replaced by a new value, counts are exact while 0
+        self.evictions = 0
+        # value -> [count, error]
+        self._counters: Dict[Hashable, List[int]] = {}
+        # (count when pushed, order, value) of every counted value, the
+        # counts only grow so an entry is a lower bound of its count and is
+        # refreshed when it reaches the top of the heap
+        self._heap: List[Any] = []
+        self._order = counter()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(self, value: Hashable, count: int = 1) -> None:
+        """Counts `count` occurrences of a value"""
+        self.total += count
+        counters = self._counters.get(value)
+        if counters is not None:
+            counters[0] += count
+        else:
+            self._insert(value, count)
+
+    def update(self, values: Iterable[Hashable]) -> None:
+        """Counts every value of an iterable"""
+        counters = self._counters
+        total = 0
+        for value in values:
+            total += 1
+            value_counters = counters.get(value)
+            if value_counters is not None:
+                value_counters[0] += 1
+            else:
+                self._insert(value, 1)
+        self.total += total
+
+    def _insert(self, value: Hashable, count: int) -> None:
+        error = 0
+        if len(self._counters) >= self.capacity:
+            error = self._evict()
+        self._counters[value] = [error + count, error]
+        heapq.heappush(self._heap, (error + count, next(self._order), value))
+
+    def _evict(self) -> int:
+        """Removes the value with the lowest count and returns its count"""
+        heap = self._heap
+        while True:
+            pushed_count, order, value = heap[0]
+            current = self._counters[value][0]
+            if current == pushed_count:
+                heapq.heappop(heap)
+                del self._counters[value]
+                self.evictions += 1
+                return current
+            heapq.heapreplace(heap, (current, order, value))
+
+    def most_common(self, n: Optional[int] = None) -> List[HeavyHitter]:
+        """Returns the `n` (all when None) values with the highest counts"""
+        items = (
+            HeavyHitter(value, counters[0], counters[1])
+            for value, counters in self._counters.items()
+        )
+        if n is None:
+            return sorted(items, key=lambda x: x.count, reverse=True)
+        return heapq.nlargest(n, items, key=lambda x: x.count)
@@ -0,0 +1,174 @@
+import datetime
+import re
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Characters the json module escapes with `ensure_ascii` that fast backends
+# write as they are: DEL and the non-ASCII characters (control characters
+# are escaped by both)
+NON_ASCII = re.compile(r"[^\x00-\x7e]")
+
+# Floats the json module writes in exponent notation (`1e+16`, `1e-05`),
+# fast backends write the same digits with another exponent format
+EXPONENT_MIN = 1e-4
+EXPONENT_MAX = 1e16
+
+# Types both write the same way, only exact types: subclasses (for example
+# `numpy.float64` or `Enum` mixins) may be written differently
+PLAIN_TYPES = frozenset((str, int, bool, type(None)))
+
+# Types both write as their `str()`
+STR_TYPES = frozenset((
+    datetime.datetime, datetime.date, datetime.time, uuid.UUID, set,
+    frozenset,
+))
+
+# Nesting depth over which documents, and circular references, are left to
+# the json module (orjson does not serialize documents over 255 levels deep)
+MAX_DEPTH = 254
+
+
+def _float_differs(value: float) -> bool:
+    """Whether a fast backend writes a float differently than the json
+    module: NaN and infinities (`null`) or exponent notation
+    """
+    # False for NaN
+    return not (value == 0 or EXPONENT_MIN <= abs(value) < EXPONENT_MAX)
+
+
+def _key_differs(key: Any, sort_keys: bool) -> bool:
+    """Whether a dictionary key that is not a string is written
+    differently, or rejected by the json module.  Sorted keys must all be
+    strings, fast backends sort the keys after converting them.
+    """
+    if sort_keys:
+        return True
+    cls = type(key)
+    if cls is float:
+        return _float_differs(key)
+    return cls not in PLAIN_TYPES
+
+
+def needs_json_module(obj: Any, sort_keys: bool = False) -> bool:
+    """Whether a fast backend would serialize the document differently than
+    the json module, it must only contain:
+
+    - dictionaries, lists and tuples, at most `MAX_DEPTH` levels deep;
+    - strings, integers, booleans and None;
+    - floats that are finite and not in exponent notation (NaN and
+      infinities are written as `null`, exponents without `+` or padding);
+    - dates, times, UUIDs and sets, written as their `str()`;
+    - dictionary keys that are strings, integers, booleans, None or such
+      floats, only strings with `sort_keys`.
+
+    Only exact types are accepted, subclasses (for example `numpy.float64`
+    or `Enum` members) are written differently.
+    """
+    plain = PLAIN_TYPES
+    str_types = STR_TYPES
+    stack = [((obj,), 0)]
+    push = stack.append
+    while stack:
+        container, depth = stack.pop()
+        if type(container) is dict:
+            for key in container:
+                if type(key) is not str and _key_differs(key, sort_keys):
+                    return True
+            container = container.values()
+        for value in container:
+            cls = type(value)
+            if cls in plain:
+                continue
+            if cls is float:
+                if not (
+                    value == 0 or EXPONENT_MIN <= abs(value) < EXPONENT_MAX
+                ):
+                    return True
+            elif cls is dict or cls is list or cls is tuple:
+                if depth >= MAX_DEPTH:
+                    return True
+                push((value, depth + 1))
+            elif cls not in str_types:
+                return True
+    return False
+
+
+def _orjson_dumps(obj: Any, indent: Optional[int], sort_keys: bool) -> str:
+    option = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=str, option=option).decode()
+
+
+# Fast JSON encoders by name, fastest first, called with the object, the
+# indent (2, or None for compact separators) and sort_keys
+FAST_ENCODERS: Dict[str, Callable[[Any, Optional[int], bool], str]] = {
+    name: encoder
+    for name, module, encoder in (
+        ("orjson", orjson, _orjson_dumps),
+    )
+    if module is not None
+}
+
+
+def available_json_backends() -> List[str]:
+    """Returns the installed JSON backends, fastest first, `json` (the
+    standard library) is always available
+    """
+    return [*FAST_ENCODERS, "json"]
+
+
+DEFAULT_JSON_BACKEND = available_json_backends()[0]
+
+
+def ascii_escape(text: str) -> str:
+    """Escapes DEL and the non-ASCII characters of a JSON document the way
+    the json module does with `ensure_ascii`, as `\\uXXXX` (UTF-16 surrogate
+    pairs outside the Basic Multilingual Plane)
+    """
+    def escape(match: "re.Match[str]") -> str:
+        code = ord(match.group())
+        if code < 0x10000:
+            return f"\\u{code:04x}"
+        code -= 0x10000
+        return (
+            f"\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}"
+        )
+    return NON_ASCII.sub(escape, text)
+
+
+def fast_json_dumps(
+    obj: Any,
+    backend: str,
+    indent: Optional[int] = 2,
+    sort_keys: bool = False,
+    ensure_ascii: bool = True
+) -> Optional[str]:
+    """Serializes an object with a fast backend, objects that are not JSON
+    serializable are serialized as their `str()`.  Returns None when the
+    backend is `json` or not installed, when it would not write the same
+    document as the json module (see `needs_json_module`) or cannot
+    serialize the object (for example integers over 64 bits or circular
+    references), the json module is then expected to be used.
+    """
+    encoder = FAST_ENCODERS.get(backend)
+    if encoder is None or needs_json_module(obj, sort_keys):
+        return None
+    try:
+        text = encoder(obj, indent, sort_keys)
+    except (TypeError, ValueError, OverflowError, RecursionError):
+        return None
+    if ensure_ascii and NON_ASCII.search(text):
+        text = ascii_escape(text)
+    return text
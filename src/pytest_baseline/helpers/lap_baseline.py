@@ -0,0 +1,186 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from _pytest.config import Config
+
+from .printing import rate_to_str, secs_to_str
+from .timer_laps import LapWatch
+
+CACHE_KEY = "pytest_baseline/laps"
+
+LapBaselineEntry = Dict[str, float]
+TestLapBaselines = Dict[str, LapBaselineEntry]
+
+
+class LapRegressionWarning(UserWarning):
+    """Warning issued when a lap is slower than its persisted baseline"""
+
+
+# Throughput entries of a lap baseline and the unit to print them with
+THROUGHPUT_KEYS = {"items_per_sec": "items", "bytes_per_sec": "B"}
+
+
+def lap_baseline_entries(watch: LapWatch) -> TestLapBaselines:
+    """Returns the statistics to persist for each lap name of a LapWatch,
+    with the items and bytes per second of laps that recorded them
+    """
+    entries = {
+        lap_name: {
+            "count": stats.count,
+            "mean": stats.mean,
+            "p50": stats.percentile(50),
+            "p95": stats.percentile(95),
+            "max": stats.max,
+        }
+        for lap_name, stats in watch.laps.group_by_name().items()
+        if stats.count > 0
+    }
+    for lap_name, throughput in watch.laps.throughput_by_name().items():
+        for key, rate in (
+            ("items_per_sec", throughput.items_per_sec),
+            ("bytes_per_sec", throughput.bytes_per_sec),
+        ):
+            if rate is not None:
+                entries[lap_name][key] = rate
+    return entries
+
+
+class LapBaselineStore:
+    """Persists lap statistics per test node id and lap name for an
+    environment, either in the pytest cache or as `{env}.json` files in a
+    directory.  Laps are compared on their median (`p50`), a lap regressed
+    when it is slower than the baseline by more than both the relative and
+    the absolute threshold.  Laps that recorded items or bytes are compared
+    on their throughput instead, as the work per lap can change between
+    runs: a lap regressed when its rate dropped by more than the relative
+    threshold.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        env: str,
+        directory: Optional[str] = None,
+        rel_threshold: float = 0.25,
+        abs_threshold: float = 0.005
+    ) -> None:
+        self._config = config
+        self.env = env
+        self.directory = Path(directory) if directory is not None else None
+        self.rel_threshold = rel_threshold
+        self.abs_threshold = abs_threshold
+        self._baselines: Optional[Dict[str, TestLapBaselines]] = None
+        self._results: Dict[str, TestLapBaselines] = {}
+
+    @property
+    def _cache(self):
+        """The pytest cache, None when the cacheprovider plugin is disabled
+        """
+        return getattr(self._config, "cache", None)
+
+    @property
+    def enabled(self) -> bool:
+        """Baselines need either a directory or the pytest cache"""
+        return self.directory is not None or self._cache is not None
+
+    @property
+    def baselines(self) -> Dict[str, TestLapBaselines]:
+        """Persisted baselines for the environment, loaded on first use"""
+        if self._baselines is None:
+            self._baselines = self._load()
+        return self._baselines
+
+    def compare(self, node_id: str, watch: LapWatch) -> List[str]:
+        """Records the laps of a test and returns a message for each lap
+        that regressed against the baseline
+        """
+        current = lap_baseline_entries(watch)
+        self._results[node_id] = current
+        baseline = self.baselines.get(node_id, {})
+        messages = []
+        for lap_name, entry in current.items():
+            if lap_name not in baseline:
+                continue
+            rate_keys = [
+                x for x in THROUGHPUT_KEYS
+                if x in entry and x in baseline[lap_name]
+            ]
+            if rate_keys:
+                messages.extend(self._compare_throughput(
+                    lap_name, entry, baseline[lap_name], rate_keys
+                ))
+                continue
+            base_p50 = baseline[lap_name]["p50"]
+            slower_by = entry["p50"] - base_p50
+            if (
+                slower_by <= self.abs_threshold
+                or slower_by <= base_p50 * self.rel_threshold
+            ):
+                continue
+            percent = f", +{slower_by / base_p50:.0%}" if base_p50 > 0 else ""
+            messages.append(
+                f"Lap '{lap_name}' regressed in env '{self.env}': median "
+                f"{secs_to_str(entry['p50'])} vs baseline "
+                f"{secs_to_str(base_p50)} (+{secs_to_str(slower_by)}"
+                f"{percent})"
+            )
+        return messages
+
+    def _compare_throughput(
+        self,
+        lap_name: str,
+        entry: LapBaselineEntry,
+        baseline: LapBaselineEntry,
+        rate_keys: List[str]
+    ) -> List[str]:
+        messages = []
+        for key in rate_keys:
+            base_rate = baseline[key]
+            slower_by = base_rate - entry[key]
+            if base_rate <= 0 or slower_by <= base_rate * self.rel_threshold:
+                continue
+            unit = THROUGHPUT_KEYS[key]
+            messages.append(
+                f"Lap '{lap_name}' regressed in env '{self.env}': "
+                f"{rate_to_str(entry[key], unit)} vs baseline "
+                f"{rate_to_str(base_rate, unit)} "
+                f"(-{slower_by / base_rate:.0%})"
+            )
+        return messages
+
+    def save(self, update: bool = False) -> None:
+        """Persists the recorded laps, existing baselines are only replaced
+        when `update` is True, new tests and laps are always added
+        """
+        if not self._results or not self.enabled:
+            return
+        baselines = dict(self.baselines)
+        for node_id, entries in self._results.items():
+            if update:
+                baselines[node_id] = entries
+            else:
+                merged = dict(entries)
+                merged.update(baselines.get(node_id, {}))
+                baselines[node_id] = merged
+        self._baselines = baselines
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._file_path, "w") as f:
+                json.dump(baselines, f, indent=2, sort_keys=True)
+        else:
+            self._cache.set(f"{CACHE_KEY}/{self.env}", baselines)
+
+    @property
+    def _file_path(self) -> Path:
+        return self.directory / f"{self.env}.json"
+
+    def _load(self) -> Dict[str, Any]:
+        if self.directory is not None:
+            if not self._file_path.exists():
+                return {}
+            with open(self._file_path) as f:
+                return json.load(f)
+        if self._cache is not None:
+            return self._cache.get(f"{CACHE_KEY}/{self.env}", {})
+        return {}
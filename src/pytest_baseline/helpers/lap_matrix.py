@@ -0,0 +1,204 @@
+import bisect
+import csv
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from _pytest.nodes import Item
+
+from .lap_stats import LapStats
+from .printing import generate_table, secs_to_str
+from .timer_laps import LapWatch
+
+# (test name, lap name), the same test of a common test class in every
+# module or parametrization it runs in
+MatrixRow = Tuple[str, str]
+
+CSV_COLUMNS = [
+    "test", "lap_name", "column", "count", "median", "mean", "max",
+    "row_median", "ratio"
+]
+
+
+class LapOutlier(NamedTuple):
+    test_name: str
+    lap_name: str
+    column: str
+    median: float
+    row_median: float
+
+    @property
+    def ratio(self) -> float:
+        return self.median / self.row_median
+
+
+class LapMatrix:
+    """Pivots the `timer` fixture laps of the session into a matrix of
+    (test name, lap name) rows by module or parametrization columns, so the
+    same lap of a common test class can be compared across the dozens of
+    modules it runs in.
+
+    Each cell keeps the streaming statistics of its laps.  A cell is an
+    outlier when its median is over `factor` times the row median, the
+    median of the cell medians of the other columns of its row, rows need
+    at least `min_columns` columns to have outliers.
+    """
+
+    def __init__(self, factor: float = 3.0, min_columns: int = 3) -> None:
+        self.factor = factor
+        self.min_columns = min_columns
+        self.cells: Dict[MatrixRow, Dict[str, LapStats]] = {}
+        self.columns: Dict[str, None] = {}
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def add(self, watch: LapWatch, test_name: str, column: str) -> None:
+        """Adds the laps of a test's `LapWatch` to the `column` cells of
+        the rows of its lap names, laps must be kept
+        """
+        for lap_name, stats in watch.laps.group_by_name().items():
+            if stats.count == 0:
+                continue
+            row = self.cells.setdefault((test_name, lap_name), {})
+            cell = row.get(column)
+            if cell is None:
+                cell = row[column] = LapStats()
+            cell.merge(stats)
+            self.columns.setdefault(column)
+
+    def row_medians(self) -> Dict[MatrixRow, Dict[str, Optional[float]]]:
+        """Returns the row median of each cell, the median of the cell
+        medians of the other columns of its row, None for the only cell of
+        a row
+        """
+        row_medians = {}
+        for row, cells in self.cells.items():
+            medians = {
+                column: stats.percentile(50)
+                for column, stats in cells.items()
+            }
+            ordered = sorted(medians.values())
+            row_medians[row] = {
+                column: _median_without(
+                    ordered, bisect.bisect_left(ordered, median)
+                )
+                for column, median in medians.items()
+            }
+        return row_medians
+
+    def outliers(self) -> List[LapOutlier]:
+        """Returns the cells over `factor` times their row median, largest
+        ratio first
+        """
+        if self.factor <= 0:
+            return []
+        outliers = []
+        for row, row_medians in self.row_medians().items():
+            cells = self.cells[row]
+            if len(cells) < self.min_columns:
+                continue
+            for column, stats in cells.items():
+                row_median = row_medians[column]
+                if row_median is None or row_median <= 0:
+                    continue
+                median = stats.percentile(50)
+                if median > self.factor * row_median:
+                    outliers.append(
+                        LapOutlier(*row, column, median, row_median)
+                    )
+        outliers.sort(key=lambda x: x.ratio, reverse=True)
+        return outliers
+
+    def outliers_table(self, top: int = 10) -> str:
+        """Returns a table of the `top` outliers by ratio to their row
+        median
+        """
+        return generate_table(
+            ["Test", "Lap Name", "Module/Param", "Median", "Row Median",
+             "Ratio"],
+            [
+                [
+                    x.test_name,
+                    x.lap_name,
+                    x.column,
+                    secs_to_str(x.median),
+                    secs_to_str(x.row_median),
+                    f"{x.ratio:.1f}x",
+                ]
+                for x in self.outliers()[:top]
+            ],
+            justification=["<", "<", "<", ">", ">", ">"]
+        )
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Returns one dictionary per cell with its statistics in seconds
+        and its ratio to the row median
+        """
+        rows = []
+        row_medians = self.row_medians()
+        for (test_name, lap_name), cells in self.cells.items():
+            for column, stats in cells.items():
+                median = stats.percentile(50)
+                row_median = row_medians[(test_name, lap_name)][column]
+                rows.append({
+                    "test": test_name,
+                    "lap_name": lap_name,
+                    "column": column,
+                    "count": stats.count,
+                    "median": median,
+                    "mean": stats.mean,
+                    "max": stats.max,
+                    "row_median": row_median,
+                    "ratio": (
+                        median / row_median if row_median else None
+                    ),
+                })
+        return rows
+
+    def write_csv(self, path: Path) -> Optional[Path]:
+        """Writes the cells to a csv file, returns its path or None when
+        there are no cells
+        """
+        if not self.cells:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", newline="") as f:
+            dict_writer = csv.DictWriter(f, CSV_COLUMNS)
+            dict_writer.writeheader()
+            dict_writer.writerows(self.to_rows())
+        return path
+
+
+def _median_without(
+    ordered: List[float],
+    index: int
+) -> Optional[float]:
+    """Returns the median of the sorted `ordered` values without the one at
+    `index`, None when it is the only value
+    """
+    size = len(ordered) - 1
+    if size == 0:
+        return None
+
+    def value(position: int) -> float:
+        return ordered[position if position < index else position + 1]
+
+    middle = size // 2
+    if size % 2:
+        return value(middle)
+    return (value(middle - 1) + value(middle)) / 2
+
+
+def lap_matrix_keys(item: Item) -> Tuple[str, str]:
+    """Returns the test name (`TestClass.test_name` without the
+    parametrization) and the column (module and parametrization id) of a
+    test in the lap matrix
+    """
+    test_name = getattr(item, "originalname", None) or item.name
+    if item.cls is not None:
+        test_name = f"{item.cls.__name__}.{test_name}"
+    column = item.module.__name__
+    callspec = getattr(item, "callspec", None)
+    if callspec is not None:
+        column = f"{column}[{callspec.id}]"
+    return test_name, column
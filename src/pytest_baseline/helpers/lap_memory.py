@@ -0,0 +1,157 @@
+import fnmatch
+import heapq
+import tracemalloc
+from itertools import count
+from typing import List, Optional, Tuple
+
+from .printing import bytes_to_str, generate_table
+
+NL = "\n"
+
+# Allocations of tracemalloc, of this module and of the import machinery
+# are noise
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+# Compile (and cache) the filter patterns now, otherwise the first snapshot
+# of a test shows their compilation as allocation sites
+for _filter in SNAPSHOT_FILTERS:
+    fnmatch.fnmatch("", _filter.filename_pattern)
+
+# `tracemalloc.reset_peak` is new in Python 3.9
+HAS_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+
+class LapMemoryTracker:
+    """Measures the memory allocated by the code between consecutive laps
+    with `tracemalloc`: the change in traced memory (`mem_delta`) and the
+    peak of traced memory during the lap (`mem_peak`).
+
+    When `top_laps` is above 0 a snapshot is taken at every lap to keep the
+    `top_sites` allocation sites (by size difference) of the `top_laps` laps
+    with the largest `mem_delta`.  Snapshots take time proportional to the
+    number of live allocations, pass `top_laps=0` to only measure deltas.
+
+    tracemalloc traces the whole process, so laps recorded concurrently by
+    several threads include each other's allocations.  tracemalloc is
+    started when needed and stopped by `close` if it was started here.
+
+    Before Python 3.9 the peak cannot be reset between laps, a lap's
+    `mem_peak` is exact when the lap raised the peak of traced memory and
+    is otherwise the larger of the traced memory at its start and end.
+    """
+
+    def __init__(self, top_laps: int = 3, top_sites: int = 5) -> None:
+        self.top_laps = top_laps
+        self.top_sites = top_sites
+        self._started_tracing = False
+        self._last_current = 0
+        self._last_peak = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._heaviest: List[Tuple[int, int, str, List[str]]] = []
+        self._counter = count()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._reset_peak()
+        self._last_current = tracemalloc.get_traced_memory()[0]
+        if self.top_laps > 0:
+            self._snapshot = self._take_snapshot()
+
+    def lap(self, lap_name: str) -> Tuple[int, int]:
+        """Returns the `(mem_delta, mem_peak)` in bytes of the lap that just
+        ended and starts measuring the next one
+        """
+        if not tracemalloc.is_tracing():
+            return 0, 0
+        current, peak = tracemalloc.get_traced_memory()
+        if not HAS_RESET_PEAK and peak <= self._last_peak:
+            # the peak was reached before this lap
+            peak = max(self._last_current, current)
+        self._reset_peak()
+        mem_delta = current - self._last_current
+        self._last_current = current
+        if self._snapshot is not None:
+            snapshot = self._take_snapshot()
+            if (
+                len(self._heaviest) < self.top_laps
+                or mem_delta > self._heaviest[0][0]
+            ):
+                item = (
+                    mem_delta,
+                    next(self._counter),
+                    lap_name,
+                    self._top_sites(snapshot, self._snapshot)
+                )
+                if len(self._heaviest) < self.top_laps:
+                    heapq.heappush(self._heaviest, item)
+                else:
+                    heapq.heapreplace(self._heaviest, item)
+            self._snapshot = snapshot
+            # the snapshot itself is traced, leave it out of the next lap
+            self._last_current = tracemalloc.get_traced_memory()[0]
+            self._reset_peak()
+        return mem_delta, peak
+
+    def close(self) -> None:
+        self._snapshot = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _reset_peak(self) -> None:
+        """Starts measuring the peak of the next lap"""
+        if HAS_RESET_PEAK:
+            tracemalloc.reset_peak()
+        else:
+            self._last_peak = tracemalloc.get_traced_memory()[1]
+
+    def heaviest_laps(self) -> List[Tuple[int, str, List[str]]]:
+        """Returns `(mem_delta, lap_name, sites)` of the laps with the
+        largest memory delta, largest first
+        """
+        return [
+            (x[0], x[2], x[3]) for x in sorted(self._heaviest, reverse=True)
+        ]
+
+    def report(self) -> str:
+        """Returns the top allocation sites of the heaviest laps"""
+        sections = []
+        for mem_delta, lap_name, sites in self.heaviest_laps():
+            sections.append(
+                f"Top allocation sites of lap '{lap_name}' "
+                f"({bytes_to_str(mem_delta)}):"
+            )
+            sections.append(generate_table(
+                ["Allocation Site", "Size Change", "Count Change"],
+                sites,
+                justification=["<", ">", ">"]
+            ))
+        return NL.join(sections)
+
+    def _top_sites(
+        self,
+        snapshot: tracemalloc.Snapshot,
+        previous: tracemalloc.Snapshot
+    ) -> List[List[str]]:
+        return [
+            [
+                str(stat.traceback),
+                bytes_to_str(stat.size_diff),
+                f"{stat.count_diff:+,}"
+            ]
+            for stat in snapshot.compare_to(previous, "lineno")[
+                :self.top_sites
+            ]
+            if stat.size_diff != 0
+        ]
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
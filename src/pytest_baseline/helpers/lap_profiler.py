@@ -0,0 +1,301 @@
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from pathlib import Path
+from types import CodeType
+from typing import Dict, List, Optional, Tuple, Type
+
+from .printing import generate_table, secs_to_str
+
+NL = "\n"
+
+# (file name, first line number, function name) as used by `pstats`
+FunctionKey = Tuple[str, int, str]
+
+
+def _function_label(func: FunctionKey) -> str:
+    """Short `name (file:line)` label of a profiled function"""
+    filename, lineno, name = func
+    if filename == "~":
+        # builtins, for example `<built-in method time.sleep>`
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def safe_file_name(name: str) -> str:
+    """Replaces the characters of a test node id or lap name that are not
+    safe in a file name
+    """
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")[:120]
+
+
+class LapProfiler(ABC):
+    """Base class of the profilers a `LapWatch` runs between consecutive
+    laps, the profile of each lap is added to the profile of every previous
+    lap with the same name.  `start` is called when the profiler is attached,
+    `lap` at every lap and `close` once the test is done, the time after the
+    last lap is not kept.  Only the thread that started the profiler is
+    profiled, laps recorded by other threads are ignored.
+    """
+    mode = ""
+
+    def __init__(self, top: int = 10) -> None:
+        self.top = top
+        self.lap_names: List[str] = []
+        self.dump_paths: List[Path] = []
+        self._thread_id: Optional[int] = None
+
+    @abstractmethod
+    def start(self) -> None:
+        """Starts profiling the calling thread"""
+
+    @abstractmethod
+    def lap(self, lap_name: str) -> None:
+        """Adds the profile since the previous lap to the named lap"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stops profiling, the profile since the last lap is discarded"""
+
+    @abstractmethod
+    def top_functions(
+        self,
+        lap_name: str
+    ) -> List[Tuple[str, int, float, float]]:
+        """Returns `(function, calls, self time, cumulative time)` of the
+        `top` functions by cumulative time of the named lap
+        """
+
+    @abstractmethod
+    def dump(self, directory: Path, prefix: str) -> List[Path]:
+        """Writes a file per lap name in `directory`, returns their paths
+        and adds them to `dump_paths`
+        """
+
+    def report(self) -> str:
+        """Returns a table of the top functions of each lap name"""
+        sections = []
+        for lap_name in self.lap_names:
+            sections.append(
+                f"Profile of lap '{lap_name}' ({self.mode}), top "
+                f"{self.top} functions by cumulative time:"
+            )
+            sections.append(generate_table(
+                ["Function", "Calls", "Self", "Cumulative"],
+                [
+                    [name, calls, secs_to_str(self_time), secs_to_str(cum)]
+                    for name, calls, self_time, cum
+                    in self.top_functions(lap_name)
+                ],
+                justification=["<", ">", ">", ">"]
+            ))
+        if self.dump_paths:
+            sections.append("Lap profiles written to:")
+            sections.extend(str(x) for x in self.dump_paths)
+        return NL.join(sections)
+
+    def _add_lap_name(self, lap_name: str) -> None:
+        if lap_name not in self.lap_names:
+            self.lap_names.append(lap_name)
+
+
+class CProfileLapProfiler(LapProfiler):
+    """Deterministic profile of each lap with `cProfile`, every function call
+    is counted and timed.  Laps are dumped as `.pstats` files that can be
+    opened with `pstats`, snakeviz or gprof2dot.
+    """
+    mode = "cprofile"
+
+    def __init__(self, top: int = 10) -> None:
+        super().__init__(top)
+        self.stats: Dict[str, pstats.Stats] = {}
+        self._profile: Optional[cProfile.Profile] = None
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def lap(self, lap_name: str) -> None:
+        if self._profile is None or threading.get_ident() != self._thread_id:
+            return
+        self._profile.disable()
+        profile = self._profile
+        self._add_stats(lap_name, profile)
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def close(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile = None
+
+    def top_functions(
+        self,
+        lap_name: str
+    ) -> List[Tuple[str, int, float, float]]:
+        stats = self.stats.get(lap_name)
+        if stats is None:
+            return []
+        rows = sorted(
+            stats.stats.items(), key=lambda x: x[1][3], reverse=True
+        )
+        return [
+            (_function_label(func), calls, self_time, cumulative)
+            for func, (_, calls, self_time, cumulative, _) in rows[:self.top]
+        ]
+
+    def dump(self, directory: Path, prefix: str) -> List[Path]:
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for index, lap_name in enumerate(self.lap_names):
+            path = directory / safe_file_name(
+                f"{prefix}-{index:03d}-{lap_name}.pstats"
+            )
+            self.stats[lap_name].dump_stats(path)
+            paths.append(path)
+        self.dump_paths.extend(paths)
+        return paths
+
+    def _add_stats(self, lap_name: str, profile: cProfile.Profile) -> None:
+        # `Stats` of an empty profile raise a TypeError
+        profile.create_stats()
+        if not profile.stats:
+            return
+        self._add_lap_name(lap_name)
+        if lap_name in self.stats:
+            self.stats[lap_name].add(profile)
+        else:
+            self.stats[lap_name] = pstats.Stats(profile)
+
+
+class SamplingLapProfiler(LapProfiler):
+    """Statistical profile of each lap, a background thread samples the
+    call stack of the thread that started the profiler every `interval`
+    seconds, the overhead does not depend on the number of calls.  Calls
+    are not counted (the sample count is shown instead) and times are
+    estimated from the number of samples.  When `root_code` is passed, for
+    example the code of the test function, stacks start at that function and
+    samples outside of it are dropped.  Laps are dumped as `.folded` stack
+    files for flamegraph tools (flamegraph.pl, speedscope).
+    """
+    mode = "sample"
+
+    def __init__(
+        self,
+        top: int = 10,
+        interval: float = 0.001,
+        root_code: Optional[CodeType] = None
+    ) -> None:
+        super().__init__(top)
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks: Dict[str, Counter] = {}
+        self._current: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pytest-baseline-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def lap(self, lap_name: str) -> None:
+        if threading.get_ident() != self._thread_id:
+            return
+        with self._lock:
+            samples, self._current = self._current, Counter()
+        if not samples:
+            return
+        self._add_lap_name(lap_name)
+        if lap_name in self.stacks:
+            self.stacks[lap_name].update(samples)
+        else:
+            self.stacks[lap_name] = samples
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def top_functions(
+        self,
+        lap_name: str
+    ) -> List[Tuple[str, int, float, float]]:
+        self_samples: Counter = Counter()
+        cumulative_samples: Counter = Counter()
+        for stack, count in self.stacks.get(lap_name, {}).items():
+            self_samples[stack[-1]] += count
+            # recursive functions are only counted once per sample
+            for func in set(stack):
+                cumulative_samples[func] += count
+        return [
+            (
+                _function_label(func),
+                count,
+                self_samples[func] * self.interval,
+                count * self.interval
+            )
+            for func, count in cumulative_samples.most_common(self.top)
+        ]
+
+    def folded(self, lap_name: str) -> str:
+        """Returns the samples of the named lap as folded stacks, one
+        `outer;inner count` line per distinct stack
+        """
+        return NL.join(
+            f"{';'.join(_function_label(x) for x in stack)} {count}"
+            for stack, count in self.stacks.get(lap_name, {}).items()
+        )
+
+    def dump(self, directory: Path, prefix: str) -> List[Path]:
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for index, lap_name in enumerate(self.lap_names):
+            path = directory / safe_file_name(
+                f"{prefix}-{index:03d}-{lap_name}.folded"
+            )
+            path.write_text(self.folded(lap_name) + NL)
+            paths.append(path)
+        self.dump_paths.extend(paths)
+        return paths
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = self._stack(frame)
+            del frame
+            if stack:
+                with self._lock:
+                    self._current[stack] += 1
+
+    def _stack(self, frame) -> Tuple[FunctionKey, ...]:
+        """Returns the functions of a frame's stack, outermost first"""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            if code is self.root_code:
+                break
+            frame = frame.f_back
+        else:
+            if self.root_code is not None:
+                return ()
+        stack.reverse()
+        return tuple(stack)
+
+
+LAP_PROFILERS: Dict[str, Type[LapProfiler]] = {
+    "cprofile": CProfileLapProfiler,
+    "sample": SamplingLapProfiler,
+}
@@ -0,0 +1,306 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .printing import bytes_to_str, generate_table, rate_to_str, secs_to_str
+
+# Values at or below this many seconds are counted in the zero bucket
+MIN_TRACKED_VALUE = 1e-12
+
+
+class LapStats:
+    """Constant memory streaming statistics for lap times.
+
+    Count, sum, min, max, mean and variance (Welford) are exact.  Percentiles
+    and histograms come from a log-bucketed sketch (DDSketch style) whose
+    estimates are within `relative_accuracy` of the true value, the number of
+    buckets only depends on the range of the values (about 1,600 buckets to
+    cover 1ns to 1h at 1%) and not on how many values were added.
+    """
+    __slots__ = (
+        "relative_accuracy", "count", "total", "min", "max", "_mean", "_m2",
+        "_log_gamma", "_inv_log_gamma", "_buckets", "_zero_count"
+    )
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(
+                "`relative_accuracy` must be between 0 and 1, passed: "
+                f"`{relative_accuracy}`"
+            )
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self._inv_log_gamma = 1 / self._log_gamma
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return (
+            f"LapStats(count={self.count}, mean={self.mean}, "
+            f"p50={self.percentile(50)}, max={self.max})"
+        )
+
+    def add(self, value: float) -> None:
+        """Adds a single value to the statistics"""
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        if value <= MIN_TRACKED_VALUE:
+            self._zero_count += 1
+        else:
+            key = math.ceil(math.log(value) * self._inv_log_gamma)
+            self._buckets[key] = self._buckets.get(key, 0) + 1
+
+    def add_many(self, values: Iterable[float]) -> None:
+        """Adds a batch of values, faster than calling `add` for each value:
+        the batch is counted by distinct value (timings from the same clock
+        repeat a lot) and its mean and variance are merged in at once
+        """
+        counts = Counter(values)
+        if not counts:
+            return
+        batch_count = sum(counts.values())
+        batch_total = math.fsum([x * n for x, n in counts.items()])
+        batch_mean = batch_total / batch_count
+        batch_m2 = math.fsum([
+            (x - batch_mean) ** 2 * n for x, n in counts.items()
+        ])
+        count = self.count + batch_count
+        delta = batch_mean - self._mean
+        self._m2 += (
+            batch_m2 + delta * delta * self.count * batch_count / count
+        )
+        self._mean += delta * batch_count / count
+        self.count = count
+        self.total += batch_total
+        self.min = min(self.min, min(counts))
+        self.max = max(self.max, max(counts))
+        buckets = self._buckets
+        for value, value_count in counts.items():
+            if value <= MIN_TRACKED_VALUE:
+                self._zero_count += value_count
+            else:
+                key = math.ceil(math.log(value) * self._inv_log_gamma)
+                buckets[key] = buckets.get(key, 0) + value_count
+
+    def merge(self, other: "LapStats") -> None:
+        """Merges the values of another `LapStats` into this one, both must
+        have been created with the same `relative_accuracy`
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                "Cannot merge LapStats with different `relative_accuracy`"
+            )
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += (
+            other._m2 + delta * delta * self.count * other.count / count
+        )
+        self._mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._zero_count += other._zero_count
+        for key, bucket_count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + bucket_count
+
+    @property
+    def mean(self) -> float:
+        """Average of the values, 0.0 when empty"""
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values"""
+        if self.count == 0:
+            return 0.0
+        return self._m2 / self.count
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation of the values"""
+        return math.sqrt(self.variance)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Returns the estimated value at `percent` (0 - 100), None when no
+        values were added
+        """
+        if self.count == 0:
+            return None
+        if not 0 <= percent <= 100:
+            raise ValueError(
+                f"`percent` must be between 0 and 100, passed: `{percent}`"
+            )
+        rank = percent / 100 * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                return min(max(self._bucket_value(key), self.min), self.max)
+        return self.max
+
+    def histogram(self, bins: int = 10) -> List[Tuple[float, float, int]]:
+        """Returns `bins` equal width `(lower, upper, count)` tuples between
+        the min and max value
+        """
+        if bins < 1:
+            raise ValueError(f"`bins` must be at least 1, passed: `{bins}`")
+        if self.count == 0:
+            return []
+        width = (self.max - self.min) / bins
+        counts = [0] * bins
+        counts[0] += self._zero_count
+        for key, bucket_count in self._buckets.items():
+            value = min(max(self._bucket_value(key), self.min), self.max)
+            index = int((value - self.min) / width) if width > 0 else 0
+            counts[min(index, bins - 1)] += bucket_count
+        return [
+            (self.min + width * index, self.min + width * (index + 1), count)
+            for index, count in enumerate(counts)
+        ]
+
+    def histogram_str(self, bins: int = 10, bar_width: int = 40) -> str:
+        """Returns a printable table of the histogram with text bars"""
+        histogram = self.histogram(bins)
+        most = max([x[2] for x in histogram], default=0)
+        return generate_table(
+            ["From", "To", "Count", ""],
+            [
+                [
+                    secs_to_str(lower),
+                    secs_to_str(upper),
+                    count,
+                    "#" * (round(count / most * bar_width) if most else 0)
+                ]
+                for lower, upper, count in histogram
+            ],
+            justification=[">", ">", ">", "<"]
+        )
+
+    def _bucket_value(self, key: int) -> float:
+        """Representative value of a bucket, within `relative_accuracy` of
+        every value counted in it
+        """
+        gamma = math.exp(self._log_gamma)
+        return 2 * math.exp(key * self._log_gamma) / (gamma + 1)
+
+
+class LapThroughput:
+    """Work units processed by laps: the items and bytes of the laps that
+    passed them and the lap time of those laps, the rates are the totals
+    divided by the time so laps are weighted by their duration
+    """
+    __slots__ = ("items", "items_time", "nbytes", "nbytes_time")
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.items_time = 0.0
+        self.nbytes = 0
+        self.nbytes_time = 0.0
+
+    def __bool__(self) -> bool:
+        return self.items_time > 0 or self.nbytes_time > 0
+
+    def add(
+        self,
+        lap_time: float,
+        items: Optional[int] = None,
+        nbytes: Optional[int] = None
+    ) -> None:
+        if items is not None:
+            self.items += items
+            self.items_time += lap_time
+        if nbytes is not None:
+            self.nbytes += nbytes
+            self.nbytes_time += lap_time
+
+    def merge(self, other: "LapThroughput") -> None:
+        self.items += other.items
+        self.items_time += other.items_time
+        self.nbytes += other.nbytes
+        self.nbytes_time += other.nbytes_time
+
+    @property
+    def items_per_sec(self) -> Optional[float]:
+        """Items per second, None when no lap passed items"""
+        if self.items_time <= 0:
+            return None
+        return self.items / self.items_time
+
+    @property
+    def bytes_per_sec(self) -> Optional[float]:
+        """Bytes per second, None when no lap passed bytes"""
+        if self.nbytes_time <= 0:
+            return None
+        return self.nbytes / self.nbytes_time
+
+
+def lap_throughput_table(throughputs: Dict[str, LapThroughput]) -> str:
+    """Returns a printable table with the items and bytes per second of each
+    `LapThroughput` in the passed dictionary
+    """
+    return generate_table(
+        ["Name", "Items", "Items/s", "Bytes", "Bytes/s"],
+        [
+            [
+                name,
+                f"{throughput.items:,}" if throughput.items_time else "--",
+                rate_to_str(throughput.items_per_sec),
+                (
+                    bytes_to_str(throughput.nbytes)
+                    if throughput.nbytes_time else "--"
+                ),
+                rate_to_str(throughput.bytes_per_sec, "B"),
+            ]
+            for name, throughput in throughputs.items() if throughput
+        ],
+        justification=["<", ">", ">", ">", ">"]
+    )
+
+
+def lap_stats_table(stats: Dict[str, LapStats]) -> str:
+    """Returns a printable table with one row of summary statistics for each
+    `LapStats` in the passed dictionary
+    """
+    return generate_table(
+        [
+            "Name", "Count", "Total", "Mean", "Std", "Min", "p50", "p95",
+            "p99", "Max"
+        ],
+        [
+            [
+                name,
+                stat.count,
+                secs_to_str(stat.total),
+                secs_to_str(stat.mean),
+                secs_to_str(stat.std),
+                secs_to_str(stat.min),
+                secs_to_str(stat.percentile(50)),
+                secs_to_str(stat.percentile(95)),
+                secs_to_str(stat.percentile(99)),
+                secs_to_str(stat.max),
+            ]
+            for name, stat in stats.items() if stat.count > 0
+        ]
+    )
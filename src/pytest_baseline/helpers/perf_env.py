@@ -0,0 +1,164 @@
+import gc
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+NL = "\n"
+
+CPUFREQ_PATH = "/sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_cur_freq"
+CPUINFO_PATH = "/proc/cpuinfo"
+
+
+def parse_cpu_list(cpus: str) -> Set[int]:
+    """Parses a CPU list in the `taskset` format, `0-3,6` is CPUs 0, 1, 2, 3
+    and 6
+    """
+    cpu_set = set()
+    for part in cpus.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpu_set.update(range(int(first), int(last) + 1))
+        else:
+            cpu_set.add(int(part))
+    if not cpu_set:
+        raise ValueError(f"No CPU in the CPU list: `{cpus}`")
+    return cpu_set
+
+
+def load_average() -> Optional[List[float]]:
+    """Returns the 1, 5 and 15 minutes load average, None when the platform
+    does not provide it
+    """
+    try:
+        return list(os.getloadavg())
+    except (AttributeError, OSError):
+        return None
+
+
+def cpu_frequencies(cpus: Optional[Iterable[int]] = None) -> Dict[int, float]:
+    """Returns the current frequency in MHz of the passed CPUs (default all
+    the CPUs), from cpufreq or `/proc/cpuinfo` on Linux, empty when unknown
+    """
+    frequencies = {}
+    cpus = sorted(cpus) if cpus is not None else None
+    for cpu in cpus or []:
+        path = Path(CPUFREQ_PATH.format(cpu=cpu))
+        try:
+            frequencies[cpu] = int(path.read_text()) / 1000
+        except (OSError, ValueError):
+            break
+    else:
+        if frequencies:
+            return frequencies
+    try:
+        cpuinfo = Path(CPUINFO_PATH).read_text()
+    except OSError:
+        return {}
+    cpu = None
+    for line in cpuinfo.splitlines():
+        match = re.match(r"(processor|cpu MHz)\s*:\s*([\d.]+)", line)
+        if match is None:
+            continue
+        if match.group(1) == "processor":
+            cpu = int(match.group(2))
+        elif cpu is not None and (cpus is None or cpu in cpus):
+            frequencies[cpu] = float(match.group(2))
+    return frequencies
+
+
+class NoiseReduction:
+    """Context manager that reduces timing noise for the enclosed code: the
+    cyclic garbage collector is disabled (the `LapWatch` collects between
+    laps instead) and the process is pinned to a fixed set of CPUs, by
+    default the first CPU the process may run on.  Pinning needs
+    `os.sched_setaffinity` (Linux) and is skipped elsewhere.  The load
+    average and CPU frequencies are recorded on enter and exit.
+    """
+
+    def __init__(self, cpus: Optional[Iterable[int]] = None) -> None:
+        self.cpus = set(cpus) if cpus is not None else None
+        self.environment: Dict[str, Any] = {}
+        self._gc_was_enabled = False
+        self._affinity: Optional[Set[int]] = None
+
+    @property
+    def can_pin(self) -> bool:
+        return hasattr(os, "sched_setaffinity")
+
+    def __enter__(self) -> "NoiseReduction":
+        pinned = None
+        if self.can_pin:
+            affinity = os.sched_getaffinity(0)
+            pinned = self.cpus or {min(affinity)}
+            if not pinned <= affinity:
+                raise ValueError(
+                    "Cannot pin to CPUs "
+                    f"{','.join(str(x) for x in sorted(pinned - affinity))}, "
+                    "the process may only run on CPUs "
+                    f"{','.join(str(x) for x in sorted(affinity))}"
+                )
+            os.sched_setaffinity(0, pinned)
+            self._affinity = affinity
+        self._gc_was_enabled = gc.isenabled()
+        try:
+            gc.collect()
+            gc.disable()
+            self.environment = {
+                "gc_disabled": True,
+                "pinned_cpus": sorted(pinned) if pinned else None,
+                "load_average_start": load_average(),
+                "cpu_mhz_start": cpu_frequencies(pinned),
+            }
+        except BaseException:
+            self._restore()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        try:
+            self.environment["load_average_end"] = load_average()
+            self.environment["cpu_mhz_end"] = cpu_frequencies(
+                self.environment["pinned_cpus"]
+            )
+        finally:
+            self._restore()
+
+    def _restore(self) -> None:
+        """Restores the CPU affinity and the garbage collector"""
+        try:
+            if self._affinity is not None:
+                os.sched_setaffinity(0, self._affinity)
+                self._affinity = None
+        finally:
+            if self._gc_was_enabled:
+                gc.enable()
+
+    def report(self) -> str:
+        """Returns the recorded environment as printable lines"""
+        env = self.environment
+        pinned = env.get("pinned_cpus")
+        lines = [
+            "Noise reduction: cyclic GC disabled during the test and "
+            "collected between laps, "
+            + (
+                f"pinned to CPUs {','.join(str(x) for x in pinned)}"
+                if pinned else "CPU pinning not supported"
+            )
+        ]
+        for when in ("start", "end"):
+            load = env.get(f"load_average_{when}")
+            mhz = env.get(f"cpu_mhz_{when}") or {}
+            lines.append(
+                f"  at {when}: load average "
+                + ("/".join(f"{x:.2f}" for x in load) if load else "unknown")
+                + ", CPU MHz "
+                + (
+                    ", ".join(f"{cpu}: {x:.0f}" for cpu, x in mhz.items())
+                    if mhz else "unknown"
+                )
+            )
+        return NL.join(lines)
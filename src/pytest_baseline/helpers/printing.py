@@ -1,9 +1,19 @@
 import datetime
 import json
+import reprlib
 import time
-from inspect import cleandoc
+import weakref
+from array import array
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
+from inspect import cleandoc, ismethod
+from itertools import chain, islice
 from textwrap import indent
-from typing import Any, Dict, Generator, List, Optional, Union
+from typing import (Any, Dict, Generator, Iterable, List, Optional, Sequence,
+                    Tuple, Union)
+
+from .heavy_hitters import SpaceSaving
+from .json_backends import DEFAULT_JSON_BACKEND, FAST_ENCODERS, fast_json_dumps
 
 NL = "\n"
 
@@ -14,16 +24,28 @@ def dir_str_of_object(
     filter__: bool = True,
     max_len: Optional[int] = 500,
     filter_keys: Optional[List[str]] = None,
-    fill_char: str = "."
+    fill_char: str = ".",
+    bounded: bool = False,
+    attribute_time_limit: float = 0.5,
+    time_limit: float = 5.0
 ) -> str:
     """Returns a sting with joined properties of the passed object for printing
     Intended to be used to help see what is available in object, This should
     only be used as a tool to assist in troubleshooting
+
+    Pass `bounded` for objects whose attributes are expensive (for example
+    ORM models with lazy loading attributes): containers are printed with a
+    size limited repr (`reprlib`) and methods without the repr of the object,
+    errors raised by attributes are printed instead of raised, no attribute
+    is evaluated once the dump took over `time_limit` seconds, and attributes
+    that took over `attribute_time_limit` seconds are not evaluated again by
+    later bounded dumps of the same type during the test (see
+    `SLOW_ATTRIBUTES`).  The attribute names of a type are cached.
     """
     if filter_keys is None:
         filter_keys = []
 
-    obj_dir = list(dir(obj))
+    obj_dir = _type_dir(obj) if bounded else list(dir(obj))
 
     # Filter private methods, attributes that start with "_"
     if filter_:
@@ -50,20 +72,20 @@ def dir_str_of_object(
                 return indent(temp_rtn, " " * ind_len)[ind_len:]
             return temp_rtn
 
-        def get_str_attribute(obj, attr):
-            attr_value = getattr(obj, attr)
-            try:
-                return str(attr_value)
-            except TypeError:
-                return f"TypeError: None {type(attr_value)}"
+        if bounded:
+            attributes = _bounded_attributes(
+                obj, obj_dir, max_len, attribute_time_limit, time_limit
+            )
+        else:
+            attributes = _str_attributes(obj, obj_dir)
 
         # format and return string
         val_ind = hdr_w + 3
         attr_str = NL.join(
             [
                 f"{x:{fill_char}>{hdr_w}} : "
-                f"{new_lines(get_str_attribute(obj, x), val_ind)[0:max_len]}"
-                for x in obj_dir if hasattr(obj, x)
+                f"{new_lines(attr_value, val_ind)[0:max_len]}"
+                for x, attr_value in attributes
             ]
         )
     else:
@@ -74,13 +96,190 @@ def dir_str_of_object(
     return f"{NL}{type(obj)}:{NL}{attr_str}{NL}"
 
 
+def _str_attributes(
+    obj: Any,
+    names: List[str]
+) -> Generator[Tuple[str, str], None, None]:
+    """Returns the name and string value of each attribute the object has,
+    every attribute is evaluated once
+    """
+    for name in names:
+        try:
+            attr_value = getattr(obj, name)
+        except AttributeError:
+            continue
+        try:
+            yield name, str(attr_value)
+        except TypeError:
+            yield name, f"TypeError: None {type(attr_value)}"
+
+
+# Attribute names by type, types are not kept alive by the cache
+TYPE_ATTRIBUTES: "weakref.WeakKeyDictionary[type, Tuple[str, ...]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _type_attributes(cls: type) -> Tuple[str, ...]:
+    names = TYPE_ATTRIBUTES.get(cls)
+    if names is None:
+        names = TYPE_ATTRIBUTES[cls] = tuple(type.__dir__(cls))
+    return names
+
+
+def _type_dir(obj: Any) -> List[str]:
+    """Returns `dir(obj)` from the cached attribute names of its type and the
+    names of its instance dictionary, types with their own `__dir__` are
+    not cached
+    """
+    cls = type(obj)
+    if cls.__dir__ is not object.__dir__:
+        return list(dir(obj))
+    names = set(_type_attributes(cls))
+    instance_dict = getattr(obj, "__dict__", None)
+    if isinstance(instance_dict, dict):
+        names.update(instance_dict)
+    return sorted(names)
+
+
+class SlowAttributes:
+    """Duration of the attributes, by type and name, that took over their
+    `attribute_time_limit` in a bounded `dir_str_of_object`.  At most
+    `max_size` attributes are remembered, the oldest are forgotten first,
+    and types are not kept alive.  The process wide `SLOW_ATTRIBUTES` is
+    reset after every test by the plugin.
+    """
+
+    def __init__(self, max_size: int = 1000) -> None:
+        self.max_size = max_size
+        self._durations: "OrderedDict[Tuple[weakref.ref, str], float]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._durations)
+
+    def get(self, cls: type, name: str) -> Optional[float]:
+        """Returns the duration of a slow attribute, None when it was not
+        slow
+        """
+        return self._durations.get((weakref.ref(cls), name))
+
+    def add(self, cls: type, name: str, duration: float) -> None:
+        """Remembers a slow attribute"""
+        self._durations[(weakref.ref(cls), name)] = duration
+        while len(self._durations) > self.max_size:
+            self._durations.popitem(last=False)
+
+    def reset(self) -> None:
+        self._durations.clear()
+
+
+SLOW_ATTRIBUTES = SlowAttributes()
+
+# Integers over this size are printed as their size, not their digits
+MAX_INT_BITS = 10_000
+
+# Types printed with the size limited repr of the `reprlib.Repr` method of
+# the same name, subclasses included
+REPR_LIMITED_TYPES = (
+    (dict, "repr_dict"),
+    (list, "repr_list"),
+    (tuple, "repr_tuple"),
+    (set, "repr_set"),
+    (frozenset, "repr_frozenset"),
+    (deque, "repr_deque"),
+    (array, "repr_array"),
+)
+
+
+def _bounded_attributes(
+    obj: Any,
+    names: List[str],
+    max_len: Optional[int],
+    attribute_time_limit: float,
+    time_limit: float
+) -> Generator[Tuple[str, str], None, None]:
+    """Returns the name and size limited string value of each attribute the
+    object has, see `dir_str_of_object`
+    """
+    cls = type(obj)
+    limited_repr = reprlib.Repr()
+    if max_len is not None:
+        limited_repr.maxstring = limited_repr.maxother = max_len
+    started = time.perf_counter()
+    for name in names:
+        slow = SLOW_ATTRIBUTES.get(cls, name)
+        if slow is not None:
+            yield name, (
+                f"<not evaluated, took {secs_to_str(slow)} in a previous "
+                "dump>"
+            )
+            continue
+        if time.perf_counter() - started > time_limit:
+            yield name, (
+                f"<not evaluated, dump time limit of "
+                f"{secs_to_str(time_limit)} reached>"
+            )
+            continue
+        attr_started = time.perf_counter()
+        try:
+            attr_value = getattr(obj, name)
+        except AttributeError:
+            continue
+        except Exception as err:
+            attr_str = f"<{type(err).__name__} raised: {err}>"
+        else:
+            try:
+                attr_str = _bounded_str(attr_value, limited_repr, max_len)
+            except Exception as err:
+                attr_str = f"<{type(err).__name__} raised: {err}>"
+        duration = time.perf_counter() - attr_started
+        if duration > attribute_time_limit:
+            SLOW_ATTRIBUTES.add(cls, name, duration)
+        yield name, attr_str
+
+
+def _bounded_str(
+    value: Any,
+    limited_repr: reprlib.Repr,
+    max_len: Optional[int]
+) -> str:
+    """Returns the string of an attribute value, strings, bytes, integers
+    and containers are limited before the whole string is built, other
+    objects are converted with `str()`
+    """
+    if isinstance(value, str):
+        return value[0:max_len]
+    if isinstance(value, (bytes, bytearray)):
+        if max_len is not None and len(value) > max_len:
+            return repr(value[0:max_len]) + "..."
+        return repr(value)
+    if type(value) is int:
+        # the digits of large integers take quadratic time to compute
+        if value.bit_length() > MAX_INT_BITS:
+            return f"<int of {value.bit_length():,} bits>"
+        return limited_repr.repr_int(value, limited_repr.maxlevel)
+    for cls, method in REPR_LIMITED_TYPES:
+        if isinstance(value, cls):
+            return getattr(limited_repr, method)(value, limited_repr.maxlevel)
+    if ismethod(value):
+        return f"<bound method {value.__func__.__qualname__}>"
+    try:
+        return str(value)[0:max_len]
+    except TypeError:
+        return f"TypeError: None {type(value)}"
+
+
 def center_dict_str(
     data: Dict[str, Any],
     delimiter: str = " : ",
     fill: str = " ",
     indent_len: int = 0,
     key_justification: str = ">",
-    value_justification: str = "<"
+    value_justification: str = "<",
+    max_depth: Optional[int] = None,
+    max_items: Optional[int] = None
 ) -> str:
     """Generates the string for a Dictionary centering on the delimiter
     between the Key and Value, Values whose __str__ method returns a string
@@ -88,64 +287,152 @@ def center_dict_str(
     will be centered and indented to fit in the Value column.  Any sub item
     that is JSON Serializable will be json.dump'd indented to fit in the Value
     column.
+
+    Sub dictionaries more than `max_depth` levels deep are elided as
+    `{... N keys}` and only the first `max_items` keys of each dictionary are
+    printed, followed by a `... : N more keys` line.
+    """
+    if max_items is not None and max_items < 1:
+        raise ValueError(f"max_items must be at least 1: {max_items}")
+    return _DictLayout(
+        delimiter,
+        fill,
+        key_justification,
+        value_justification,
+        max_depth,
+        max_items
+    ).render(data, indent_len, 0)
+
+
+class _DictLayout:
+    """Renders `center_dict_str`.  A value is measured in the Value column
+    without indentation and then rendered indented to it, every value is
+    converted to a string once and every sub dictionary is rendered once per
+    indentation it is printed at (with or without the indentation of its
+    parent) instead of twice at every level of nesting.  Results are cached
+    by object id with the object, so the ids stay unique while rendering.
     """
-    def new_lines(item: Any, ind_len: int) -> str:
-        if isinstance(item, dict):
-            return center_dict_str(
-                item,
-                delimiter=delimiter,
-                fill=fill,
-                indent_len=ind_len,
-                key_justification=key_justification,
-                value_justification=value_justification
-            )[ind_len:]
-        if isinstance(item, list):
-            try:
-                temp_rtn = json_dumps(item, indent=4)
-            except Exception:
-                temp_rtn = str(item)
-        else:
-            temp_rtn = str(item)
-        if f"{NL}" in temp_rtn:
-            temp_rtn = cleandoc(temp_rtn)
-            return indent(temp_rtn, " " * ind_len)[ind_len:]
-        return temp_rtn
 
-    def get_str_value(obj, key):
-        key_value = obj.get(key)
-        try:
-            str(key_value)
+    def __init__(
+        self,
+        delimiter: str,
+        fill: str,
+        key_justification: str,
+        value_justification: str,
+        max_depth: Optional[int],
+        max_items: Optional[int]
+    ) -> None:
+        self.delimiter = delimiter
+        self.fill = fill
+        self.key_justification = key_justification
+        self.value_justification = value_justification
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self._strings: Dict[int, Tuple[Any, Optional[str]]] = {}
+        self._texts: Dict[int, Tuple[Any, str]] = {}
+        self._lines: Dict[Tuple[int, int, int], Tuple[Any, str]] = {}
+
+    def string(self, item: Any) -> Optional[str]:
+        """Returns `str(item)`, None when its __str__ raises a TypeError"""
+        cached = self._strings.get(id(item))
+        if cached is None:
+            try:
+                text = str(item)
+            except TypeError:
+                text = None
+            cached = self._strings[id(item)] = (item, text)
+        return cached[1]
+
+    def value_of(self, data: Dict[str, Any], key: str) -> Any:
+        key_value = data.get(key)
+        # sub dictionaries are rendered or elided, never converted whole
+        if isinstance(key_value, dict):
             return key_value
-        except TypeError:
+        if self.string(key_value) is None:
             return f"TypeError: None {type(key_value)}"
+        return key_value
 
-    if len(data.keys()) == 0:
-        return ""
+    def text(self, item: Any) -> str:
+        """Returns the string of a value that is not a dictionary, lists are
+        json.dump'd
+        """
+        cached = self._texts.get(id(item))
+        if cached is None:
+            if isinstance(item, list):
+                try:
+                    temp_rtn = json_dumps(item, indent=4)
+                except Exception:
+                    temp_rtn = str(item)
+            else:
+                temp_rtn = self.string(item)
+            if f"{NL}" in temp_rtn:
+                temp_rtn = cleandoc(temp_rtn)
+            cached = self._texts[id(item)] = (item, temp_rtn)
+        return cached[1]
+
+    def new_lines(self, item: Any, ind_len: int, depth: int) -> str:
+        """Returns the string of a value with its lines after the first
+        indented by `ind_len`
+        """
+        key = (id(item), ind_len, depth)
+        cached = self._lines.get(key)
+        if cached is not None:
+            return cached[1]
+        if isinstance(item, dict):
+            if self.max_depth is not None and depth >= self.max_depth:
+                rtn = f"{{... {len(item):,} keys}}"
+            else:
+                rtn = self.render(item, ind_len, depth + 1)[ind_len:]
+        else:
+            rtn = self.text(item)
+            if f"{NL}" in rtn:
+                rtn = indent(rtn, " " * ind_len)[ind_len:]
+        self._lines[key] = (item, rtn)
+        return rtn
+
+    def render(self, data: Dict[str, Any], indent_len: int, depth: int) -> str:
+        if len(data.keys()) == 0:
+            return ""
+        keys = list(data.keys())
+        more_keys = 0
+        if self.max_items is not None and len(keys) > self.max_items:
+            more_keys = len(keys) - self.max_items
+            keys = keys[:self.max_items]
+        rows = [
+            (str(k), self.value_of(data, k),
+             str(k).startswith("LEAVE_LINE_AS_IS"))
+            for k in keys
+        ]
 
-    hdr_w = max(
-        [
-            len(str(k)) for k in data.keys()
-            if not str(k).startswith("LEAVE_LINE_AS_IS")
+        hdr_w = max([len(k) for k, _, leave in rows if not leave])
+        if more_keys:
+            hdr_w = max(hdr_w, 3)
+        val_ind = hdr_w + len(self.delimiter) + indent_len
+        val_w = max([
+            len(i)
+            for _, value, leave in rows
+            if not leave
+            for i in self.new_lines(value, 0, depth).split("\n")
+        ])
+        ind_str = f"{'':{self.fill}^{indent_len}}"
+        fill = self.fill
+        key_just = self.key_justification
+        val_just = self.value_justification
+        lines = [
+            (
+                f"{ind_str}{k:{fill}{key_just}{hdr_w}}{self.delimiter}"
+                f"{self.new_lines(value, val_ind, depth):{val_just}{val_w}}"
+            ).rstrip(" ")
+            if not leave
+            else f"{ind_str}{self.string(value):{val_just}{val_w}}"
+            for k, value, leave in rows
         ]
-    )
-    val_ind = hdr_w + len(delimiter) + indent_len
-    val_w = max([
-        len(i)
-        for k in data.keys()
-        if not str(k).startswith("LEAVE_LINE_AS_IS")
-        for i in new_lines(get_str_value(data, k), 0).split("\n")
-    ])
-    ind_str = f"{'':{fill}^{indent_len}}"
-    val_just = value_justification
-    return NL.join([
-        (
-            f"{ind_str}{str(k):{fill}{key_justification}{hdr_w}}{delimiter}"
-            f"{new_lines(get_str_value(data, k), val_ind):{val_just}{val_w}}"
-        ).rstrip(" ")
-        if not str(k).startswith("LEAVE_LINE_AS_IS")
-        else f"{ind_str}{str(get_str_value(data, k)):{val_just}{val_w}}"
-        for k in data.keys()
-    ])
+        if more_keys:
+            lines.append(
+                f"{ind_str}{'...':{fill}{key_just}{hdr_w}}{self.delimiter}"
+                f"{more_keys:,} more keys"
+            )
+        return NL.join(lines)
 
 
 def block_center_str(data: str, split_delimiter: str = ":", **kwargs):
@@ -234,13 +521,88 @@ def ellipsis_print(string: str, length: int) -> str:
     return string
 
 
+class TableFormatter:
+    """The lines of a table with fixed column widths, justifications and
+    border, compiled once: the row and header templates are format strings
+    with one positional field per column and the divider and border lines are
+    plain strings.  Use `table_formatter` to share the formatter of the same
+    layout between tables.
+    """
+
+    def __init__(
+        self,
+        widths: Sequence[int],
+        justifications: Sequence[str],
+        border: bool = True
+    ) -> None:
+        if len(widths) != len(justifications):
+            raise TypeError(
+                "justifications must be same length as widths: widths "
+                f"length {len(widths)}, justifications length "
+                f"{len(justifications)}"
+            )
+        self.widths = tuple(widths)
+        self.justifications = tuple(justifications)
+        self.border = border
+        row = " | ".join(
+            f"{{:{just}{width}}}"
+            for just, width in zip(self.justifications, self.widths)
+        )
+        header = " | ".join(f"{{:^{width}}}" for width in self.widths)
+        divider = "-+-".join("-" * width for width in self.widths)
+        if border:
+            row = "| " + row + " |"
+            header = "| " + header + " |"
+            divider = "|-" + divider + "-|"
+            self.top = "._" + "___".join("_" * x for x in self.widths) + "_."
+            self.bottom = (
+                "|_" + "_|_".join("_" * x for x in self.widths) + "_|"
+            )
+        else:
+            self.top = self.bottom = None
+        self.divider = divider
+        self.inner_width = sum(self.widths) + 3 * (len(self.widths) - 1)
+        self._row = row.format
+        self._header = header.format
+        self._span = f"{{:^{self.inner_width}}}"
+        if border:
+            self._span = "| " + self._span + " |"
+        self._span = self._span.format
+
+    def row(self, cells: Sequence[str]) -> str:
+        """Returns the line of a row of cell strings"""
+        return self._row(*cells)
+
+    def header(self, cells: Sequence[str]) -> str:
+        """Returns the line of the header cell strings, always centered"""
+        return self._header(*cells)
+
+    def span(self, text: str) -> str:
+        """Returns a line with the text centered across all the columns"""
+        return self._span(text)
+
+
+@lru_cache(maxsize=256)
+def table_formatter(
+    widths: Tuple[int, ...],
+    justifications: Tuple[str, ...],
+    border: bool = True
+) -> TableFormatter:
+    """Returns the cached `TableFormatter` of a table layout, tables printed
+    repeatedly with the same widths reuse their compiled templates
+    """
+    return TableFormatter(widths, justifications, border)
+
+
 def generate_table(
         headers: List[str],
         content: List[List[str]],
         border: bool = True,
         column_padding: int = 0,
         justification: Union[str, List[str]] = "^",
-        use_checks: bool = False):
+        use_checks: bool = False,
+        max_rows: Optional[int] = None,
+        summarize_omitted: bool = True):
     return "\n".join(
         list(generate_table_iter(
             headers,
@@ -248,91 +610,268 @@ def generate_table(
             border,
             column_padding,
             justification,
-            use_checks
+            use_checks,
+            max_rows=max_rows,
+            summarize_omitted=summarize_omitted
         ))
     )
 
 
+class _OmittedRows(str):
+    """Content line of `generate_table_iter` printed across the columns in
+    place of the rows left out by `max_rows`
+    """
+
+
+def _number_str(value: Union[int, float]) -> str:
+    if isinstance(value, int):
+        return f"{value:,}"
+    return f"{value:,.6g}"
+
+
+class _NumericSummary:
+    """Count, min and max of the numeric cells of each column of the rows
+    added
+    """
+
+    def __init__(self) -> None:
+        self.counts: List[int] = []
+        self.minimums: List[Any] = []
+        self.maximums: List[Any] = []
+
+    def add(self, row: Any) -> None:
+        if not isinstance(row, (list, tuple)):
+            return
+        counts = self.counts
+        if len(row) > len(counts):
+            extra = len(row) - len(counts)
+            counts.extend([0] * extra)
+            self.minimums.extend([None] * extra)
+            self.maximums.extend([None] * extra)
+        for index, cell in enumerate(row):
+            if (
+                not isinstance(cell, (int, float))
+                or isinstance(cell, bool)
+                or cell != cell
+            ):
+                continue
+            if counts[index] == 0:
+                self.minimums[index] = self.maximums[index] = cell
+            elif cell < self.minimums[index]:
+                self.minimums[index] = cell
+            elif cell > self.maximums[index]:
+                self.maximums[index] = cell
+            counts[index] += 1
+
+    def cells(self) -> Optional[List[str]]:
+        """Returns the summary cell of each column, empty for columns without
+        numbers, None when no cell was numeric
+        """
+        if not any(self.counts):
+            return None
+        return [
+            "" if count == 0 else (
+                f"count {count:,}{NL}min {_number_str(minimum)}{NL}"
+                f"max {_number_str(maximum)}"
+            )
+            for count, minimum, maximum in zip(
+                self.counts, self.minimums, self.maximums
+            )
+        ]
+
+
+def _elide_rows(
+    content: Iterable[Any],
+    max_rows: int,
+    summarize_omitted: bool
+) -> List[Any]:
+    """Returns the first and last content lines, `max_rows` in total, with
+    the omitted lines replaced by an `_OmittedRows` line and the numeric
+    summary of the omitted rows.  Sequences are sliced, so only the returned
+    lines are read (and the omitted ones when summarized), other iterables
+    are read through keeping the last lines.
+    """
+    if max_rows < 1:
+        raise ValueError(f"max_rows must be at least 1: {max_rows}")
+    head_count = (max_rows + 1) // 2
+    tail_count = max_rows - head_count
+    summary = _NumericSummary()
+    if isinstance(content, Sequence):
+        if len(content) <= max_rows:
+            return list(content)
+        tail_start = len(content) - tail_count
+        head = list(content[:head_count])
+        tail = list(content[tail_start:])
+        omitted_count = tail_start - head_count
+        if summarize_omitted:
+            for index in range(head_count, tail_start):
+                summary.add(content[index])
+    else:
+        lines = iter(content)
+        head = list(islice(lines, head_count))
+        tail = deque(islice(lines, tail_count), maxlen=tail_count)
+        omitted_count = 0
+        for line in lines:
+            omitted = tail[0] if tail_count else line
+            if summarize_omitted:
+                summary.add(omitted)
+            if tail_count:
+                tail.append(line)
+            omitted_count += 1
+        if omitted_count == 0:
+            return head + list(tail)
+    plural = "" if omitted_count == 1 else "s"
+    lines = [
+        *head,
+        "break",
+        _OmittedRows(f"... {omitted_count:,} row{plural} omitted ..."),
+    ]
+    summary_cells = summary.cells()
+    if summary_cells is not None:
+        lines.append(summary_cells)
+    if tail:
+        lines.append("break")
+        lines.extend(tail)
+    return lines
+
+
 def generate_table_iter(
     headers: Union[List[str], None],
-    content: List[List[str]],
+    content: Iterable[List[str]],
     border: bool = True,
     column_padding: int = 0,
     justification: Union[str, List[str]] = "^",
     use_checks: bool = False,
-    cell_limit: int = 500
+    cell_limit: int = 500,
+    widths: Optional[List[int]] = None,
+    sample_size: Optional[int] = None,
+    max_rows: Optional[int] = None,
+    summarize_omitted: bool = True
 ) -> Generator[str, None, None]:
-    """Returns a printable Table line that has the formatting and spacing"""
+    """Returns a printable Table line that has the formatting and spacing.
+
+    By default `content` must be a list, it is read once to size the columns
+    before the first line is returned, only the lines of multi-line cells are
+    kept between the two passes.  Pass `widths` (the minimum width of each
+    column's content) and/or `sample_size` to stream the table instead:
+    `content` can then be any iterable (for example a generator), only the
+    first `sample_size` rows are read ahead to size the columns, and every
+    row is converted to strings once and formatted as it is read, so the
+    table can be written to a file or terminal without being held in memory.
+    Cells of later rows that are wider than their column overflow it.
+
+    With `max_rows` only the first and last `max_rows` content lines are
+    printed, around a `... N rows omitted ...` line followed by the count,
+    min and max of the numbers of each column of the omitted rows (unless
+    `summarize_omitted` is False).  Only the printed lines size the columns,
+    and when `content` is a sequence only they are read (and the omitted
+    lines to summarize them), so a preview of a table of millions of rows
+    costs the rows it prints.
+    """
+    if max_rows is not None:
+        content = _elide_rows(content, max_rows, summarize_omitted)
+    streaming = widths is not None or sample_size is not None
+    rows = iter(content)
+    if streaming:
+        sample = list(islice(rows, sample_size or 0))
+    else:
+        if not isinstance(content, list):
+            raise TypeError(
+                f"Content must be of type 'list': {type(content)}"
+            )
+        sample = content
+        rows = iter(())
 
     # Check for No Headers
     if headers is None:
         include_header = False
-        headers = [
-            "" for _ in range(max([len(x) for x in content if x != "break"]))
-        ]
+        column_count = max(
+            [len(x) for x in sample if isinstance(x, (list, tuple))]
+            + ([len(widths)] if widths is not None else [])
+        )
+        headers = ["" for _ in range(column_count)]
     else:
         include_header = True
 
     # Check for correct Types
     if not isinstance(headers, list):
         raise TypeError(f"Headers must be of type 'list': {type(content)}")
-    if not isinstance(content, list):
-        raise TypeError(f"Content must be of type 'list': {type(content)}")
+    column_count = len(headers)
+    if widths is not None and len(widths) != column_count:
+        raise TypeError(
+            "widths must be same length as headers: headers length "
+            f"{column_count}, widths length {len(widths)}"
+        )
 
     # Set Checks and Crosses if Desired
+    replacements = {}
     if use_checks:
-        check = "\u2713"
-        check_replace = ["y", "Y"]
-        cross = "\u2717"
-        cross_replace = ["n", "N"]
-        for l_index, line in enumerate(content):
-            if line != "break":
-                for i_index, item in enumerate(line):
-                    if item in check_replace:
-                        content[l_index][i_index] = check
-                    elif item in cross_replace:
-                        content[l_index][i_index] = cross
-
-    # Determine max Width of column
-    widths = [len(str(x)) for x in headers]
-    for line in content:
+        replacements = dict.fromkeys(["y", "Y"], "\u2713")
+        replacements.update(dict.fromkeys(["n", "N"], "\u2717"))
+
+    def cells_of(line) -> List[str]:
+        if replacements:
+            return [
+                replacements.get(x, x) if isinstance(x, str) else str(x)
+                for x in line
+            ]
+        return [str(x) for x in line]
+
+    def render(line):
+        """Returns the cell strings of a line and the lines of each cell
+        when a cell has several lines (else None), None for a break
+        """
+        if isinstance(line, _OmittedRows):
+            return line
         if not isinstance(line, (list, tuple)):
             if line != "break":
                 raise TypeError("Content line item must be of type 'list'")
-        elif len(line) != len(headers):
+            return None
+        if len(line) != column_count:
             raise TypeError(
                 "Content line item must be same length as 'headers'"
             )
-        else:
-            # max_nl = max([len(str(x).split("\n")) for x in line])
-            for item_index, line_item in enumerate(line):
-                split_nl = str(line_item).split("\n")
-                max_width = max([
-                    len(x) if len(x) <= cell_limit else cell_limit
-                    for x in split_nl
-                ])
-                if (max_width > widths[item_index]):
-                    widths[item_index] = max_width
-
-    # Handle New Lines in cell
-    new_content = []
-    for line in content:
-        max_nl = max([len(str(x).split("\n")) for x in line])
-        if max_nl > 1:
-            split_cells = [str(x).split("\n") for x in line]
-            for nl_cnt in range(max_nl):
-                nl_line = []
-                for cell in split_cells:
-                    if len(cell) <= nl_cnt:
-                        nl_line.append("")
-                    else:
-                        nl_line.append(cell[nl_cnt][0:cell_limit])
-                new_content.append(nl_line)
-        else:
-            new_content.append(line)
-
-    # Add Column Padding to widths
-    widths = [x + column_padding for x in widths]
+        cells = cells_of(line)
+        for cell in cells:
+            if "\n" in cell:
+                return cells, [x.split("\n") for x in cells]
+        return cells, None
+
+    # Determine max Width of column, keeping the rendered sample when
+    # streaming and the lines of multi-line cells by line index otherwise
+    rendered_lines = map(render, sample)
+    if streaming:
+        rendered_lines = rendered_sample = list(rendered_lines)
+    multi_lines: Dict[int, List[List[str]]] = {}
+    column_widths = [len(str(x)) for x in headers]
+    if widths is not None:
+        column_widths = [max(x) for x in zip(column_widths, widths)]
+    span_width = 0
+    for line_index, rendered in enumerate(rendered_lines):
+        if rendered is None:
+            continue
+        if isinstance(rendered, _OmittedRows):
+            span_width = max(span_width, len(rendered))
+            continue
+        cells, split_cells = rendered
+        if split_cells is not None and not streaming:
+            multi_lines[line_index] = split_cells
+        for index, cell in enumerate(cells):
+            if split_cells is None:
+                width = min(len(cell), cell_limit)
+            else:
+                width = max(
+                    min(len(x), cell_limit) for x in split_cells[index]
+                )
+            if width > column_widths[index]:
+                column_widths[index] = width
+
+    # Add Column Padding to widths, widening the last column for the
+    # omitted rows line
+    column_widths = [x + column_padding for x in column_widths]
+    inner_width = sum(column_widths) + 3 * (len(column_widths) - 1)
+    if span_width > inner_width:
+        column_widths[-1] += span_width - inner_width
 
     # Create justifications array
     if isinstance(justification, list):
@@ -346,54 +885,65 @@ def generate_table_iter(
     else:
         justifications = [justification for _ in headers]
 
-    # Generate Formatting strings
-    line_item = " | ".join(
-        [
-            f"{{x[{index}]:{justifications[index]}{width}}}"
-            for index, width in enumerate(widths)
-        ]
-    )
-    header_line = " | ".join(
-        [f"{{x[{index}]:^{width}}}" for index, width in enumerate(widths)]
-    )
-    divider = "-+-".join(
-        [f"{{x[{index}]:-^{width}}}" for index, width in enumerate(widths)]
+    # Compiled formatting strings, shared by tables of the same layout
+    formatter = table_formatter(
+        tuple(column_widths), tuple(justifications), bool(border)
     )
+    row = formatter.row
+    divider = formatter.divider
 
     # Add Border
     if border:
-        line_item = "| " + line_item + " |"
-        header_line = "| " + header_line + " |"
-        divider = "|-" + divider + "-|"
-        border = "___".join(
-            [f"{{x[{index}]:_^{width}}}" for index, width in enumerate(widths)]
-        )
-        yield "._" + border.format(x=["" for x in headers]) + "_."
-        border = "_|_".join(
-            [f"{{x[{index}]:_^{width}}}" for index, width in enumerate(widths)]
-        )
+        yield formatter.top
 
     # Add Header and Divider
     if include_header:
-        yield header_line.format(x=[str(x) for x in headers])
-        yield divider.format(x=["" for x in headers])
+        yield formatter.header([str(x) for x in headers])
+        yield divider
 
-    # Add Line Items
-    for line in new_content:
-        if line == "break":
-            yield divider.format(x=["" for x in headers])
-        else:
-            yield line_item.format(x=[str(x) for x in line])
+    # Add Line Items, when streaming the sized sample then the rest of the
+    # rows
+    if streaming:
+        rendered_lines = chain(rendered_sample, map(render, rows))
+    else:
+        rendered_lines = (
+            line if isinstance(line, _OmittedRows)
+            else None if not isinstance(line, (list, tuple))
+            else (None, multi_lines[line_index]) if line_index in multi_lines
+            else (cells_of(line), None)
+            for line_index, line in enumerate(content)
+        )
+    for rendered in rendered_lines:
+        if rendered is None:
+            yield divider
+            continue
+        if isinstance(rendered, _OmittedRows):
+            yield formatter.span(rendered)
+            continue
+        cells, split_cells = rendered
+        if split_cells is None:
+            yield row(cells)
+            continue
+        for nl_cnt in range(max(len(x) for x in split_cells)):
+            yield row([
+                x[nl_cnt][0:cell_limit] if len(x) > nl_cnt else ""
+                for x in split_cells
+            ])
 
     # Add Border
     if border:
-        yield "|_" + border.format(x=["" for x in headers]) + "_|"
+        yield formatter.bottom
 
 
 def secs_to_str(seconds: Union[int, float]) -> str:
     """Returns the string representation of the passed seconds in
-    `%Hh %Mm %S.%ms` format
+    `%Hh %Mm %S.%ms` format, durations under a millisecond are returned in
+    microseconds (`%.3fµs`) or nanoseconds (`%dns`)
     """
+    if 0 < abs(seconds) < 1e-6:
+        return f"{seconds * 1e9:.0f}ns"
+    if 0 < abs(seconds) < 1e-3:
+        return f"{seconds * 1e6:.3f}µs"
     seconds = round(seconds, 3)
     hrs = int(seconds // 3600)
     time_left = seconds - (hrs * 3600)
@@ -420,54 +970,286 @@ def secs_to_str(seconds: Union[int, float]) -> str:
     return rtn_str
 
 
+def bytes_to_str(num_bytes: Union[int, float]) -> str:
+    """Returns the string representation of a (signed) number of bytes in
+    binary units, `512 B`, `1.5 KiB`, `-3.25 MiB`
+    """
+    value = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            break
+        value /= 1024
+    if unit == "B":
+        return f"{num_bytes:.0f} B"
+    return f"{value:.2f} {unit}"
+
+
+def rate_to_str(per_sec: Optional[float], unit: str = "items") -> str:
+    """Returns the string representation of a throughput, `1,234 items/s`,
+    `2.50 items/s`, with `unit="B"` in binary units `1.50 MiB/s`, `--` when
+    the rate is unknown
+    """
+    if per_sec is None:
+        return "--"
+    if unit == "B":
+        return f"{bytes_to_str(per_sec)}/s"
+    if abs(per_sec) < 100:
+        return f"{per_sec:,.2f} {unit}/s"
+    return f"{per_sec:,.0f} {unit}/s"
+
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
         """Default Encoder that will try to just provide the string value if
         not JSON Serizable
         """
         try:
-            rtn_encoded = json.JSONEncoder.default(self, obj)
+            return super().default(obj)
         except TypeError:
-            rtn_encoded = str(obj)
-        else:
-            raise
-        return rtn_encoded
+            return str(obj)
+
+
+def _fast_json_options(
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Returns the `fast_json_dumps` options for `json.dumps` arguments, None
+    when a fast backend cannot produce the same document: a custom encoder
+    class, arguments other than `indent`, `separators`, `sort_keys` and
+    `ensure_ascii`, or a layout other than an indent of 2 or compact
+    separators
+    """
+    if args or kwargs.get("cls") is not CustomEncoder:
+        return None
+    if set(kwargs) - {"cls", "indent", "separators", "sort_keys",
+                      "ensure_ascii"}:
+        return None
+    indent = kwargs.get("indent")
+    separators = kwargs.get("separators")
+    if indent == 2 and separators in (None, (",", ": "), [",", ": "]):
+        pass
+    elif indent is None and separators in ((",", ":"), [",", ":"]):
+        pass
+    else:
+        return None
+    return {
+        "indent": indent,
+        "sort_keys": bool(kwargs.get("sort_keys", False)),
+        "ensure_ascii": bool(kwargs.get("ensure_ascii", True)),
+    }
 
 
-def json_dumps(obj, *args, **kwargs):
+def json_dumps(obj, *args, backend: Optional[str] = None, **kwargs):
     """JSON dumps wrapper that will auto indent and a Custom Encoder to print
-    more pythonic objects
+    more pythonic objects.
+
+    `orjson` is used when it is installed (see
+    `json_backends.available_json_backends`) and produces the same document,
+    with the same `str()` of objects that are not JSON serializable, pass
+    `backend="json"` to always use the json module.  Documents it writes
+    differently (exponent, NaN or infinite floats, subclasses of the JSON
+    types such as `numpy.float64` or enums, keys that are not all strings
+    with `sort_keys`) are written by the json module.
     """
     if "indent" not in kwargs:
         kwargs["indent"] = 2
     if "cls" not in kwargs:
         kwargs["cls"] = CustomEncoder
+    options = _fast_json_options(args, kwargs)
+    if options is not None:
+        text = fast_json_dumps(
+            obj, backend or DEFAULT_JSON_BACKEND, **options
+        )
+        if text is not None:
+            return text
     return json.dumps(obj, *args, **kwargs)
 
 
+# Entries a container needs for `json_dump_iter` to serialize its entries
+# one at a time
+JSON_STREAM_ENTRIES = 64
+
+
+def json_dump_iter(
+    obj: Any,
+    backend: Optional[str] = None,
+    chunk_size: int = 65536,
+    **kwargs
+) -> Generator[str, None, None]:
+    """Returns the document of `json_dumps` in chunks of about `chunk_size`
+    characters to write to a file.  A fast backend serializes the entries of
+    a top level dictionary or list one at a time, otherwise the json module
+    encodes the document incrementally, either way the whole document is
+    never held in memory.
+    """
+    if "indent" not in kwargs:
+        kwargs["indent"] = 2
+    if "cls" not in kwargs:
+        kwargs["cls"] = CustomEncoder
+    options = _fast_json_options((), kwargs)
+    backend = backend or DEFAULT_JSON_BACKEND
+    if (
+        options is not None
+        and backend in FAST_ENCODERS
+        and not options["sort_keys"]
+        and isinstance(obj, (dict, list))
+        and len(obj) > 0
+    ):
+        pieces = _json_entries(obj, backend, options, kwargs)
+    else:
+        encoder_kwargs = dict(kwargs)
+        encoder_cls = encoder_kwargs.pop("cls")
+        pieces = encoder_cls(**encoder_kwargs).iterencode(obj)
+
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _json_entries(
+    obj: Union[Dict[Any, Any], List[Any]],
+    backend: str,
+    options: Dict[str, Any],
+    kwargs: Dict[str, Any],
+    depth: int = 0
+) -> Generator[str, None, None]:
+    """Returns the pieces of a dictionary or list document: each entry is
+    serialized alone, wrapped in a container of its own whose brackets (and
+    new lines) are sliced off, entries that are containers of at least
+    `JSON_STREAM_ENTRIES` entries are themselves returned entry by entry
+    """
+    def dumps(entry: Any) -> str:
+        text = fast_json_dumps(entry, backend, **options)
+        if text is None:
+            text = json.dumps(entry, **kwargs)
+        return text[strip:-strip]
+
+    if options["indent"]:
+        new_line, separator, strip = "\n", ",\n", 2
+        pad = " " * (options["indent"] * depth)
+        entry_pad = pad + " " * options["indent"]
+    else:
+        new_line, separator, strip, pad, entry_pad = "", ",", 1, "", ""
+    if isinstance(obj, dict):
+        opening, closing = "{", "}"
+        entries = obj.items()
+    else:
+        opening, closing = "[", "]"
+        entries = ((None, x) for x in obj)
+    yield opening + new_line
+    for index, (key, value) in enumerate(entries):
+        if index:
+            yield separator
+        if (
+            isinstance(value, (dict, list))
+            and len(value) >= JSON_STREAM_ENTRIES
+        ):
+            if opening == "{":
+                # the key and its separator, without the `null` value
+                yield pad + dumps({key: None})[:-4]
+            else:
+                yield entry_pad
+            yield from _json_entries(
+                value, backend, options, kwargs, depth + 1
+            )
+            continue
+        text = dumps({key: value} if opening == "{" else [value])
+        if pad:
+            text = pad + text.replace("\n", "\n" + pad)
+        yield text
+    yield new_line + pad + closing
+
+
 def list_compare_printout(
     list_names: List[str],
-    list_1: List[str],
-    list_2: List[str],
-    *args
+    list_1: Iterable[Any],
+    list_2: Iterable[Any],
+    *args,
+    differences_only: bool = False,
+    sample: Optional[int] = None
 ) -> str:
-    """Generates a table printout of a list comparison"""
-    full_set = set()
-    full_set.update(list_1)
-    full_set.update(list_2)
-    for extra_list in args:
-        full_set.update(extra_list)
-    list_o_lists = [list_1, list_2, *args]
-    output = []
-    for item in sorted(list(full_set)):
-        line = []
-        for sub_list in list_o_lists:
-            if item in sub_list:
-                line.append(item)
-            else:
-                line.append("--")
-        output.append(line)
-    return generate_table(list_names, output)
+    """Generates a table printout of a list comparison, see
+    `list_compare_iter`
+    """
+    return NL.join(list_compare_iter(
+        list_names,
+        list_1,
+        list_2,
+        *args,
+        differences_only=differences_only,
+        sample=sample
+    ))
+
+
+def list_compare_iter(
+    list_names: List[str],
+    list_1: Iterable[Any],
+    list_2: Iterable[Any],
+    *args,
+    differences_only: bool = False,
+    sample: Optional[int] = None
+) -> Generator[str, None, None]:
+    """Returns the lines of a table comparing N lists: a row for each item of
+    any of the lists (sorted) with the item in the column of each list that
+    contains it and `--` in the others.
+
+    Each list is hashed into a set once, the column widths are measured in a
+    pass over the items and the rows are then formatted as they are returned,
+    so the table of lists of hundreds of thousands of keys can be streamed to
+    a file.  With `differences_only` the items in every list are left out,
+    `sample` limits the table to the first `sample` rows, either is followed
+    by the counts of the comparison.
+    """
+    sets = [
+        x if isinstance(x, (set, frozenset)) else set(x)
+        for x in (list_1, list_2, *args)
+    ]
+    union = set().union(*sets)
+    common = sets[0].intersection(*sets[1:])
+    items = sorted(union - common if differences_only else union)
+    shown = items if sample is None else items[:sample]
+
+    # Widths as measured by `generate_table_iter` with its default
+    # `cell_limit` of 500
+    def cell_width(text: str) -> int:
+        if "\n" in text:
+            return max(min(len(x), 500) for x in text.split("\n"))
+        return min(len(text), 500)
+
+    # Width of the items in each column, `--` when an item is missing
+    widths = [0 for _ in sets]
+    for item in shown:
+        width = cell_width(str(item))
+        for index, item_set in enumerate(sets):
+            if item in item_set:
+                if width > widths[index]:
+                    widths[index] = width
+            elif widths[index] < 2:
+                widths[index] = 2
+
+    rows = (
+        [item if item in item_set else "--" for item_set in sets]
+        for item in shown
+    )
+    yield from generate_table_iter(list_names, rows, widths=widths)
+
+    if differences_only or len(shown) < len(items):
+        yield (
+            f"{len(union):,} items, {len(common):,} in every list, "
+            f"{len(union) - len(common):,} differ"
+        )
+        for name, item_set in zip(list_names, sets):
+            yield f"  missing from '{name}': {len(union) - len(item_set):,}"
+        if len(shown) < len(items):
+            yield f"Showing the first {len(shown):,} of {len(items):,} rows"
 
 
 def generate_list_strings(
@@ -492,11 +1274,51 @@ def generate_list_strings(
     return rtn_str
 
 
-def generate_list_count_table(list_o_values: List[Any], **kwargs) -> str:
-    """Counts all the unique values in a list of values and returns a table
-    with the counts of each value, sorted by the number of each (highest
-    to lowest) the items in the list must be hashable
+def generate_list_count_table(
+    list_o_values: Iterable[Any],
+    top_n: Optional[int] = None,
+    other_label: str = "Other",
+    max_counters: Optional[int] = None,
+    **kwargs
+) -> str:
+    """Counts all the unique values of an iterable of values (a list or a
+    generator, for example over a database cursor) and returns a table with
+    the counts of each value, sorted by the number of each (highest to
+    lowest, first seen first) the values must be hashable.
+
+    With `top_n` only the `top_n` most common values are listed, the others
+    are summed in an `other_label` row.  Pass `max_counters` to count streams
+    of unbounded cardinality in constant memory: only the `max_counters`
+    approximate heavy hitters are counted (see `SpaceSaving`), their counts
+    may be over-estimated by at most the Error column, and once values were
+    evicted the number of other values is a lower bound (`N+ values`).
     """
-    values = [[x, list_o_values.count(x)] for x in set(list_o_values)]
-    values.sort(key=lambda x: x[1], reverse=True)
-    return generate_table(["Value", "Count"], values, **kwargs)
+    if max_counters is None:
+        counts = Counter(list_o_values)
+        headers = ["Value", "Count"]
+        values = [[x, count] for x, count in counts.most_common(top_n)]
+        other_count = sum(counts.values()) - sum(x[1] for x in values)
+        other_values = len(counts) - len(values)
+        if other_values > 0:
+            values.append("break")
+            values.append([
+                f"{other_label} ({other_values:,} values)", other_count
+            ])
+    else:
+        hitters = SpaceSaving(max_counters)
+        hitters.update(list_o_values)
+        headers = ["Value", "Count", "Error"]
+        values = [[x.value, x.count, x.error]
+                  for x in hitters.most_common(top_n)]
+        # listed counts are over-estimates, the rest can be under 0
+        other_count = max(hitters.total - sum(x[1] for x in values), 0)
+        other_values = len(hitters) - len(values)
+        if other_values > 0:
+            more = "+" if hitters.evictions else ""
+            values.append("break")
+            values.append([
+                f"{other_label} ({other_values:,}{more} values)",
+                other_count,
+                ""
+            ])
+    return generate_table(headers, values, **kwargs)
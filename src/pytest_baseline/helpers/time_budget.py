@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Union
+
+from _pytest.nodes import Item
+
+from .framework import get_module_defined_configuration
+from .printing import rate_to_str, secs_to_str
+from .timer_laps import LapWatch
+
+BUDGET_ACTIONS = ["fail", "xfail", "off"]
+
+# Keys of a lap budget given as a dictionary, a lap over its `seconds` or
+# under its `items_per_sec` or `bytes_per_sec` breaches its budget
+LAP_BUDGET_KEYS = ["seconds", "items_per_sec", "bytes_per_sec"]
+
+LapBudget = Union[float, Dict[str, float]]
+
+
+class LapBudgetWarning(UserWarning):
+    """Warning issued when the lap budgets of a test cannot be checked"""
+
+
+def _test_names(item: Item) -> List[str]:
+    """Names a test can be referred to by in a module variable, most
+    specific first, `TestClass.test_name[param]` to `test_name`
+    """
+    names = [item.name]
+    original_name = getattr(item, "originalname", None)
+    if original_name and original_name != item.name:
+        names.append(original_name)
+    if item.cls is not None:
+        names = [f"{item.cls.__name__}.{x}" for x in names] + names
+    return names
+
+
+def time_budget_for(item: Item) -> Optional[float]:
+    """Returns the time budget in seconds of a test from the `time_budget`
+    module variable (or its `time_budget_{ENV}` version), either a number for
+    every test of the module or a dictionary by test name
+    """
+    budget: Union[None, float, Dict[str, float]] = (
+        get_module_defined_configuration(item, "time_budget", None)
+    )
+    if not isinstance(budget, dict):
+        return budget
+    for name in _test_names(item):
+        if name in budget:
+            return budget[name]
+    return None
+
+
+def lap_time_budgets(item: Item) -> Dict[str, Dict[str, float]]:
+    """Returns the budget by lap name of the `timer` fixture laps from the
+    `lap_budget_data` module variable (or its `lap_budget_data_{ENV}`
+    version).  A budget is either a number of seconds or a dictionary with
+    any of the `LAP_BUDGET_KEYS`, numbers are returned as `{"seconds": x}`.
+    """
+    budgets: Dict[str, LapBudget] = get_module_defined_configuration(
+        item, "lap_budget_data", {}
+    )
+    normalized = {}
+    for lap_name, budget in budgets.items():
+        if not isinstance(budget, dict):
+            budget = {"seconds": budget}
+        unknown = set(budget) - set(LAP_BUDGET_KEYS)
+        if unknown:
+            raise ValueError(
+                f"`lap_budget_data` keys must be in {LAP_BUDGET_KEYS}, "
+                f"passed: `{sorted(unknown)}` for lap `{lap_name}`"
+            )
+        normalized[lap_name] = budget
+    return normalized
+
+
+def unchecked_lap_budgets(item: Item, watch: LapWatch) -> List[str]:
+    """Returns the lap names with a `lap_budget_data` budget that cannot be
+    checked because the `timer` fixture laps are not kept
+    """
+    if watch.laps.keep_laps or watch.laps.count == 0:
+        return []
+    return sorted(lap_time_budgets(item))
+
+
+def time_budget_action(item: Item, default: str) -> str:
+    """Returns the action for a test over its budget, the `budget_action`
+    module variable (or its `budget_action_{ENV}` version) overrides the
+    passed default
+    """
+    action = get_module_defined_configuration(item, "budget_action", default)
+    if action not in BUDGET_ACTIONS:
+        raise ValueError(
+            f"`budget_action` must be one of {BUDGET_ACTIONS}, passed: "
+            f"`{action}`"
+        )
+    return action
+
+
+def time_budget_breaches(
+    item: Item,
+    duration: float,
+    watch: Optional[LapWatch] = None
+) -> List[str]:
+    """Returns a message for the test duration and for each lap name of the
+    `timer` fixture that is over its budget for the `--env`
+    """
+    env = item.config.getoption("ENV", "")
+    messages = []
+    budget = time_budget_for(item)
+    if budget is not None and duration > budget:
+        messages.append(
+            f"Test took {secs_to_str(duration)}, over its time budget of "
+            f"{secs_to_str(budget)} in env '{env}'"
+        )
+    budgets = lap_time_budgets(item) if watch is not None else {}
+    if not budgets:
+        return messages
+    # lap name: [laps, laps over budget, slowest lap time]
+    laps_by_name: Dict[str, List[Union[int, float]]] = {}
+    for lap in watch.laps:
+        lap_budget = budgets.get(lap.lap_name, {}).get("seconds")
+        if lap_budget is None:
+            continue
+        counts = laps_by_name.setdefault(lap.lap_name, [0, 0, 0.0])
+        counts[0] += 1
+        if lap.lap_time > lap_budget:
+            counts[1] += 1
+            counts[2] = max(counts[2], lap.lap_time)
+    for lap_name, (count, over, slowest) in laps_by_name.items():
+        if over == 0:
+            continue
+        messages.append(
+            f"Lap '{lap_name}' took {secs_to_str(slowest)}, over its time "
+            f"budget of {secs_to_str(budgets[lap_name]['seconds'])} in env "
+            f"'{env}'"
+            + (f" ({over} of {count} laps over)" if count > 1 else "")
+        )
+    throughputs = watch.laps.throughput_by_name()
+    for lap_name, lap_budget in budgets.items():
+        throughput = throughputs.get(lap_name)
+        if throughput is None:
+            continue
+        for key, rate, unit in (
+            ("items_per_sec", throughput.items_per_sec, "items"),
+            ("bytes_per_sec", throughput.bytes_per_sec, "B"),
+        ):
+            minimum = lap_budget.get(key)
+            if minimum is None or rate is None or rate >= minimum:
+                continue
+            messages.append(
+                f"Lap '{lap_name}' processed {rate_to_str(rate, unit)}, under "
+                f"its throughput budget of {rate_to_str(minimum, unit)} in "
+                f"env '{env}'"
+            )
+    return messages
@@ -6,7 +6,16 @@
 # This software is licensed as described in the file COPYING, which
 # you should have received as part of this distribution.
 
+import asyncio
+import functools
+import sys
+import threading
 import time
+from array import array
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .lap_stats import LapStats, lap_stats_table
 
 """stopwatch is a very simple Python module for measuring time.
 Great for finding out how long code takes to execute.
@@ -22,14 +31,15 @@ Great for finding out how long code takes to execute.
 >>> print t
 30.1532709599 sec
 
-Decorator exists for printing out execution times:
->>> from stopwatch import clockit
+Decorator exists for aggregating execution times:
+>>> from stopwatch import clockit, TIMING_REGISTRY
 >>> @clockit
     def mult(a, b):
         return a * b
 >>> print mult(2, 6)
-mult in 1.38282775879e-05 sec
 6
+>>> print TIMING_REGISTRY.stats()
+{'__main__.mult': LapStats(count=1, ...)}
 
 """
 
@@ -37,37 +47,155 @@ __version__ = '0.3.1'
 __author__ = 'John Paulett <http://blog.7oars.com>'
 
 
+NS_PER_SEC = 1_000_000_000
+
+CPU_CLOCKS = {
+    "process": time.process_time_ns,
+    "thread": time.thread_time_ns,
+}
+
+
+def running_task() -> Optional["asyncio.Task[Any]"]:
+    """The `asyncio` task running in the current thread, None when called
+    outside of a task
+    """
+    # Running event loops install their async generator hooks in their
+    # thread, checking them first avoids raising RuntimeError on every call
+    # from code that is not running in an event loop
+    if sys.get_asyncgen_hooks().firstiter is None:
+        return None
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return asyncio.current_task()
+
+
+def current_task_key() -> int:
+    """Identifies the running `asyncio` task, or the current thread when
+    called outside of a task.  Unlike their names, which can be set and
+    repeated, keys are unique among the running tasks and threads.
+    """
+    task = running_task()
+    if task is None:
+        return threading.get_ident()
+    return id(task)
+
+
 class Timer(object):
-    def __init__(self):
+    def __init__(
+        self,
+        clock: Callable[[], int] = time.perf_counter_ns,
+        cpu_clock: Optional[Callable[[], int]] = None
+    ):
+        """`clock` and `cpu_clock` are callables that return an integer count
+        of nanoseconds, `clock` defaults to `time.perf_counter_ns` which is
+        monotonic and high resolution.  When `cpu_clock` is passed (for
+        example `time.process_time_ns`) CPU time is tracked next to the wall
+        time.
+        """
+        self._clock = clock
+        self._cpu_clock = cpu_clock
         self.__stopped = None
+        self.__cpu_stopped = None
+        self.__paused_at = None
+        self.__cpu_paused_at = None
+        self.__paused_ns = 0
+        self.__cpu_paused_ns = 0
+        self.__cpu_start = self.__cpu_time()
         self.__start = self.__time()
 
     def stop(self):
         """Stops the clock permanently for the instance of the Timer.
         Returns the time at which the instance was stopped.
         """
+        self.resume()
         self.__stopped = self.__last_time()
+        self.__cpu_stopped = self.__last_cpu_time()
         return self.elapsed
 
+    def pause(self):
+        """Pauses the clock, the time until `resume()` is not counted in
+        `elapsed` (nor in `cpu_elapsed`).  Pausing a paused Timer does
+        nothing.
+        """
+        if self.__paused_at is None and self.__stopped is None:
+            self.__paused_at = self.__time()
+            self.__cpu_paused_at = self.__cpu_time()
+
+    def resume(self):
+        """Resumes a paused clock, resuming a running Timer does nothing.
+        """
+        if self.__paused_at is not None:
+            self.__paused_ns += self.__time() - self.__paused_at
+            self.__cpu_paused_ns += self.__cpu_time() - self.__cpu_paused_at
+            self.__paused_at = None
+            self.__cpu_paused_at = None
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Context manager that pauses the clock for the enclosed code, for
+        example to leave setup code out of the timed region
+        """
+        self.pause()
+        try:
+            yield
+        finally:
+            self.resume()
+
+    def is_paused(self):
+        """Whether the clock is paused"""
+        return self.__paused_at is not None
+    is_paused = property(is_paused)
+
     def elapsed(self):
         """The number of seconds since the current time that the Timer
         object was created.  If stop() was called, it is the number
         of seconds from the instance creation until stop() was called.
+        Time spent paused is not counted.
         """
-        return self.__last_time() - self.__start
+        return self.elapsed_ns / NS_PER_SEC
     elapsed = property(elapsed)
 
+    def elapsed_ns(self):
+        """Same as `elapsed` but as an integer count of nanoseconds.
+        """
+        if self.__stopped is not None:
+            end = self.__stopped
+        elif self.__paused_at is not None:
+            end = self.__paused_at
+        else:
+            end = self._clock()
+        return end - self.__start - self.__paused_ns
+    elapsed_ns = property(elapsed_ns)
+
+    def cpu_elapsed(self):
+        """The number of CPU seconds consumed since the Timer object was
+        created, or None if no `cpu_clock` was configured.
+        """
+        if self._cpu_clock is None:
+            return None
+        if self.__cpu_paused_at is not None:
+            end = self.__cpu_paused_at
+        else:
+            end = self.__last_cpu_time()
+        return (end - self.__cpu_start - self.__cpu_paused_ns) / NS_PER_SEC
+    cpu_elapsed = property(cpu_elapsed)
+
     def start_time(self):
-        """The time at which the Timer instance was created.
+        """The clock reading, in seconds, at which the Timer instance was
+        created.
         """
-        return self.__start
+        return self.__start / NS_PER_SEC
     start_time = property(start_time)
 
     def stop_time(self):
-        """The time at which stop() was called, or None if stop was
-        never called.
+        """The clock reading, in seconds, at which stop() was called, or None
+        if stop was never called.
         """
-        return self.__stopped
+        if self.__stopped is None:
+            return None
+        return self.__stopped / NS_PER_SEC
     stop_time = property(stop_time)
 
     def __last_time(self):
@@ -78,10 +206,25 @@ class Timer(object):
             return self.__stopped
         return self.__time()
 
+    def __last_cpu_time(self):
+        """Same as `__last_time` for the configured `cpu_clock`.
+        """
+        if self.__cpu_stopped is not None:
+            return self.__cpu_stopped
+        return self.__cpu_time()
+
     def __time(self):
-        """Wrapper for time.time() to allow unit testing.
+        """Wrapper for the configured clock to allow unit testing.
+        """
+        return self._clock()
+
+    def __cpu_time(self):
+        """Wrapper for the configured cpu clock, returns 0 when CPU time is
+        not being tracked.
         """
-        return time.time()
+        if self._cpu_clock is None:
+            return 0
+        return self._cpu_clock()
 
     def __str__(self):
         """Nicely format the elapsed time
@@ -89,15 +232,142 @@ class Timer(object):
         return str(self.elapsed) + ' sec'
 
 
-def clockit(func):
-    """Function decorator that times the evaluation of *func* and prints the
-    execution time.
+# Number of raw call times buffered per function before they are folded into
+# the function's statistics
+FOLD_SIZE = 4096
+
+
+class FunctionTiming:
+    """Call times of one function in a `TimingRegistry`.  Calls only append
+    their time in nanoseconds to `buffer`, the times are folded into the
+    `LapStats` when the buffer is full or the statistics are read.
+    """
+    __slots__ = ("name", "buffer", "_stats", "_lock")
+
+    def __init__(self, name: str, lock: threading.Lock) -> None:
+        self.name = name
+        self.buffer = array("q")
+        self._stats = LapStats()
+        self._lock = lock
+
+    @property
+    def stats(self) -> LapStats:
+        """Statistics of every call since the last reset, in seconds"""
+        self.fold()
+        return self._stats
+
+    def fold(self) -> None:
+        """Moves the buffered call times into the statistics"""
+        with self._lock:
+            buffer = self.buffer
+            # calls may append while folding, only remove what was read
+            size = len(buffer)
+            values = buffer[:size]
+            del buffer[:size]
+            self._stats.add_many([x / NS_PER_SEC for x in values])
+
+    def merge(self, stats: LapStats) -> None:
+        """Adds statistics of calls recorded elsewhere"""
+        self.fold()
+        with self._lock:
+            self._stats.merge(stats)
+
+    def reset(self) -> None:
+        with self._lock:
+            del self.buffer[:]
+            self._stats = LapStats()
+
+
+class TimingRegistry:
+    """Call count, total, min, max and percentiles of the functions
+    decorated with `clockit`, keyed by the function's qualified name.  The
+    process wide `TIMING_REGISTRY` is merged into the session summary and
+    reset after every test by the plugin.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._timings: Dict[str, FunctionTiming] = {}
+
+    def __len__(self) -> int:
+        return len(self._timings)
+
+    def timing(self, name: str) -> FunctionTiming:
+        """Returns the timing of the named function, created if needed"""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = FunctionTiming(
+                    name, self._lock
+                )
+            return timing
+
+    def stats(self) -> Dict[str, LapStats]:
+        """Returns the statistics of each function that was called"""
+        stats = {}
+        for name, timing in list(self._timings.items()):
+            timing_stats = timing.stats
+            if timing_stats.count > 0:
+                stats[name] = timing_stats
+        return stats
+
+    def merge(self, other: "TimingRegistry") -> None:
+        """Adds the calls recorded by another registry"""
+        for name, other_stats in other.stats().items():
+            self.timing(name).merge(other_stats)
+
+    def reset(self) -> None:
+        """Forgets every recorded call, decorated functions keep recording
+        into the same registry
+        """
+        for timing in list(self._timings.values()):
+            timing.reset()
+
+    def report(self, top: Optional[int] = None) -> str:
+        """Returns the statistics table of the `top` functions by total
+        time, all of them when `top` is None
+        """
+        stats = sorted(
+            self.stats().items(), key=lambda x: x[1].total, reverse=True
+        )
+        return lap_stats_table(dict(stats[:top]))
+
+
+TIMING_REGISTRY = TimingRegistry()
+
+
+def clockit(
+    func: Optional[Callable[..., Any]] = None,
+    *,
+    name: Optional[str] = None,
+    registry: Optional[TimingRegistry] = None
+) -> Any:
+    """Function decorator that times every call of *func* into a
+    `TimingRegistry` (default `TIMING_REGISTRY`), under `name` or the
+    function's qualified name.  A call costs two clock reads and an array
+    append, nothing is printed, use `@clockit` or `@clockit(name=...)`.
     """
-    def new(*args, **kw):
-        t = Timer()
-        retval = func(*args, **kw)
-        t.stop()
-        print('%s in %s' % (func.__name__, t))
-        del t
-        return retval
-    return new
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        target = TIMING_REGISTRY if registry is None else registry
+        timing = target.timing(
+            name or f"{func.__module__}.{func.__qualname__}"
+        )
+        buffer = timing.buffer
+        append = buffer.append
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def new(*args, **kw):
+            start = clock()
+            try:
+                return func(*args, **kw)
+            finally:
+                append(clock() - start)
+                if len(buffer) >= FOLD_SIZE:
+                    timing.fold()
+        new.timing = timing
+        return new
+
+    if func is not None:
+        return decorator(func)
+    return decorator
@@ -1,11 +1,28 @@
+import gc
+import math
+import threading
+import time
+from asyncio import Task
+from array import array
+from collections.abc import Sequence
+from itertools import repeat
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple, Union)
 
-from collections import namedtuple
-from typing import List, NamedTuple
-
-from .printing import generate_table, secs_to_str
-from .timer import Timer
+from .gc_monitor import GCMonitor, GCTotals
+from .lap_memory import LapMemoryTracker
+from .lap_profiler import LapProfiler
+from .lap_stats import (LapStats, LapThroughput, lap_stats_table,
+                        lap_throughput_table)
+from .perf_env import NoiseReduction
+from .printing import bytes_to_str, generate_table, rate_to_str, secs_to_str
+from .timer import FOLD_SIZE, NS_PER_SEC, Timer, running_task
+from .timer_spans import SpanContext, SpanTree
 
 NL = "\n"
+NAN = float("nan")
+# Marks the last interned lap name, tag and task of an empty LapList
+_UNSET = object()
 
 
 class TimerLap(NamedTuple):
@@ -13,72 +30,749 @@ class TimerLap(NamedTuple):
     lap_time: float
     lap_name: str
     tag: str
+    cpu_time: Optional[float] = None
+    task: Optional[str] = None
+    mem_delta: Optional[int] = None
+    mem_peak: Optional[int] = None
+    gc_collections: Optional[int] = None
+    gc_pause: Optional[float] = None
+    items: Optional[int] = None
+    nbytes: Optional[int] = None
 
 
 class LapWatch(Timer):
-    lap_tuple = namedtuple(
-        "TimerLap",
-        ["total_time", "lap_time", "lap_name", "tag"]
-    )
+    """Stopwatch that records laps, laps are attributed to the thread or
+    `asyncio` task that records them and each lap's time is measured from
+    the previous lap of the same thread or task, so a LapWatch can be shared
+    by concurrent code.  Threads and tasks are told apart by identity, laps
+    are labelled with their name, suffixed with `#N` when several threads or
+    tasks share a name.
+    """
+    lap_tuple = TimerLap
 
-    def __init__(self, timer_name: str = None) -> None:
-        self.laps = LapList()
+    def __init__(
+        self,
+        timer_name: str = None,
+        clock: Callable[[], int] = time.perf_counter_ns,
+        cpu_clock: Optional[Callable[[], int]] = None,
+        keep_laps: bool = True,
+        overhead: float = 0.0
+    ) -> None:
+        """Pass `keep_laps=False` to only keep the streaming statistics of
+        the laps, for soak tests that record millions of laps.  `overhead`
+        seconds (see `calibrate_lap_overhead`) are subtracted from every lap
+        time, lap times are never negative and total times are not changed.
+        """
+        self.laps = LapList(keep_laps=keep_laps)
+        self.overhead = overhead
         self.name = timer_name
-        super(LapWatch, self).__init__()
+        self.findings: List[str] = []
+        self.spans = SpanTree(clock)
+        self._lock = threading.Lock()
+        self._thread_states = threading.local()
+        self._task_states: Dict["Task[Any]", _TaskState] = {}
+        self._label_counts: Dict[str, int] = {}
+        self.profiler: Optional[LapProfiler] = None
+        self.memory_tracker: Optional[LapMemoryTracker] = None
+        self.noise_reduction: Optional[NoiseReduction] = None
+        self.gc_monitor: Optional[GCMonitor] = None
+        self._gc_last: Optional[GCTotals] = None
+        super(LapWatch, self).__init__(clock=clock, cpu_clock=cpu_clock)
 
     def __str__(self) -> str:
+        if self.spans and self.laps.count == 0:
+            return f"Timer: {self.name}{NL}{self.spans}"
+        if self.spans:
+            return f"Timer: {self.name}{NL}{self.laps}{NL}{self.spans}"
         return f"Timer: {self.name}{NL}{self.laps}"
 
-    def lap(self, lap_name: str = None, tag: str = None) -> float:
-        """Appends a lap to the lap list and returns the lap time"""
+    def span(self, name: str) -> SpanContext:
+        """Context manager that times the enclosed code as a span nested in
+        the currently open span, `with timer.span("query"):`
+        """
+        return SpanContext(self.spans, name)
+
+    def timed(
+        self,
+        name: Optional[str] = None
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator that times every call of the function as a span,
+        `@timer.timed("parse")`
+        """
+        return self.spans.timed(name)
+
+    def lap(
+        self,
+        lap_name: str = None,
+        tag: str = None,
+        items: Optional[int] = None,
+        nbytes: Optional[int] = None
+    ) -> float:
+        """Appends a lap to the lap list and returns the lap time, measured
+        from the previous lap of the calling thread or task.  Pass the work
+        done by the lap as `items` (for example rows) and/or `nbytes` to
+        record its throughput.
+        """
         total = self.elapsed
-        if not lap_name:
-            lap_name = "Lap %d" % (len(self.laps) + 1)
-        if len(self.laps) == 0:
-            lap_time = total
+        cpu_total = None if self._cpu_clock is None else self.cpu_elapsed
+        # `_task_state` inlined for threads and tasks that already lapped
+        running = running_task()
+        if running is None:
+            state = getattr(self._thread_states, "state", None)
         else:
-            lap_time = total - self.laps[-1][0]
-        self.laps.append(self.lap_tuple(total, lap_time, lap_name, tag))
+            state = self._task_states.get(running)
+        if state is None:
+            state = self._task_state()
+        task = state.label
+        with self._lock:
+            lap_time = total - state.last_total
+            if self.overhead:
+                lap_time = max(lap_time - self.overhead, 0.0)
+            state.last_total = total
+            if cpu_total is None:
+                cpu_time = None
+            else:
+                cpu_time = cpu_total - state.last_cpu
+                state.last_cpu = cpu_total
+            if not lap_name:
+                lap_name = "Lap %d" % (self.laps.count + 1)
+            if (
+                self.memory_tracker is None and self.gc_monitor is None
+                and items is None and nbytes is None
+            ):
+                self.laps.add(total, lap_time, lap_name, tag, cpu_time, task)
+            else:
+                mem_delta = mem_peak = gc_collections = gc_pause = None
+                if self.memory_tracker is not None:
+                    mem_delta, mem_peak = self.memory_tracker.lap(lap_name)
+                if self.gc_monitor is not None:
+                    gc_collections, gc_pause = self.gc_monitor.since(
+                        self._gc_last
+                    )
+                    self._gc_last = self.gc_monitor.totals()
+                self.laps.add(
+                    total, lap_time, lap_name, tag, cpu_time, task,
+                    mem_delta, mem_peak, gc_collections, gc_pause, items,
+                    nbytes
+                )
+        if self.profiler is not None:
+            self.profiler.lap(lap_name)
+        if self.noise_reduction is not None:
+            with self.paused():
+                gc.collect()
+            if self.gc_monitor is not None:
+                # the collection is out of the timed region, and of the laps
+                self._gc_last = self.gc_monitor.totals()
         return lap_time
 
+    def start_task(self) -> None:
+        """Marks the start of the calling thread or task, its first lap is
+        measured from here instead of from the start of the LapWatch
+        """
+        total = self.elapsed
+        cpu_total = self.cpu_elapsed
+        state = self._task_state()
+        with self._lock:
+            state.last_total = total
+            if cpu_total is not None:
+                state.last_cpu = cpu_total
+
+    def bench(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        rounds: int = 5,
+        warmup: int = 1,
+        min_time: float = 0.01,
+        number: Optional[int] = None,
+        lap_name: Optional[str] = None,
+        tag: Optional[str] = "bench",
+        disable_gc: bool = True,
+        **kwargs: Any
+    ) -> LapStats:
+        """Micro-benchmarks `func(*args, **kwargs)` and returns the
+        statistics of the time per call of each round.
+
+        Like `timeit`, the number of calls per round is calibrated (1, 2, 5,
+        10, 20, 50...) until a round takes at least `min_time` seconds,
+        unless `number` is passed.  `warmup` rounds are then run and
+        discarded, and each of the `rounds` rounds is recorded as a lap named
+        `lap_name` (default: the function's qualified name) with `tag`, whose
+        lap time is the round's time divided by the number of calls.  The
+        garbage collector is disabled while timing unless `disable_gc` is
+        False.  The next lap is measured from the end of the benchmark.
+        """
+        if rounds < 1:
+            raise ValueError(f"`rounds` must be at least 1, passed: {rounds}")
+        lap_name = lap_name or getattr(func, "__qualname__", repr(func))
+        state = self._task_state()
+        task = state.label
+        gc_was_enabled = gc.isenabled()
+        if disable_gc:
+            gc.disable()
+        try:
+            if number is None:
+                number = self._calibrate(func, args, kwargs, min_time)
+            for _ in range(warmup):
+                self._time_calls(func, args, kwargs, number)
+            results = []
+            for _ in range(rounds):
+                cpu_start = self._cpu_clock() if self._cpu_clock else None
+                elapsed_ns = self._time_calls(func, args, kwargs, number)
+                total = self.elapsed
+                cpu_time = None
+                if cpu_start is not None:
+                    cpu_time = (
+                        (self._cpu_clock() - cpu_start) / NS_PER_SEC / number
+                    )
+                results.append(
+                    (total, elapsed_ns / NS_PER_SEC / number, cpu_time)
+                )
+        finally:
+            if disable_gc and gc_was_enabled:
+                gc.enable()
+        stats = LapStats()
+        with self._lock:
+            for total, lap_time, cpu_time in results:
+                self.laps.add(total, lap_time, lap_name, tag, cpu_time, task)
+                stats.add(lap_time)
+            state.last_total = self.elapsed
+            if self._cpu_clock is not None:
+                state.last_cpu = self.cpu_elapsed
+        return stats
+
+    def _task_state(self) -> "_TaskState":
+        """Returns the lap state of the calling thread or task, created on
+        its first call.  Threads keep theirs in a thread local, so a new
+        thread never inherits the state of a finished thread with the same
+        ident, and tasks are kept by the task object, which stays alive with
+        its state so its id cannot be reused.
+        """
+        task = running_task()
+        if task is None:
+            state = getattr(self._thread_states, "state", None)
+            if state is None:
+                state = self._thread_states.state = self._new_state(
+                    threading.current_thread().name
+                )
+            return state
+        state = self._task_states.get(task)
+        if state is None:
+            state = self._task_states[task] = self._new_state(
+                task.get_name()
+            )
+        return state
+
+    def _new_state(self, name: str) -> "_TaskState":
+        """Returns the state of a new thread or task, labelled with its name
+        and a `#N` suffix when another thread or task used the same name
+        """
+        with self._lock:
+            count = self._label_counts.get(name, 0) + 1
+            self._label_counts[name] = count
+        return _TaskState(name if count == 1 else f"{name} #{count}")
+
+    def _time_calls(
+        self,
+        func: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        number: int
+    ) -> int:
+        """Returns the nanoseconds taken by `number` calls of the function
+        """
+        clock = self._clock
+        loop = repeat(None, number)
+        start = clock()
+        for _ in loop:
+            func(*args, **kwargs)
+        return clock() - start
+
+    def _calibrate(
+        self,
+        func: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        min_time: float
+    ) -> int:
+        """Returns the number of calls that take at least `min_time`
+        seconds, the same sequence as `timeit.Timer.autorange`
+        """
+        min_time_ns = min_time * NS_PER_SEC
+        base = 1
+        while True:
+            for multiplier in (1, 2, 5):
+                number = base * multiplier
+                if self._time_calls(func, args, kwargs, number) >= min_time_ns:
+                    return number
+            base *= 10
+
+    def attach_profiler(self, profiler: LapProfiler) -> None:
+        """Starts a profiler that profiles the code between consecutive laps,
+        the profiles are included in the report
+        """
+        self.profiler = profiler
+        profiler.start()
+
+    def close_profiler(self) -> None:
+        """Stops the attached profiler, the code after the last lap is not
+        profiled
+        """
+        if self.profiler is not None:
+            self.profiler.close()
+
+    def attach_memory_tracker(self, tracker: LapMemoryTracker) -> None:
+        """Starts measuring the memory allocated between consecutive laps,
+        laps get a `mem_delta` and `mem_peak` in bytes
+        """
+        self.memory_tracker = tracker
+        tracker.start()
+
+    def close_memory_tracker(self) -> None:
+        """Stops the attached memory tracker"""
+        if self.memory_tracker is not None:
+            self.memory_tracker.close()
+
+    def attach_gc_monitor(self, monitor: GCMonitor) -> None:
+        """Attributes the garbage collections, and the time they paused the
+        program, between consecutive laps to the laps: laps get a
+        `gc_collections` count and a `gc_pause` in seconds.  Collections are
+        process wide, laps recorded concurrently by several threads count
+        each other's collections.
+        """
+        self.gc_monitor = monitor
+        monitor.install()
+        self._gc_last = monitor.totals()
+
+    def attach_noise_reduction(self, noise_reduction: NoiseReduction) -> None:
+        """Collects garbage after every lap, out of the timed regions, for
+        code running with the cyclic garbage collector disabled by
+        `noise_reduction`, its recorded environment is included in the report
+        """
+        self.noise_reduction = noise_reduction
+
     def reset_laps(self) -> None:
         """Clear out the current lap list"""
-        self.laps = LapList()
+        with self._lock:
+            self.laps = LapList(keep_laps=self.laps.keep_laps)
+            self._thread_states = threading.local()
+            self._task_states.clear()
+            self._label_counts.clear()
+
+    def summary(self) -> str:
+        """Returns the lap statistics table, one row per tag plus the
+        overall statistics
+        """
+        return f"Timer: {self.name}{NL}{self.laps.summary()}"
 
+    def report(self, max_laps: int = 100) -> str:
+        """Returns the findings (for example regressions), the noise
+        reduction environment, the lap statistics, the lap table (the first
+        and last laps, `max_laps` in total), the spans, the top allocation
+        sites and the lap profiles
+        """
+        sections = [f"Timer: {self.name}", *self.findings]
+        if self.noise_reduction is not None:
+            sections.append(self.noise_reduction.report())
+        if self.laps.count > 0 or not self.spans:
+            sections.append(self.laps.summary())
+            if self.laps.keep_laps:
+                sections.append(self.laps.table(max_rows=max_laps))
+            else:
+                sections.append(
+                    f"{self.laps.count:,} laps recorded, lap table omitted"
+                )
+        if self.laps.keep_laps and len(self.laps._tasks) > 1:
+            sections.append(self.laps.concurrency_summary())
+        if self.spans:
+            sections.append(str(self.spans))
+        if self.memory_tracker is not None:
+            memory_report = self.memory_tracker.report()
+            if memory_report:
+                sections.append(memory_report)
+        if self.profiler is not None and self.profiler.lap_names:
+            sections.append(self.profiler.report())
+        return NL.join(sections)
+
+
+class _TaskState:
+    """Display label and last lap totals of a thread or task recording laps
+    on a `LapWatch`
+    """
+    __slots__ = ("label", "last_total", "last_cpu")
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.last_total = 0.0
+        self.last_cpu = 0.0
 
-class LapList(list):
+
+class LapList:
+    """Compact storage of `TimerLap`s, each field is kept in its own
+    `array` and each lap's name, tag and task are interned as one key, so a
+    lap costs a few dozen bytes instead of a namedtuple and adding a lap is
+    a few array appends.  Indexing and iterating still return `TimerLap`
+    objects, slicing returns a new `LapList`.
+
+    Streaming statistics (`LapStats`) are kept per tag, lap times are
+    folded into them in batches when they are read, like `FunctionTiming`.
+    With `keep_laps=False` only those statistics are kept, lap times are
+    buffered and folded every `FOLD_SIZE` laps.
+    """
+
+    def __init__(
+        self,
+        laps: Optional[Iterable[TimerLap]] = None,
+        keep_laps: bool = True
+    ) -> None:
+        self.keep_laps = keep_laps
+        self._count = 0
+        self._tag_stats: Dict[int, LapStats] = {}
+        self._last_total = 0.0
+        self._total = array("d")
+        self._lap = array("d")
+        self._names: List[str] = []
+        self._name_lookup: Dict[str, int] = {}
+        self._tags: List[Optional[str]] = []
+        self._tag_lookup: Dict[Optional[str], int] = {}
+        self._tasks: List[Optional[str]] = []
+        self._task_lookup: Dict[Optional[str], int] = {}
+        # Each distinct (name, tag, task) of the laps is interned as a key of
+        # `(name index, tag index, task index)`, laps only store the key index
+        self._key_idx = array("I")
+        self._keys: List[Tuple[int, int, int]] = []
+        self._key_lookup: Dict[Tuple[Any, Any, Any], int] = {}
+        # The last interned name, tag and task and their key, which are
+        # usually the same for consecutive laps
+        self._last_name: Any = _UNSET
+        self._last_tag: Any = _UNSET
+        self._last_task: Any = _UNSET
+        self._last_key_idx = 0
+        self._appends = (
+            self._total.append, self._lap.append, self._key_idx.append
+        )
+        # Lap times are folded into the per tag statistics when they are
+        # read, from the kept laps after the first `_folded` ones, or from
+        # the pending buffers when laps are not kept
+        self._folded = 0
+        self._fold_lock = threading.Lock()
+        self._pending_lap = array("d")
+        self._pending_key = array("I")
+        # Only created once a lap with CPU time is added
+        self._cpu: Optional[array] = None
+        # Only created once a lap with memory is added
+        self._mem_delta: Optional[array] = None
+        self._mem_peak: Optional[array] = None
+        # Only created once a lap with garbage collections is added
+        self._gc_count: Optional[array] = None
+        self._gc_pause: Optional[array] = None
+        # Only created once a lap with items or bytes is added
+        self._items: Optional[array] = None
+        self._nbytes: Optional[array] = None
+        self._tag_throughput: Dict[int, LapThroughput] = {}
+        if laps is not None:
+            self.extend(laps)
 
     def __str__(self):
+        if not self.keep_laps:
+            return self.summary()
+        return self.table()
+
+    def table(self, max_rows: Optional[int] = None) -> str:
+        """Returns the table of the laps, with `max_rows` only the first and
+        last `max_rows` laps are formatted and printed, around a
+        `... N rows omitted ...` line
+        """
+        rows = _LapTableRows(self)
         return generate_table(
-            ["Lap Name", "Lap Time", "Elapsed", "Tag"],
-            [
-                [
-                    x.lap_name,
-                    secs_to_str(x.lap_time),
-                    secs_to_str(x.total_time),
-                    x.tag
-                ] for x in self
-            ]
+            rows.headers,
+            rows if max_rows is not None else list(rows),
+            max_rows=max_rows,
+            summarize_omitted=False
+        )
+
+    def __repr__(self) -> str:
+        return f"LapList({list(self)!r})"
+
+    def __len__(self) -> int:
+        return len(self._lap)
+
+    def __iter__(self) -> Iterator[TimerLap]:
+        for index in range(len(self)):
+            yield self._make_lap(index)
+
+    def __getitem__(
+        self,
+        index: Union[int, slice]
+    ) -> Union[TimerLap, "LapList"]:
+        if isinstance(index, slice):
+            return self._take(range(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("LapList index out of range")
+        return self._make_lap(index)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (LapList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    @property
+    def last_total(self) -> float:
+        """Total time of the last lap or 0.0 when there are no laps"""
+        return self._last_total
+
+    @property
+    def count(self) -> int:
+        """Number of laps added, including laps not kept"""
+        return self._count
+
+    @property
+    def stats(self) -> LapStats:
+        """Streaming statistics of all the lap times, merged from the per
+        tag statistics
+        """
+        self._fold()
+        stats = LapStats()
+        for tag_stats in self._tag_stats.values():
+            stats.merge(tag_stats)
+        return stats
+
+    @property
+    def has_cpu_time(self) -> bool:
+        """Whether any lap recorded CPU time"""
+        return self._cpu is not None and any(
+            not math.isnan(x) for x in self._cpu
+        )
+
+    @property
+    def has_memory(self) -> bool:
+        """Whether any lap recorded its memory delta and peak"""
+        return self._mem_delta is not None
+
+    @property
+    def has_items(self) -> bool:
+        """Whether any lap recorded a number of items"""
+        return self._items is not None and any(
+            not math.isnan(x) for x in self._items
+        )
+
+    @property
+    def has_bytes(self) -> bool:
+        """Whether any lap recorded a number of bytes"""
+        return self._nbytes is not None and any(
+            not math.isnan(x) for x in self._nbytes
         )
 
+    @property
+    def has_gc(self) -> bool:
+        """Whether any lap recorded its garbage collections"""
+        return self._gc_count is not None
+
+    def add(
+        self,
+        total_time: float,
+        lap_time: float,
+        lap_name: str,
+        tag: Optional[str] = None,
+        cpu_time: Optional[float] = None,
+        task: Optional[str] = None,
+        mem_delta: Optional[int] = None,
+        mem_peak: Optional[int] = None,
+        gc_collections: Optional[int] = None,
+        gc_pause: Optional[float] = None,
+        items: Optional[int] = None,
+        nbytes: Optional[int] = None
+    ) -> None:
+        """Records a lap from its fields without creating a `TimerLap`"""
+        if (
+            lap_name is self._last_name and tag is self._last_tag
+            and task is self._last_task
+        ):
+            key_idx = self._last_key_idx
+        else:
+            key_idx = self._key_lookup.get((lap_name, tag, task))
+            if key_idx is None:
+                key_idx = self._intern_key(lap_name, tag, task)
+            self._last_name, self._last_tag = lap_name, tag
+            self._last_task, self._last_key_idx = task, key_idx
+        self._count += 1
+        self._last_total = total_time
+        if items is not None or nbytes is not None:
+            tag_idx = self._keys[key_idx][1]
+            throughput = self._tag_throughput.get(tag_idx)
+            if throughput is None:
+                throughput = self._tag_throughput[tag_idx] = LapThroughput()
+            throughput.add(lap_time, items, nbytes)
+        if not self.keep_laps:
+            self._pending_lap.append(lap_time)
+            self._pending_key.append(key_idx)
+            if len(self._pending_key) >= FOLD_SIZE:
+                self._fold()
+            return
+        append_total, append_lap, append_key = self._appends
+        append_total(total_time)
+        append_lap(lap_time)
+        append_key(key_idx)
+        if cpu_time is not None and self._cpu is None:
+            self._cpu = array("d", [NAN]) * (len(self._lap) - 1)
+        if self._cpu is not None:
+            self._cpu.append(NAN if cpu_time is None else cpu_time)
+        if mem_delta is not None and self._mem_delta is None:
+            self._mem_delta = array("d", [NAN]) * (len(self._lap) - 1)
+            self._mem_peak = array("d", [NAN]) * (len(self._lap) - 1)
+        if self._mem_delta is not None:
+            self._mem_delta.append(NAN if mem_delta is None else mem_delta)
+            self._mem_peak.append(NAN if mem_peak is None else mem_peak)
+        if gc_collections is not None and self._gc_count is None:
+            self._gc_count = array("d", [NAN]) * (len(self._lap) - 1)
+            self._gc_pause = array("d", [NAN]) * (len(self._lap) - 1)
+        if self._gc_count is not None:
+            self._gc_count.append(
+                NAN if gc_collections is None else gc_collections
+            )
+            self._gc_pause.append(NAN if gc_pause is None else gc_pause)
+        if (items is not None or nbytes is not None) and self._items is None:
+            self._items = array("d", [NAN]) * (len(self._lap) - 1)
+            self._nbytes = array("d", [NAN]) * (len(self._lap) - 1)
+        if self._items is not None:
+            self._items.append(NAN if items is None else items)
+            self._nbytes.append(NAN if nbytes is None else nbytes)
+
+    def append(self, lap: TimerLap) -> None:
+        """Appends a `TimerLap` (or any tuple in the same field order)"""
+        self.add(*lap)
+
+    def extend(self, laps: Iterable[TimerLap]) -> None:
+        """Appends every lap in `laps`"""
+        for lap in laps:
+            self.add(*lap)
+
     def average(self) -> float:
         """Returns the average of lap times"""
-        if len(self) > 0:
-            return self.sum() / len(self)
+        if self.count > 0:
+            return self.sum() / self.count
         else:
             return self.sum()
 
-    def max(self) -> float:
-        """Returns the max lap time"""
-        return max(self, key=lambda x: x.lap_time)
+    def max(self) -> TimerLap:
+        """Returns the lap with the max lap time"""
+        return self._make_lap(self._lap.index(max(self._lap)))
 
-    def min(self) -> float:
-        """Returns the min lap time"""
-        return min(self, key=lambda x: x.lap_time)
+    def min(self) -> TimerLap:
+        """Returns the lap with the min lap time"""
+        return self._make_lap(self._lap.index(min(self._lap)))
 
     def sum(self) -> float:
         """Returns the sum of lap times"""
-        return sum([x.lap_time for x in self])
+        if not self.keep_laps:
+            self._fold()
+            return math.fsum(x.total for x in self._tag_stats.values())
+        return math.fsum(self._lap)
+
+    def std(self) -> float:
+        """Returns the standard deviation of lap times"""
+        return self.stats.std
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Returns the estimated lap time at `percent` (0 - 100), see
+        `LapStats.percentile`
+        """
+        return self.stats.percentile(percent)
+
+    def histogram(self, bins: int = 10) -> List[Tuple[float, float, int]]:
+        """Returns `bins` equal width `(lower, upper, count)` tuples of lap
+        times
+        """
+        return self.stats.histogram(bins)
+
+    def group_by_tag(self) -> Dict[Optional[str], LapStats]:
+        """Returns the streaming statistics of the lap times by tag"""
+        self._fold()
+        return {
+            self._tags[tag_idx]: stats
+            for tag_idx, stats in self._tag_stats.items()
+        }
+
+    def group_by_name(self) -> Dict[str, LapStats]:
+        """Returns the statistics of the lap times by lap name, empty when
+        laps are not kept
+        """
+        stats = {key[0]: LapStats() for key in self._keys}
+        keys = self._keys
+        for key_idx, lap_time in zip(self._key_idx, self._lap):
+            stats[keys[key_idx][0]].add(lap_time)
+        return {
+            self._names[index]: stat for index, stat in stats.items()
+            if stat.count > 0
+        }
+
+    def throughput_by_tag(self) -> Dict[Optional[str], LapThroughput]:
+        """Returns the items and bytes processed per second by tag, of the
+        tags with laps that recorded items or bytes
+        """
+        return {
+            self._tags[tag_idx]: throughput
+            for tag_idx, throughput in self._tag_throughput.items()
+        }
+
+    def throughput_by_name(self) -> Dict[str, LapThroughput]:
+        """Returns the items and bytes processed per second by lap name, of
+        the lap names with laps that recorded items or bytes, empty when
+        laps are not kept
+        """
+        if self._items is None:
+            return {}
+        throughputs: Dict[int, LapThroughput] = {}
+        keys = self._keys
+        for key_idx, lap_time, items, nbytes in zip(
+            self._key_idx, self._lap, self._items, self._nbytes
+        ):
+            if math.isnan(items) and math.isnan(nbytes):
+                continue
+            name_idx = keys[key_idx][0]
+            throughput = throughputs.get(name_idx)
+            if throughput is None:
+                throughput = throughputs[name_idx] = LapThroughput()
+            throughput.add(
+                lap_time,
+                None if math.isnan(items) else int(items),
+                None if math.isnan(nbytes) else int(nbytes)
+            )
+        return {
+            self._names[name_idx]: throughput
+            for name_idx, throughput in throughputs.items()
+        }
+
+    def summary(self) -> str:
+        """Returns a table of the lap statistics by tag and overall, and of
+        the throughput by tag and overall when laps recorded items or bytes
+        """
+        stats = {
+            f"Tag: {tag}": tag_stats
+            for tag, tag_stats in self.group_by_tag().items()
+        }
+        if len(stats) == 1:
+            stats = {}
+        stats["All Laps"] = self.stats
+        if not self._tag_throughput:
+            return lap_stats_table(stats)
+        throughputs = {
+            f"Tag: {tag}": throughput
+            for tag, throughput in self.throughput_by_tag().items()
+        }
+        if len(self._tag_stats) == 1:
+            throughputs = {}
+        overall = LapThroughput()
+        for throughput in self._tag_throughput.values():
+            overall.merge(throughput)
+        throughputs["All Laps"] = overall
+        return NL.join([
+            lap_stats_table(stats), lap_throughput_table(throughputs)
+        ])
 
     def filter(self, tag_filter: List[str] = None) -> "LapList":
         """Returns a new Filtered LapList to include only laps whose tag
@@ -86,7 +780,7 @@ class LapList(list):
         """
         if tag_filter is None:
             tag_filter = []
-        return LapList([x for x in self if x.tag in tag_filter])
+        return self._take(self._positions_for_tags(tag_filter))
 
     def exclude(self, tag_exclude: List[str] = None) -> "LapList":
         """Returns a new Filtered LapList to include all laps whose tag does
@@ -94,4 +788,363 @@ class LapList(list):
         """
         if tag_exclude is None:
             tag_exclude = []
-        return LapList([x for x in self if x.tag not in tag_exclude])
+        tags = [x for x in self._tags if x not in tag_exclude]
+        return self._take(self._positions_for_tags(tags))
+
+    def timelines(self) -> Dict[Optional[str], "LapList"]:
+        """Returns the laps of each thread or task that recorded laps"""
+        positions: Dict[int, List[int]] = {
+            index: [] for index in range(len(self._tasks))
+        }
+        keys = self._keys
+        for position, key_idx in enumerate(self._key_idx):
+            positions[keys[key_idx][2]].append(position)
+        return {
+            self._tasks[task_idx]: self._take(task_positions)
+            for task_idx, task_positions in positions.items()
+        }
+
+    def concurrency_summary(self) -> str:
+        """Returns a table of each task's timeline and of the merged
+        timeline: the wall time covered by any lap, the time where laps of
+        several tasks overlap, the max number of concurrent laps, and the
+        critical path (the task whose timeline ends last)
+        """
+        rows = []
+        intervals = []
+        critical_path = None
+        for task, laps in self.timelines().items():
+            if len(laps) == 0:
+                continue
+            starts = []
+            previous_end = None
+            for total, lap_time in zip(laps._total, laps._lap):
+                start = total - lap_time
+                # snap to the previous lap's end to undo rounding errors
+                if previous_end is not None and math.isclose(
+                    start, previous_end, rel_tol=1e-9, abs_tol=1e-12
+                ):
+                    start = previous_end
+                starts.append(start)
+                previous_end = total
+            intervals.extend(zip(starts, laps._total))
+            start, end = min(starts), max(laps._total)
+            if critical_path is None or end > critical_path[1]:
+                critical_path = (task, end)
+            rows.append([
+                task,
+                len(laps),
+                secs_to_str(start),
+                secs_to_str(end),
+                secs_to_str(laps.sum()),
+            ])
+        wall, overlap, max_concurrency = _merge_intervals(intervals)
+        busy = sum(x[1] - x[0] for x in intervals)
+        rows.append("break")
+        rows.append([
+            "Merged", len(self), f"wall {secs_to_str(wall)}",
+            f"overlap {secs_to_str(overlap)}", secs_to_str(busy)
+        ])
+        return NL.join([
+            generate_table(
+                ["Task", "Laps", "First Lap Start", "Last Lap End", "Busy"],
+                rows
+            ),
+            f"Max concurrent laps: {max_concurrency}, concurrency: "
+            f"{busy / wall if wall else 0:.2f}x, critical path: "
+            f"{critical_path[0] if critical_path else None}"
+        ])
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """Returns zero-copy numpy views of the `total_time`, `lap_time` and
+        `cpu_time` (NaN when not recorded) columns, of the `mem_delta` and
+        `mem_peak` columns when memory was recorded, and of the
+        `gc_collections` and `gc_pause` columns when collections were
+        recorded, and of the `items` and `nbytes` columns when work units
+        were recorded.  numpy must be installed,
+        and laps cannot be added while the views are alive.
+        """
+        try:
+            import numpy as np
+        except ImportError as err:
+            raise ImportError(
+                "`LapList.to_numpy` requires numpy to be installed"
+            ) from err
+        columns = {
+            "total_time": np.frombuffer(self._total, dtype=np.float64),
+            "lap_time": np.frombuffer(self._lap, dtype=np.float64),
+            "cpu_time": (
+                np.full(len(self), np.nan) if self._cpu is None
+                else np.frombuffer(self._cpu, dtype=np.float64)
+            ),
+        }
+        if self._mem_delta is not None:
+            columns["mem_delta"] = np.frombuffer(
+                self._mem_delta, dtype=np.float64
+            )
+            columns["mem_peak"] = np.frombuffer(
+                self._mem_peak, dtype=np.float64
+            )
+        if self._gc_count is not None:
+            columns["gc_collections"] = np.frombuffer(
+                self._gc_count, dtype=np.float64
+            )
+            columns["gc_pause"] = np.frombuffer(
+                self._gc_pause, dtype=np.float64
+            )
+        if self._items is not None:
+            columns["items"] = np.frombuffer(self._items, dtype=np.float64)
+            columns["nbytes"] = np.frombuffer(self._nbytes, dtype=np.float64)
+        return columns
+
+    def _make_lap(self, index: int) -> TimerLap:
+        cpu_time = NAN if self._cpu is None else self._cpu[index]
+        name_idx, tag_idx, task_idx = self._keys[self._key_idx[index]]
+        mem_delta = mem_peak = None
+        if self._mem_delta is not None:
+            mem_delta = self._mem_delta[index]
+            mem_peak = self._mem_peak[index]
+            if math.isnan(mem_delta):
+                mem_delta = mem_peak = None
+            else:
+                mem_delta, mem_peak = int(mem_delta), int(mem_peak)
+        gc_collections = gc_pause = None
+        if self._gc_count is not None:
+            gc_collections = self._gc_count[index]
+            if math.isnan(gc_collections):
+                gc_collections = None
+            else:
+                gc_collections = int(gc_collections)
+                gc_pause = self._gc_pause[index]
+        items = nbytes = None
+        if self._items is not None:
+            items, nbytes = (
+                None if math.isnan(x) else int(x)
+                for x in (self._items[index], self._nbytes[index])
+            )
+        return TimerLap(
+            self._total[index],
+            self._lap[index],
+            self._names[name_idx],
+            self._tags[tag_idx],
+            None if math.isnan(cpu_time) else cpu_time,
+            self._tasks[task_idx],
+            mem_delta,
+            mem_peak,
+            gc_collections,
+            gc_pause,
+            items,
+            nbytes
+        )
+
+    @staticmethod
+    def _work_cells(work: float, lap_time: float, unit: str) -> List[str]:
+        """Returns the work and rate cells of a lap, `--` when the lap did
+        not record that work
+        """
+        if math.isnan(work):
+            return ["--", "--"]
+        return [
+            bytes_to_str(work) if unit == "B" else f"{work:,.0f}",
+            rate_to_str(work / lap_time if lap_time > 0 else None, unit)
+        ]
+
+    def _fold(self) -> None:
+        """Adds the lap times recorded since the last fold to the per tag
+        statistics, a batch per key
+        """
+        with self._fold_lock:
+            if self.keep_laps:
+                lap_times, key_indexes = self._lap, self._key_idx
+                start = self._folded
+            else:
+                lap_times, key_indexes = self._pending_lap, self._pending_key
+                start = 0
+            # a lap being added appends its key after its time, only fold the
+            # laps whose key was appended
+            end = len(key_indexes)
+            if end == start:
+                return
+            batches: Dict[int, List[float]] = {}
+            for key_idx, lap_time in zip(
+                key_indexes[start:end], lap_times[start:end]
+            ):
+                batch = batches.get(key_idx)
+                if batch is None:
+                    batch = batches[key_idx] = []
+                batch.append(lap_time)
+            if self.keep_laps:
+                self._folded = end
+            else:
+                del lap_times[:end]
+                del key_indexes[:end]
+            for key_idx, batch in batches.items():
+                self._tag_stats[self._keys[key_idx][1]].add_many(batch)
+
+    def _intern_key(
+        self,
+        lap_name: str,
+        tag: Optional[str],
+        task: Optional[str]
+    ) -> int:
+        """Returns the index of the new key of a lap name, tag and task"""
+        key = (
+            self._intern(self._names, self._name_lookup, lap_name),
+            self._intern(self._tags, self._tag_lookup, tag),
+            self._intern(self._tasks, self._task_lookup, task),
+        )
+        if key[1] not in self._tag_stats:
+            self._tag_stats[key[1]] = LapStats()
+        key_idx = self._key_lookup[(lap_name, tag, task)] = len(self._keys)
+        self._keys.append(key)
+        return key_idx
+
+    @staticmethod
+    def _intern(values: List[Any], lookup: Dict[Any, int], value: Any) -> int:
+        """Returns the index of the value in `values`, appended if needed"""
+        index = lookup.get(value)
+        if index is None:
+            index = lookup[value] = len(values)
+            values.append(value)
+        return index
+
+    def _positions_for_tags(self, tags: Iterable[Optional[str]]) -> List[int]:
+        """Returns the sorted lap positions for all the passed tags"""
+        tag_indexes = {
+            self._tag_lookup[x] for x in tags if x in self._tag_lookup
+        }
+        key_indexes = {
+            key_idx for key_idx, key in enumerate(self._keys)
+            if key[1] in tag_indexes
+        }
+        return [
+            position for position, key_idx in enumerate(self._key_idx)
+            if key_idx in key_indexes
+        ]
+
+    def _take(self, positions: Iterable[int]) -> "LapList":
+        """Returns a new LapList with the laps at the passed positions"""
+        new_list = LapList(keep_laps=self.keep_laps)
+        for index in positions:
+            new_list.add(*self._make_lap(index))
+        return new_list
+
+
+def calibrate_lap_overhead(
+    lap_count: int = 2_000,
+    cpu_clock: Optional[Callable[[], int]] = None
+) -> float:
+    """Returns the median time in seconds of back to back `LapWatch.lap()`
+    calls: the clock reads and lap recording that every lap time includes,
+    measured with the same `cpu_clock` configuration as the laps
+    """
+    watch = LapWatch("calibration", cpu_clock=cpu_clock)
+    lap = watch.lap
+    for _ in range(lap_count):
+        lap("calibration")
+    return watch.laps.stats.percentile(50) or 0.0
+
+
+def _merge_intervals(
+    intervals: List[Tuple[float, float]]
+) -> Tuple[float, float, int]:
+    """Returns the time covered by any interval, the time covered by more
+    than one interval and the max number of overlapping intervals
+    """
+    events = sorted(
+        [(start, 1) for start, _ in intervals]
+        + [(end, -1) for _, end in intervals],
+        key=lambda x: (x[0], x[1])
+    )
+    wall = overlap = 0.0
+    active = max_active = 0
+    previous = None
+    for point, change in events:
+        if previous is not None and active > 0:
+            wall += point - previous
+            if active > 1:
+                overlap += point - previous
+        active += change
+        max_active = max(max_active, active)
+        previous = point
+    return wall, overlap, max_active
+
+
+class _LapTableRows(Sequence):
+    """The rows of the table of a `LapList`, a lap is formatted when its row
+    is read
+    """
+
+    def __init__(self, laps: LapList) -> None:
+        self.laps = laps
+        self.has_cpu = laps.has_cpu_time
+        self.has_tasks = len(laps._tasks) > 1
+        self.has_memory = laps.has_memory
+        self.has_gc = laps.has_gc
+        self.has_items = laps.has_items
+        self.has_bytes = laps.has_bytes
+        headers = ["Lap Name", "Lap Time", "Elapsed", "Tag"]
+        if self.has_cpu:
+            headers.insert(2, "CPU Time")
+        if self.has_memory:
+            headers[-1:-1] = ["Mem Delta", "Mem Peak"]
+        if self.has_gc:
+            headers[-1:-1] = ["GC", "GC Pause"]
+        if self.has_items:
+            headers[-1:-1] = ["Items", "Items/s"]
+        if self.has_bytes:
+            headers[-1:-1] = ["Bytes", "Bytes/s"]
+        if self.has_tasks:
+            headers.append("Task")
+        self.headers = headers
+
+    def __len__(self) -> int:
+        return len(self.laps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(x) for x in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("lap table row index out of range")
+        return self._row(index)
+
+    def _row(self, index: int) -> List[str]:
+        laps = self.laps
+        name_idx, tag_idx, task_idx = laps._keys[laps._key_idx[index]]
+        row = [
+            laps._names[name_idx],
+            secs_to_str(laps._lap[index]),
+            secs_to_str(laps._total[index]),
+            laps._tags[tag_idx]
+        ]
+        if self.has_cpu:
+            cpu_time = laps._cpu[index]
+            row.insert(
+                2, "--" if math.isnan(cpu_time) else secs_to_str(cpu_time)
+            )
+        if self.has_memory:
+            row[-1:-1] = [
+                "--" if math.isnan(x) else bytes_to_str(x)
+                for x in (laps._mem_delta[index], laps._mem_peak[index])
+            ]
+        if self.has_gc:
+            gc_count = laps._gc_count[index]
+            row[-1:-1] = (
+                ["--", "--"] if math.isnan(gc_count) else [
+                    f"{gc_count:,.0f}",
+                    secs_to_str(laps._gc_pause[index])
+                ]
+            )
+        if self.has_items:
+            row[-1:-1] = laps._work_cells(
+                laps._items[index], laps._lap[index], "items"
+            )
+        if self.has_bytes:
+            row[-1:-1] = laps._work_cells(
+                laps._nbytes[index], laps._lap[index], "B"
+            )
+        if self.has_tasks:
+            row.append(laps._tasks[task_idx])
+        return row
@@ -0,0 +1,133 @@
+import heapq
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+from .lap_stats import LapStats, lap_stats_table
+from .printing import generate_table, secs_to_str
+from .timer_laps import LapWatch
+
+
+class LapWatchRollup:
+    """Session wide aggregation of every `LapWatch` recorded by the `timer`
+    fixture.  Only statistics and the `top` slowest laps are kept, so the
+    memory used does not grow with the number of laps in the session, no
+    laps are added when `top` is 0.
+    """
+
+    def __init__(self, top: int = 10) -> None:
+        self.top = top
+        self.watch_count = 0
+        self.lap_count = 0
+        self.by_name_tag: Dict[Tuple[str, Optional[str]], LapStats] = {}
+        self.by_module: Dict[str, LapStats] = {}
+        self.by_class: Dict[str, LapStats] = {}
+        self.by_tag: Dict[Optional[str], LapStats] = {}
+        self._slowest: List[Tuple[float, int, str, str, Optional[str]]] = []
+        self._counter = count()
+
+    def add(
+        self,
+        watch: LapWatch,
+        node_id: str,
+        module_name: str,
+        class_name: Optional[str] = None
+    ) -> None:
+        """Adds the laps of a `LapWatch` to the session totals"""
+        laps = watch.laps
+        if self.top <= 0 or laps.count == 0:
+            return
+        self.watch_count += 1
+        self.lap_count += laps.count
+        watch_stats = laps.stats
+        self._stats_for(self.by_module, module_name).merge(watch_stats)
+        if class_name is not None:
+            self._stats_for(self.by_class, class_name).merge(watch_stats)
+        for tag, tag_stats in laps.group_by_tag().items():
+            self._stats_for(self.by_tag, tag).merge(tag_stats)
+            if not laps.keep_laps:
+                self._stats_for(
+                    self.by_name_tag, ("(laps not kept)", tag)
+                ).merge(tag_stats)
+                self._add_slow_lap(
+                    tag_stats.max, node_id, "(laps not kept)", tag
+                )
+        for lap in laps:
+            self._stats_for(
+                self.by_name_tag, (lap.lap_name, lap.tag)
+            ).add(lap.lap_time)
+            self._add_slow_lap(lap.lap_time, node_id, lap.lap_name, lap.tag)
+
+    def slowest_laps(self) -> List[Tuple[float, str, str, Optional[str]]]:
+        """Returns the `(lap_time, node_id, lap_name, tag)` of the slowest
+        laps, slowest first
+        """
+        return [
+            (x[0], x[2], x[3], x[4])
+            for x in sorted(self._slowest, reverse=True)
+        ]
+
+    def summary_sections(self) -> List[Tuple[str, str]]:
+        """Returns `(title, table)` tuples to print in the terminal
+        summary, empty when no laps were recorded
+        """
+        if self.lap_count == 0:
+            return []
+        sections = [
+            (
+                f"Slowest {self.top} laps",
+                generate_table(
+                    ["Lap Time", "Lap Name", "Tag", "Test"],
+                    [
+                        [secs_to_str(lap_time), lap_name, tag, node_id]
+                        for lap_time, node_id, lap_name, tag
+                        in self.slowest_laps()
+                    ],
+                    justification=[">", "<", "<", "<"]
+                )
+            ),
+            (
+                "Laps by name and tag",
+                self._top_table({
+                    f"{name} [{tag}]": stats
+                    for (name, tag), stats in self.by_name_tag.items()
+                })
+            ),
+            ("Laps by module", self._top_table(self.by_module)),
+        ]
+        if self.by_class:
+            sections.append(
+                ("Laps by common class", self._top_table(self.by_class))
+            )
+        sections.append((
+            "Total time per tag",
+            self._top_table({str(k): v for k, v in self.by_tag.items()})
+        ))
+        return sections
+
+    def _top_table(self, stats: Dict[str, LapStats]) -> str:
+        """Returns the statistics table of the `top` items by total time"""
+        top_items = heapq.nlargest(
+            self.top, stats.items(), key=lambda x: x[1].total
+        )
+        return lap_stats_table(dict(top_items))
+
+    def _add_slow_lap(
+        self,
+        lap_time: float,
+        node_id: str,
+        lap_name: str,
+        tag: Optional[str]
+    ) -> None:
+        if self.top <= 0:
+            return
+        item = (lap_time, next(self._counter), node_id, lap_name, tag)
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, item)
+        elif lap_time > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    @staticmethod
+    def _stats_for(stats: Dict, key) -> LapStats:
+        if key not in stats:
+            stats[key] = LapStats()
+        return stats[key]
@@ -0,0 +1,169 @@
+import functools
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .printing import generate_table, secs_to_str
+from .timer import NS_PER_SEC, current_task_key
+
+
+class SpanNode:
+    """Aggregated timing of every execution of a named span under the same
+    parent span, repeated spans (for example in a loop) add to the same node
+    """
+    __slots__ = ("name", "count", "total_ns", "children")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.children: Dict[str, "SpanNode"] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"SpanNode(name={self.name!r}, count={self.count}, "
+            f"total_time={self.total_time})"
+        )
+
+    @property
+    def total_time(self) -> float:
+        """Seconds spent in the span including its children"""
+        return self.total_ns / NS_PER_SEC
+
+    @property
+    def child_time(self) -> float:
+        """Seconds spent in the span's children"""
+        return sum(x.total_ns for x in self.children.values()) / NS_PER_SEC
+
+    @property
+    def self_time(self) -> float:
+        """Seconds spent in the span excluding its children"""
+        return self.total_time - self.child_time
+
+    def child(self, name: str) -> "SpanNode":
+        """Returns the named child span, creating it if needed"""
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = SpanNode(name)
+        return node
+
+    def walk(self, depth: int = 0) -> Iterator[Tuple[int, "SpanNode"]]:
+        """Yields `(depth, node)` for the children, depth first"""
+        for node in self.children.values():
+            yield depth, node
+            yield from node.walk(depth + 1)
+
+
+class SpanContext:
+    """Context manager returned by `SpanTree.span`, times one execution of
+    the span
+    """
+    __slots__ = ("_tree", "_name", "_node", "_start", "_task", "_stack")
+
+    def __init__(self, tree: "SpanTree", name: str) -> None:
+        self._tree = tree
+        self._name = name
+
+    def __enter__(self) -> SpanNode:
+        tree = self._tree
+        self._task = current_task_key()
+        stack = tree._stacks.get(self._task)
+        if stack is None:
+            stack = tree._stacks[self._task] = [tree.root]
+        with tree._lock:
+            self._node = stack[-1].child(self._name)
+        stack.append(self._node)
+        self._stack = stack
+        self._start = tree._clock()
+        return self._node
+
+    def __exit__(self, *exc_info: Any) -> None:
+        tree = self._tree
+        elapsed = tree._clock() - self._start
+        with tree._lock:
+            self._node.count += 1
+            self._node.total_ns += elapsed
+        self._stack.pop()
+        if len(self._stack) == 1:
+            tree._stacks.pop(self._task, None)
+
+
+class SpanTree:
+    """Tree of nested timing spans, built with the `span` context manager and
+    the `timed` decorator.  Each thread or `asyncio` task has its own stack of
+    open spans, a thread's or task's outermost spans are children of the root
+    of the tree.
+    """
+
+    def __init__(self, clock: Callable[[], int]) -> None:
+        self._clock = clock
+        self.root = SpanNode("")
+        self._lock = threading.Lock()
+        self._stacks: Dict[int, List[SpanNode]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.root.children)
+
+    def __str__(self) -> str:
+        return f"{self.table()}\n{self.flame()}"
+
+    def span(self, name: str) -> SpanContext:
+        """Returns a context manager that times the enclosed code as a child
+        of the currently open span
+        """
+        return SpanContext(self, name)
+
+    def timed(
+        self,
+        name: Optional[str] = None
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator that times every call of the function as a span, the
+        span name defaults to the function's qualified name
+        """
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with SpanContext(self, span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def table(self) -> str:
+        """Returns a table of the spans with names indented by depth"""
+        run_total = sum(x.total_ns for x in self.root.children.values())
+        return generate_table(
+            ["Span", "Calls", "Total", "Self", "Children", "% of Total"],
+            [
+                [
+                    f"{'  ' * depth}{node.name}",
+                    node.count,
+                    secs_to_str(node.total_time),
+                    secs_to_str(node.self_time),
+                    secs_to_str(node.child_time),
+                    f"{node.total_ns / run_total:.1%}" if run_total else "--"
+                ]
+                for depth, node in self.root.walk()
+            ],
+            justification=["<", ">", ">", ">", ">", ">"]
+        )
+
+    def flame(self, width: int = 60) -> str:
+        """Returns an icicle chart of the spans, each bar is proportional to
+        the span's total time and starts where its parent starts
+        """
+        run_total = sum(x.total_ns for x in self.root.children.values())
+        if run_total == 0:
+            return ""
+        lines = []
+
+        def add_lines(node: SpanNode, offset: int) -> None:
+            for child in node.children.values():
+                bar_len = max(1, round(child.total_ns / run_total * width))
+                label = f"{child.name} ({secs_to_str(child.total_time)})"
+                lines.append(f"{' ' * offset}{'#' * bar_len} {label}")
+                add_lines(child, offset)
+                offset += bar_len
+
+        add_lines(self.root, 0)
+        return "\n".join(lines)
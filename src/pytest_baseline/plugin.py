@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*
 
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Generator, Optional
 
 import pytest
 from _pytest.config import Config, PytestPluginManager
@@ -9,13 +9,22 @@ from _pytest.fixtures import FixtureRequest
 
 from .BaselineTestManager import BaselineTestManager, FixtureExtraList
 from .helpers.framework import get_module_defined_configuration
+from .helpers.lap_memory import LapMemoryTracker
+from .helpers.lap_profiler import LAP_PROFILERS
+from .helpers.time_budget import BUDGET_ACTIONS
+from .helpers.timer import CPU_CLOCKS
 from .helpers.timer_laps import LapWatch
 
+# Max number of laps in the lap table of the `LapWatch` report extra, the
+# first and last laps are included
+REPORT_MAX_LAPS = 100
+
 
 @pytest.fixture(name="timer")
-def fixture_timer(request: FixtureRequest) -> LapWatch:
+def fixture_timer(request: FixtureRequest) -> Generator[LapWatch, None, None]:
     """Returns a Lapwatch that can be used to record 'laps' to time certian
-    parts of the test execution
+    parts of the test execution, at teardown the laps are added to the
+    session timer summary
     """
     module_name = request.module.__name__
     func_name = request.function.__name__
@@ -23,7 +32,27 @@ def fixture_timer(request: FixtureRequest) -> LapWatch:
         test_name = f"{module_name}::{func_name}"
     else:
         test_name = f"{module_name}::{request.cls.__name__}.{func_name}"
-    return LapWatch(test_name)
+    cpu_clock = CPU_CLOCKS.get(request.config.getoption("BASELINE_CPU_TIME"))
+    baseline_plugin = getattr(request.config, "_baseline", None)
+    overhead = 0.0
+    if baseline_plugin is not None and baseline_plugin.subtract_overhead:
+        overhead = baseline_plugin.lap_overhead
+    watch = LapWatch(test_name, cpu_clock=cpu_clock, overhead=overhead)
+    if request.config.getoption("BASELINE_MEMORY"):
+        watch.attach_memory_tracker(LapMemoryTracker(
+            top_laps=request.config.getoption("BASELINE_MEMORY_SITES")
+        ))
+    if baseline_plugin is not None and baseline_plugin.gc_monitor is not None:
+        watch.attach_gc_monitor(baseline_plugin.gc_monitor)
+    if baseline_plugin is not None:
+        profiler = baseline_plugin.lap_profiler_for(request.node)
+        if profiler is not None:
+            watch.attach_profiler(profiler)
+    yield watch
+    watch.close_profiler()
+    watch.close_memory_tracker()
+    if baseline_plugin is not None:
+        baseline_plugin.add_lap_watch(request.node, watch)
 
 
 @pytest.fixture(name="env", scope="session")
@@ -148,6 +177,186 @@ def pytest_addoption(
         default="DEFAULT",
         help="Environment name to pass to tests"
     )
+    group.addoption(
+        "--baseline-cpu-time",
+        dest="BASELINE_CPU_TIME",
+        action="store",
+        default=None,
+        choices=sorted(CPU_CLOCKS.keys()),
+        help="Record process or thread CPU time next to wall time for each "
+             "`timer` fixture lap"
+    )
+    group.addoption(
+        "--baseline-subtract-overhead",
+        dest="BASELINE_SUBTRACT_OVERHEAD",
+        action="store_true",
+        default=False,
+        help="Subtract the cost of a `timer` fixture lap, measured once at "
+             "the start of the session and shown in the header, from every "
+             "lap time"
+    )
+    group.addoption(
+        "--baseline-timer-summary",
+        dest="BASELINE_TIMER_SUMMARY",
+        action="store",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of rows in each table of the session timer summary "
+             "printed for the `timer` fixture laps, 0 to disable it, the "
+             "clockit, lap matrix and GC summaries are not affected "
+             "(default: 10)"
+    )
+    group.addoption(
+        "--baseline-regression",
+        dest="BASELINE_REGRESSION",
+        action="store",
+        default="off",
+        choices=["off", "warn", "fail"],
+        help="Action when a `timer` fixture lap is slower than its persisted "
+             "baseline for the `--env`, `warn` and `fail` also record the "
+             "baselines (default: off)"
+    )
+    group.addoption(
+        "--baseline-update",
+        dest="BASELINE_UPDATE",
+        action="store_true",
+        default=False,
+        help="Replace the persisted lap baselines with this run's laps"
+    )
+    group.addoption(
+        "--baseline-dir",
+        dest="BASELINE_DIR",
+        action="store",
+        default=None,
+        help="Directory to persist lap baselines in, one `{env}.json` file "
+             "per environment (default: the pytest cache)"
+    )
+    group.addoption(
+        "--baseline-rel-threshold",
+        dest="BASELINE_REL_THRESHOLD",
+        action="store",
+        type=float,
+        default=0.25,
+        help="Relative increase of a lap's median over its baseline to be a "
+             "regression (default: 0.25)"
+    )
+    group.addoption(
+        "--baseline-abs-threshold",
+        dest="BASELINE_ABS_THRESHOLD",
+        action="store",
+        type=float,
+        default=0.005,
+        help="Increase in seconds of a lap's median over its baseline to be "
+             "a regression (default: 0.005)"
+    )
+    group.addoption(
+        "--baseline-budget-action",
+        dest="BASELINE_BUDGET_ACTION",
+        action="store",
+        default="fail",
+        choices=BUDGET_ACTIONS,
+        help="Action for tests over the `time_budget` or with `timer` "
+             "fixture laps over the `lap_budget_data` module variables, "
+             "overridden by the `budget_action` module variable "
+             "(default: fail)"
+    )
+    group.addoption(
+        "--baseline-memory",
+        dest="BASELINE_MEMORY",
+        action="store_true",
+        default=False,
+        help="Record the memory allocated (delta and peak) between "
+             "consecutive `timer` fixture laps with tracemalloc"
+    )
+    group.addoption(
+        "--baseline-memory-sites",
+        dest="BASELINE_MEMORY_SITES",
+        action="store",
+        type=int,
+        default=3,
+        metavar="N",
+        help="Number of laps with the largest memory delta to report the top "
+             "allocation sites of, 0 to skip the tracemalloc snapshots "
+             "(default: 3)"
+    )
+    group.addoption(
+        "--baseline-profile-laps",
+        dest="BASELINE_PROFILE_LAPS",
+        action="store",
+        default=None,
+        choices=sorted(LAP_PROFILERS.keys()),
+        help="Profile the code between consecutive `timer` fixture laps with "
+             "cProfile or a statistical sampler, for every test (the "
+             "`baseline_profile` marker enables it for a single test)"
+    )
+    group.addoption(
+        "--baseline-profile-top",
+        dest="BASELINE_PROFILE_TOP",
+        action="store",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of functions by cumulative time to report for each "
+             "profiled lap (default: 10)"
+    )
+    group.addoption(
+        "--baseline-profile-dir",
+        dest="BASELINE_PROFILE_DIR",
+        action="store",
+        default=None,
+        help="Directory to write the lap profiles to, `.pstats` files for "
+             "cProfile and `.folded` stacks for the sampler (default: the "
+             "pytest cache)"
+    )
+    group.addoption(
+        "--baseline-lap-matrix-factor",
+        dest="BASELINE_LAP_MATRIX_FACTOR",
+        action="store",
+        type=float,
+        default=3.0,
+        metavar="FACTOR",
+        help="Report the `timer` fixture laps over FACTOR times the median "
+             "of the same test and lap name in the other modules and "
+             "parametrizations, 0 to disable (default: 3.0)"
+    )
+    group.addoption(
+        "--baseline-lap-matrix-csv",
+        dest="BASELINE_LAP_MATRIX_CSV",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help="Write the lap matrix, the statistics of every test and lap "
+             "name by module and parametrization, to a csv file"
+    )
+    group.addoption(
+        "--baseline-gc-monitor",
+        dest="BASELINE_GC_MONITOR",
+        action="store_true",
+        default=False,
+        help="Measure the cyclic garbage collections (count and pause time) "
+             "of every test and `timer` fixture lap, shown as report "
+             "columns and in a terminal summary"
+    )
+    group.addoption(
+        "--baseline-perf",
+        dest="BASELINE_PERF",
+        action="store_true",
+        default=False,
+        help="Run every test with the cyclic GC disabled (collected between "
+             "`timer` fixture laps) and pinned to a fixed CPU set, as the "
+             "`baseline_perf` marker does for a single test"
+    )
+    group.addoption(
+        "--baseline-perf-cpus",
+        dest="BASELINE_PERF_CPUS",
+        action="store",
+        default=None,
+        metavar="CPUS",
+        help="CPU list to pin `baseline_perf` tests to, in the `taskset` "
+             "format, for example `2,3` or `0-3` (default: the first CPU "
+             "the process may run on)"
+    )
 ###############################################################################
 
 
@@ -155,4 +364,14 @@ def pytest_baseline_fixtures_add_to_report(
     fixtures_extra_config: FixtureExtraList
 ) -> None:
     """Add to List for fixtures to include on HTML Report"""
-    fixtures_extra_config.add_fixture_extra_config(LapWatch)
+    fixtures_extra_config.add_fixture_extra_config(
+        LapWatch,
+        print_func=lap_watch_printout
+    )
+
+
+def lap_watch_printout(fixture_value: LapWatch, *args, **kwargs) -> str:
+    """Print function for the `LapWatch` report extra, the lap table only
+    includes the first and last laps
+    """
+    return fixture_value.report(max_laps=REPORT_MAX_LAPS)
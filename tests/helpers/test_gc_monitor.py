@@ -0,0 +1,97 @@
+import gc
+
+from pytest_baseline.helpers.gc_monitor import GCMonitor, GCTotals
+from pytest_baseline.helpers.timer_laps import LapList, LapWatch
+
+
+def test_gc_monitor_counts_collections():
+    """Ensure collections are counted by generation with their pause, and
+    the callback is removed on uninstall
+    """
+    monitor = GCMonitor()
+    monitor.install()
+    monitor.install()
+    try:
+        assert gc.callbacks.count(monitor._callback) == 1
+        start = monitor.totals()
+        gc.collect(0)
+        gc.collect()
+        collections, pause = monitor.since(start)
+    finally:
+        monitor.uninstall()
+    assert monitor._callback not in gc.callbacks
+    assert not monitor.installed
+    assert collections == 2
+    assert pause > 0
+    assert monitor.collections[0] >= 1
+    assert monitor.collections[2] >= 1
+    assert len(monitor) >= 2
+    assert monitor.max_pause_ns > 0
+
+    gc.collect()
+    assert monitor.totals().collections == len(monitor)
+
+    summary = monitor.summary()
+    print(summary)
+    assert "| Generation | Collections |" in summary
+    assert "Top 10 tests by GC pause:" not in summary
+
+
+def test_gc_monitor_top_tests():
+    """Ensure only the `top` tests with the longest GC pauses are kept,
+    longest first, and tests without collections are ignored
+    """
+    monitor = GCMonitor(top=2)
+    monitor.add_test("test_a", GCTotals(1, 0.002))
+    monitor.add_test("test_b", GCTotals(0, 0.0))
+    monitor.add_test("test_c", GCTotals(3, 0.010))
+    monitor.add_test("test_d", GCTotals(1, 0.001))
+    monitor.add_test("test_e", GCTotals(2, 0.005))
+    summary = monitor.summary()
+    print(summary)
+    assert "Top 2 tests by GC pause:" in summary
+    lines = summary.splitlines()
+    rows = [x for x in lines if x.startswith("| test_")]
+    assert [x.split()[1] for x in rows] == ["test_c", "test_e"]
+
+
+def test_lap_watch_gc_columns():
+    """Ensure laps get the collections between consecutive laps"""
+    monitor = GCMonitor()
+    watch = LapWatch("gc")
+    watch.attach_gc_monitor(monitor)
+    try:
+        watch.lap("quiet")
+        gc.collect()
+        gc.collect()
+        watch.lap("collect")
+    finally:
+        monitor.uninstall()
+    quiet, collect = watch.laps
+    assert collect.gc_collections >= 2
+    assert collect.gc_pause > 0
+    assert collect.gc_pause < collect.lap_time
+    assert quiet.gc_collections < 2
+    output = str(watch.laps)
+    print(output)
+    assert "| GC | GC Pause |" in output
+
+
+def test_LapList_gc_columns():
+    """Ensure GC columns are only added once a lap has collections, earlier
+    laps show `--`
+    """
+    laps = LapList()
+    laps.add(0.1, 0.1, "first")
+    assert not laps.has_gc
+    assert "GC Pause" not in str(laps)
+    laps.add(0.3, 0.2, "second", gc_collections=3, gc_pause=0.002)
+    assert laps.has_gc
+    assert laps[0].gc_collections is None
+    assert laps[0].gc_pause is None
+    assert laps[1].gc_collections == 3
+    assert laps[1].gc_pause == 0.002
+    output = str(laps)
+    print(output)
+    assert "--" in output.splitlines()[3]
+    assert laps[1:][0].gc_collections == 3
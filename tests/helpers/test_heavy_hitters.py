@@ -0,0 +1,61 @@
+from collections import Counter
+from random import Random
+
+import pytest
+
+from pytest_baseline.helpers.heavy_hitters import HeavyHitter, SpaceSaving
+
+
+def test_space_saving_exact_under_capacity():
+    """Ensure values are counted exactly while they fit in the counters"""
+    hitters = SpaceSaving(capacity=3)
+    hitters.update(["a", "b", "a", "c", "a", "b"])
+    hitters.add("c", count=5)
+    assert len(hitters) == 3
+    assert hitters.total == 11
+    assert hitters.evictions == 0
+    assert hitters.most_common() == [
+        HeavyHitter("c", 6, 0), HeavyHitter("a", 3, 0), HeavyHitter("b", 2, 0)
+    ]
+    assert hitters.most_common(1) == [HeavyHitter("c", 6, 0)]
+
+
+def test_space_saving_evicts_lowest_count():
+    """Ensure a new value replaces the lowest count and inherits it as its
+    error
+    """
+    hitters = SpaceSaving(capacity=2)
+    hitters.update(["a", "a", "a", "b", "b", "c"])
+    assert hitters.most_common() == [
+        HeavyHitter("a", 3, 0), HeavyHitter("c", 3, 2)
+    ]
+    assert hitters.most_common()[1].min_count == 1
+    assert hitters.total == 6
+    assert hitters.evictions == 1
+
+
+def test_space_saving_heavy_hitters_of_skewed_stream():
+    """Ensure the frequent values of a long tailed stream are all found, with
+    counts within their error of the true counts
+    """
+    rng = Random(0)
+    values = [
+        f"hot{rng.randrange(5)}" if rng.random() < 0.5
+        else f"cold{rng.randrange(100_000)}"
+        for _ in range(50_000)
+    ]
+    true_counts = Counter(values)
+    hitters = SpaceSaving(capacity=100)
+    hitters.update(iter(values))
+    assert len(hitters) == 100
+    assert sum(x.count for x in hitters.most_common()) == len(values)
+    top = hitters.most_common(5)
+    assert {x.value for x in top} == {f"hot{x}" for x in range(5)}
+    for hitter in top:
+        assert hitter.min_count <= true_counts[hitter.value] <= hitter.count
+        assert hitter.error <= len(values) / hitters.capacity
+
+
+def test_space_saving_capacity():
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
@@ -0,0 +1,171 @@
+import json
+from enum import Enum, IntEnum
+
+import pytest
+
+from pytest_baseline.helpers.json_backends import (DEFAULT_JSON_BACKEND,
+                                                   ascii_escape,
+                                                   available_json_backends,
+                                                   fast_json_dumps,
+                                                   needs_json_module)
+from pytest_baseline.helpers.printing import json_dump_iter, json_dumps
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Level(IntEnum):
+    HIGH = 3
+
+
+class Ratio(float):
+    pass
+
+
+class Name(str):
+    pass
+
+
+def test_available_json_backends():
+    """Ensure the json module is always available and is the last resort"""
+    backends = available_json_backends()
+    assert backends[-1] == "json"
+    assert DEFAULT_JSON_BACKEND == backends[0]
+
+
+def test_ascii_escape():
+    """Ensure non-ASCII characters are escaped as the json module does"""
+    value = "café ✓ \U0001f600"
+    assert ascii_escape(json.dumps(value, ensure_ascii=False)) == (
+        json.dumps(value)
+    )
+    assert ascii_escape("plain") == "plain"
+    assert ascii_escape('"\x7f"') == json.dumps("\x7f")
+
+
+def test_fast_json_dumps_json_backend():
+    assert fast_json_dumps({"a": 1}, "json") is None
+    assert fast_json_dumps({"a": 1}, "not-a-backend") is None
+
+
+@pytest.mark.parametrize("backend", available_json_backends()[:-1])
+def test_fast_json_dumps(backend):
+    """Ensure the fast backends match the json module layout, with `str()`
+    of objects that are not serializable, and give up on what they cannot
+    serialize
+    """
+    data = {"a": [1, "café", None], "b": {"c": {1}}, "d": {}}
+    assert fast_json_dumps(data, backend) == json.dumps(
+        data, indent=2, default=str
+    )
+    assert fast_json_dumps(data, backend, indent=None) == json.dumps(
+        data, separators=(",", ":"), default=str
+    )
+    assert fast_json_dumps(data, backend, ensure_ascii=False) == json.dumps(
+        data, indent=2, default=str, ensure_ascii=False
+    )
+    assert fast_json_dumps({"big": 2 ** 70}, backend) is None
+
+
+@pytest.mark.parametrize("value", [
+    float("nan"), float("inf"), -float("inf"), 1e20, -1e16, 1e-5,
+    Color.RED, Level.HIGH, {Color.RED: 1}, {(1, 2): 1}, {float("nan"): 1},
+    Ratio(1.5), Name("a"), {Name("a"): 1}, object(),
+])
+def test_needs_json_module(value):
+    """Ensure what fast backends write differently than the json module is
+    left to it, even nested
+    """
+    assert needs_json_module(value)
+    assert needs_json_module({"a": [1, {"b": (value,)}]})
+    for backend in available_json_backends():
+        assert fast_json_dumps({"a": [value]}, backend) is None
+
+
+def test_needs_json_module_plain_values():
+    shared = [1, 2]
+    data = {
+        "a": [0.0, -0.0, 1.5, 1e15, 1e-4, 5, True, None, "text"],
+        "b": (shared, shared),
+        1: {2.5: None, None: 0, False: "x"},
+        "c": {1},
+    }
+    assert not needs_json_module(data)
+
+
+def test_needs_json_module_depth():
+    """Ensure deep documents and circular references end the walk"""
+    deep = []
+    for _ in range(100):
+        deep = [1.5, {"a": deep}]
+    assert not needs_json_module(deep)
+    assert needs_json_module(json.loads("[" * 300 + "]" * 300))
+    cycle = []
+    cycle.append(cycle)
+    assert needs_json_module(cycle)
+    for backend in available_json_backends()[:-1]:
+        assert fast_json_dumps(cycle, backend) is None
+
+
+@pytest.mark.parametrize("value", [
+    float("nan"), float("inf"), -float("inf"), 1e20, 1e-7, Color.RED,
+])
+def test_json_dumps_matches_json_module(value):
+    """Ensure `json_dumps` writes NaN, infinities, exponents and `Enum`
+    members as the json module with `default=str` does, whatever the
+    backend
+    """
+    data = {"value": value, "list": [value, 1.5]}
+    expected = json.dumps(data, indent=2, default=str)
+    for backend in available_json_backends():
+        assert json_dumps(data, backend=backend) == expected
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_json_dumps_escapes_match_json_module(ensure_ascii):
+    """Ensure control characters, DEL and non-ASCII characters are escaped
+    as the json module does, whatever the backend
+    """
+    data = {"\x7f": "".join(map(chr, range(0x20))) + "\x7f é \U0001f600"}
+    expected = json.dumps(data, indent=2, ensure_ascii=ensure_ascii)
+    for backend in available_json_backends():
+        assert json_dumps(
+            data, backend=backend, ensure_ascii=ensure_ascii
+        ) == expected
+
+
+def test_json_dumps_float_subclass_matches_json_module():
+    """Ensure float subclasses are written as numbers, not as their `str()`
+    """
+    data = {"value": Ratio(1.5), "list": [Ratio(2.25)]}
+    expected = json.dumps(data, indent=2)
+    assert '"1.5"' not in expected
+    for backend in available_json_backends():
+        assert json_dumps(data, backend=backend) == expected
+
+
+def test_json_dumps_numpy_scalars_match_json_module():
+    numpy = pytest.importorskip("numpy")
+    data = {"value": numpy.float64(1.5), "list": [numpy.float64(0.1)]}
+    expected = json.dumps(data, indent=2, default=str)
+    for backend in available_json_backends():
+        assert json_dumps(data, backend=backend) == expected
+
+
+def test_json_dumps_sort_keys():
+    """Ensure keys are sorted as the json module does, and keys that cannot
+    be compared raise its `TypeError`, whatever the backend
+    """
+    data = {10: 1, 2: 2, "nested": {"b": 1, "a": 2}}
+    for backend in available_json_backends():
+        with pytest.raises(TypeError):
+            json_dumps(data, backend=backend, sort_keys=True)
+        with pytest.raises(TypeError):
+            "".join(json_dump_iter(data, backend=backend, sort_keys=True))
+    data = {10: 1, 2: 2}
+    expected = json.dumps(data, indent=2, sort_keys=True)
+    for backend in available_json_backends():
+        assert json_dumps(data, backend=backend, sort_keys=True) == expected
+    assert needs_json_module(data, sort_keys=True)
+    assert not needs_json_module(data)
@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+from pytest_baseline.helpers.lap_baseline import (LapBaselineStore,
+                                                  lap_baseline_entries)
+from pytest_baseline.helpers.timer_laps import LapWatch
+
+
+def make_watch(*lap_times: float) -> LapWatch:
+    watch = LapWatch("test")
+    total = 0.0
+    for lap_time in lap_times:
+        total += lap_time
+        watch.laps.add(total, lap_time, "query")
+    return watch
+
+
+def test_lap_baseline_entries():
+    """Ensure statistics are generated per lap name"""
+    entries = lap_baseline_entries(make_watch(0.1, 0.2, 0.3))
+    assert list(entries.keys()) == ["query"]
+    assert entries["query"]["count"] == 3
+    assert entries["query"]["max"] == 0.3
+
+
+def test_lap_baseline_store_directory(tmp_path):
+    """Ensure baselines are saved to and compared from the directory"""
+    config = SimpleNamespace(cache=None)
+    store = LapBaselineStore(config, "dev", directory=str(tmp_path))
+    assert store.compare("test_a", make_watch(0.1)) == []
+    store.save()
+    saved = json.loads((tmp_path / "dev.json").read_text())
+    assert saved["test_a"]["query"]["p50"] == 0.1
+
+    # Within the thresholds
+    store = LapBaselineStore(config, "dev", directory=str(tmp_path))
+    assert store.compare("test_a", make_watch(0.12)) == []
+
+    # Regressed, existing baselines are kept without `update`
+    messages = store.compare("test_a", make_watch(0.2))
+    assert len(messages) == 1
+    assert "Lap 'query' regressed in env 'dev'" in messages[0]
+    store.save()
+    saved = json.loads((tmp_path / "dev.json").read_text())
+    assert saved["test_a"]["query"]["p50"] == 0.1
+
+    # Accept new numbers with `update`
+    store.save(update=True)
+    saved = json.loads((tmp_path / "dev.json").read_text())
+    assert saved["test_a"]["query"]["p50"] == 0.2
+
+
+def test_lap_baseline_store_abs_threshold(tmp_path):
+    """Ensure small absolute increases are not regressions"""
+    config = SimpleNamespace(cache=None)
+    store = LapBaselineStore(config, "dev", directory=str(tmp_path))
+    store.compare("test_a", make_watch(0.001))
+    store.save()
+    store = LapBaselineStore(config, "dev", directory=str(tmp_path))
+    assert store.compare("test_a", make_watch(0.004)) == []
+    store = LapBaselineStore(
+        config, "dev", directory=str(tmp_path), abs_threshold=0.001
+    )
+    assert len(store.compare("test_a", make_watch(0.004))) == 1
+
+
+def test_lap_baseline_store_disabled():
+    """Ensure nothing is persisted without a cache or directory"""
+    store = LapBaselineStore(SimpleNamespace(cache=None), "dev")
+    assert not store.enabled
+    assert store.compare("test_a", make_watch(0.1)) == []
+    store.save()
+
+
+def test_lap_baseline_store_throughput(tmp_path):
+    """Ensure laps with items are compared on their throughput, not on
+    their duration
+    """
+    config = SimpleNamespace(cache=None)
+    watch = LapWatch("test")
+    watch.laps.add(1.0, 1.0, "load", items=1000)
+    store = LapBaselineStore(config, "dev", directory=str(tmp_path))
+    assert store.compare("test_a", watch) == []
+    store.save()
+    saved = json.loads((tmp_path / "dev.json").read_text())
+    assert saved["test_a"]["load"]["items_per_sec"] == 1000
+
+    # Twice the work in twice the time is not a regression
+    watch = LapWatch("test")
+    watch.laps.add(2.0, 2.0, "load", items=2000)
+    store = LapBaselineStore(config, "dev", directory=str(tmp_path))
+    assert store.compare("test_a", watch) == []
+
+    watch = LapWatch("test")
+    watch.laps.add(1.0, 1.0, "load", items=500)
+    assert store.compare("test_a", watch) == [
+        "Lap 'load' regressed in env 'dev': 500 items/s vs baseline "
+        "1,000 items/s (-50%)"
+    ]
@@ -0,0 +1,137 @@
+import csv
+import statistics
+from types import SimpleNamespace
+
+import pytest
+
+from pytest_baseline.helpers.lap_matrix import (
+    LapMatrix,
+    _median_without,
+    lap_matrix_keys,
+)
+from pytest_baseline.helpers.timer_laps import LapWatch
+
+
+def make_watch(**lap_times: float) -> LapWatch:
+    watch = LapWatch("test")
+    total = 0.0
+    for lap_name, lap_time in lap_times.items():
+        total += lap_time
+        watch.laps.add(total, lap_time, lap_name)
+    return watch
+
+
+def make_matrix(factor: float = 3.0) -> LapMatrix:
+    matrix = LapMatrix(factor=factor)
+    for index in range(5):
+        matrix.add(
+            make_watch(query=0.01 * (1 + index / 10), parse=0.002),
+            "TestTable.test_row_count",
+            f"test_table_{index}"
+        )
+    matrix.add(
+        make_watch(query=0.5, parse=0.002),
+        "TestTable.test_row_count",
+        "test_table_slow"
+    )
+    matrix.add(make_watch(query=1.0), "test_other", "test_table_0")
+    return matrix
+
+
+def test_lap_matrix_outliers():
+    """Ensure only the cells over `factor` times their row median are
+    outliers, rows with too few columns are ignored
+    """
+    matrix = make_matrix()
+    assert len(matrix) == 3
+    assert len(matrix.columns) == 6
+    outliers = matrix.outliers()
+    assert len(outliers) == 1
+    outlier = outliers[0]
+    assert outlier.test_name == "TestTable.test_row_count"
+    assert outlier.lap_name == "query"
+    assert outlier.column == "test_table_slow"
+    assert outlier.ratio > 30
+    table = matrix.outliers_table()
+    print(table)
+    assert "| TestTable.test_row_count | query    | test_table_slow |" in table
+
+    assert make_matrix(factor=0).outliers() == []
+    assert len(make_matrix(factor=1.01).outliers()) > 1
+
+
+def test_lap_matrix_row_median_excludes_cell():
+    """Ensure a cell is compared to the median of the other columns of its
+    row, not to a median it is part of
+    """
+    matrix = LapMatrix(factor=3.0, min_columns=2)
+    matrix.add(make_watch(query=0.1), "test_a", "fast")
+    matrix.add(make_watch(query=1.0), "test_a", "slow")
+    assert matrix.row_medians() == {
+        ("test_a", "query"): {"fast": 1.0, "slow": 0.1}
+    }
+    outliers = matrix.outliers()
+    assert [x.column for x in outliers] == ["slow"]
+    assert outliers[0].row_median == 0.1
+
+    matrix.add(make_watch(query=0.2), "test_b", "fast")
+    assert matrix.row_medians()[("test_b", "query")] == {"fast": None}
+    assert [x.column for x in matrix.outliers()] == ["slow"]
+
+
+def test_median_without():
+    """Ensure the median without one value matches removing it first"""
+    values = [0.5, 0.1, 0.3, 0.3, 0.9, 0.2]
+    for size in range(2, len(values) + 1):
+        ordered = sorted(values[:size])
+        for index in range(size):
+            others = ordered[:index] + ordered[index + 1:]
+            assert _median_without(ordered, index) == pytest.approx(
+                statistics.median(others)
+            )
+    assert _median_without([0.1], 0) is None
+
+
+def test_lap_matrix_merges_cells():
+    """Ensure laps of the same test, lap name and column share a cell"""
+    matrix = LapMatrix()
+    matrix.add(make_watch(query=0.1), "test_a", "mod")
+    matrix.add(make_watch(query=0.3), "test_a", "mod")
+    cell = matrix.cells[("test_a", "query")]["mod"]
+    assert cell.count == 2
+    assert cell.max == 0.3
+
+
+def test_lap_matrix_csv(tmp_path):
+    """Ensure every cell is written with its ratio to the row median"""
+    assert LapMatrix().write_csv(tmp_path / "empty.csv") is None
+    path = make_matrix().write_csv(tmp_path / "out" / "matrix.csv")
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 13
+    assert list(rows[0]) == [
+        "test", "lap_name", "column", "count", "median", "mean", "max",
+        "row_median", "ratio"
+    ]
+    slow = next(x for x in rows if x["column"] == "test_table_slow")
+    assert float(slow["ratio"]) > 30
+
+
+def test_lap_matrix_keys():
+    """Ensure the parametrization goes to the column, not to the test name
+    """
+    cls = type("TestTable", (), {})
+    item = SimpleNamespace(
+        name="test_count[prd]",
+        originalname="test_count",
+        cls=cls,
+        module=SimpleNamespace(__name__="test_orders"),
+        callspec=SimpleNamespace(id="prd"),
+    )
+    assert lap_matrix_keys(item) == (
+        "TestTable.test_count", "test_orders[prd]"
+    )
+    item = SimpleNamespace(
+        name="test_count", cls=None, module=SimpleNamespace(__name__="m")
+    )
+    assert lap_matrix_keys(item) == ("test_count", "m")
@@ -0,0 +1,107 @@
+import tracemalloc
+
+import pytest
+
+from pytest_baseline.helpers import lap_memory
+from pytest_baseline.helpers.lap_memory import LapMemoryTracker
+from pytest_baseline.helpers.timer_laps import LapList, LapWatch
+
+MIB = 1024 * 1024
+
+
+def test_lap_memory_deltas_and_peak():
+    """Ensure laps record the change in traced memory and the peak, and
+    tracemalloc is stopped when the tracker started it
+    """
+    assert not tracemalloc.is_tracing()
+    watch = LapWatch("memory")
+    watch.attach_memory_tracker(LapMemoryTracker(top_laps=2))
+    data = bytearray(4 * MIB)
+    watch.lap("allocate")
+    temporary = bytearray(8 * MIB)
+    del temporary
+    watch.lap("temporary")
+    del data
+    watch.lap("free")
+    watch.close_memory_tracker()
+    assert not tracemalloc.is_tracing()
+
+    allocate, temporary, free = watch.laps
+    assert allocate.mem_delta == pytest.approx(4 * MIB, rel=0.05)
+    assert allocate.mem_peak >= 4 * MIB
+    assert abs(temporary.mem_delta) < 0.05 * MIB
+    assert temporary.mem_peak >= 8 * MIB
+    assert free.mem_delta == pytest.approx(-4 * MIB, rel=0.05)
+
+    heaviest = watch.memory_tracker.heaviest_laps()
+    assert [x[1] for x in heaviest] == ["allocate", "temporary"]
+    assert "test_lap_memory.py" in heaviest[0][2][0][0]
+    report = watch.report()
+    print(report)
+    assert "Mem Delta" in report
+    assert "Top allocation sites of lap 'allocate' (4.00 MiB):" in report
+
+
+def test_lap_memory_peak_without_reset_peak(monkeypatch):
+    """Ensure the lap peak falls back to the traced memory when
+    `tracemalloc.reset_peak` is missing (Python 3.8)
+    """
+    monkeypatch.setattr(lap_memory, "HAS_RESET_PEAK", False)
+    monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    watch = LapWatch("memory")
+    watch.attach_memory_tracker(LapMemoryTracker(top_laps=0))
+    data = bytearray(4 * MIB)
+    watch.lap("allocate")
+    temporary = bytearray(8 * MIB)
+    del temporary
+    watch.lap("temporary")
+    temporary = bytearray(MIB)
+    del temporary
+    watch.lap("below peak")
+    watch.close_memory_tracker()
+    del data
+    allocate, temporary, below_peak = watch.laps
+    assert allocate.mem_peak >= 4 * MIB
+    assert temporary.mem_peak >= 12 * MIB
+    # a lower bound, the peak of an earlier lap was not exceeded
+    assert 4 * MIB <= below_peak.mem_peak < 5 * MIB
+
+
+def test_lap_memory_without_snapshots():
+    """Ensure `top_laps=0` only measures deltas and keeps tracing that was
+    already started
+    """
+    tracemalloc.start()
+    try:
+        watch = LapWatch("memory")
+        watch.attach_memory_tracker(LapMemoryTracker(top_laps=0))
+        data = bytearray(MIB)
+        watch.lap("allocate")
+        watch.close_memory_tracker()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    del data
+    assert watch.laps[0].mem_delta >= MIB
+    assert watch.memory_tracker.heaviest_laps() == []
+    assert "Top allocation sites" not in watch.report()
+
+
+def test_LapList_memory_columns():
+    """Ensure memory columns are only added once a lap has memory, earlier
+    laps show `--`
+    """
+    laps = LapList()
+    laps.add(0.1, 0.1, "first")
+    assert not laps.has_memory
+    assert "Mem Delta" not in str(laps)
+    laps.add(0.3, 0.2, "second", mem_delta=-2048, mem_peak=4096)
+    assert laps.has_memory
+    assert laps[0].mem_delta is None
+    assert laps[1].mem_delta == -2048
+    assert laps[1].mem_peak == 4096
+    output = str(laps)
+    print(output)
+    assert "| Mem Delta | Mem Peak |" in output
+    assert "| -2.00 KiB | 4.00 KiB |" in output
+    assert laps[1:][0].mem_peak == 4096
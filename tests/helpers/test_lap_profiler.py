@@ -0,0 +1,115 @@
+import pstats
+import threading
+import time
+
+import pytest
+
+from pytest_baseline.helpers.lap_profiler import (
+    CProfileLapProfiler,
+    LapProfiler,
+    SamplingLapProfiler,
+    safe_file_name,
+)
+from pytest_baseline.helpers.timer_laps import LapWatch
+
+
+def fibonacci(n: int) -> int:
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_cprofile_lap_profiler(tmp_path):
+    """Ensure each lap name gets its own profile, repeated laps are added
+    together and the profiles are dumped as pstats files
+    """
+    watch = LapWatch("profiled")
+    watch.attach_profiler(CProfileLapProfiler(top=5))
+    for _ in range(2):
+        fibonacci(10)
+        watch.lap("fib")
+        sorted(range(1000), reverse=True)
+        watch.lap("sort")
+    watch.close_profiler()
+    profiler = watch.profiler
+    assert profiler.lap_names == ["fib", "sort"]
+    fib_rows = profiler.top_functions("fib")
+    assert len(fib_rows) <= 5
+    fib_row = next(x for x in fib_rows if x[0].startswith("fibonacci "))
+    # 177 calls of fibonacci(10), twice
+    assert fib_row[1] == 354
+    assert not any(
+        x[0].startswith("fibonacci ") for x in profiler.top_functions("sort")
+    )
+
+    paths = profiler.dump(tmp_path, safe_file_name("tests/a.py::test[1]"))
+    assert [x.name for x in paths] == [
+        "tests_a.py_test_1-000-fib.pstats",
+        "tests_a.py_test_1-001-sort.pstats",
+    ]
+    loaded = pstats.Stats(str(paths[0]))
+    assert any(x[2] == "fibonacci" for x in loaded.stats)
+
+    report = watch.report()
+    print(report)
+    assert "Profile of lap 'fib' (cprofile)" in report
+    assert "Lap profiles written to:" in report
+
+
+def test_cprofile_ignores_other_threads():
+    """Ensure laps from other threads do not restart the profile"""
+    profiler = CProfileLapProfiler()
+    watch = LapWatch("threads")
+    watch.attach_profiler(profiler)
+    thread = threading.Thread(target=watch.lap, args=("other",))
+    thread.start()
+    thread.join()
+    fibonacci(5)
+    watch.lap("main")
+    watch.close_profiler()
+    assert profiler.lap_names == ["main"]
+
+
+def test_sampling_lap_profiler(tmp_path):
+    """Ensure the sampler attributes samples to laps, starting the stacks
+    at the root function
+    """
+    profiler = SamplingLapProfiler(
+        interval=0.001, root_code=test_sampling_lap_profiler.__code__
+    )
+    watch = LapWatch("sampled")
+    watch.attach_profiler(profiler)
+    busy_wait(0.05)
+    watch.lap("busy")
+    watch.close_profiler()
+    assert profiler.lap_names == ["busy"]
+    stacks = profiler.stacks["busy"]
+    assert sum(stacks.values()) > 0
+    assert all(x[0][2] == "test_sampling_lap_profiler" for x in stacks)
+    names = [x[0].split(" ")[0] for x in profiler.top_functions("busy")]
+    # both are in every sample, so they tie on cumulative time
+    assert set(names[:2]) == {"test_sampling_lap_profiler", "busy_wait"}
+    folded = profiler.folded("busy")
+    assert "test_sampling_lap_profiler (test_lap_profiler.py:" in folded
+    paths = profiler.dump(tmp_path, "test")
+    assert paths[0].name == "test-000-busy.folded"
+    assert "Profile of lap 'busy' (sample)" in watch.report()
+
+
+def test_lap_profiler_is_abstract():
+    """Ensure a profiler missing a method fails when it is created"""
+    class LapOnlyProfiler(LapProfiler):
+        def start(self) -> None:
+            pass
+
+        def lap(self, lap_name: str) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        LapProfiler()
+    with pytest.raises(TypeError, match="close"):
+        LapOnlyProfiler()
@@ -0,0 +1,153 @@
+import random
+import statistics
+
+import pytest
+
+from pytest_baseline.helpers.lap_stats import (LapStats, LapThroughput,
+                                               lap_stats_table,
+                                               lap_throughput_table)
+
+
+def test_lap_stats_exact_values():
+    """Ensure count, sum, min, max, mean and std are exact"""
+    values = [random.uniform(0.001, 2) for _ in range(1000)]
+    stats = LapStats()
+    for value in values:
+        stats.add(value)
+    assert stats.count == len(values)
+    assert stats.total == pytest.approx(sum(values))
+    assert stats.min == min(values)
+    assert stats.max == max(values)
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.std == pytest.approx(statistics.pstdev(values))
+
+
+@pytest.mark.parametrize("percent", [0, 50, 95, 99, 100])
+def test_lap_stats_percentile_relative_accuracy(percent):
+    """Ensure percentile estimates are within the relative accuracy"""
+    values = sorted(random.expovariate(1000) for _ in range(10000))
+    stats = LapStats(relative_accuracy=0.01)
+    for value in values:
+        stats.add(value)
+    expected = values[int(percent / 100 * (len(values) - 1))]
+    assert stats.percentile(percent) == pytest.approx(expected, rel=0.0201)
+
+
+def test_lap_stats_constant_memory():
+    """Ensure the number of buckets does not grow with the number of
+    values
+    """
+    stats = LapStats()
+    for _ in range(50000):
+        stats.add(random.uniform(0.5, 1.0))
+    assert len(stats._buckets) < 40
+
+
+def test_lap_stats_empty_and_zero():
+    """Ensure empty stats and zero values are handled"""
+    stats = LapStats()
+    assert stats.percentile(50) is None
+    assert stats.histogram() == []
+    assert stats.std == 0.0
+    stats.add(0.0)
+    assert stats.percentile(50) == 0.0
+    assert stats.histogram(2) == [(0.0, 0.0, 1), (0.0, 0.0, 0)]
+    with pytest.raises(ValueError):
+        stats.percentile(101)
+    with pytest.raises(ValueError):
+        LapStats(relative_accuracy=1)
+
+
+def test_lap_stats_merge():
+    """Ensure merged stats equal stats of all the values"""
+    values = [random.uniform(0.001, 2) for _ in range(500)]
+    first, second, combined = LapStats(), LapStats(), LapStats()
+    for index, value in enumerate(values):
+        (first if index % 2 else second).add(value)
+        combined.add(value)
+    first.merge(second)
+    assert first.count == combined.count
+    assert first.mean == pytest.approx(combined.mean)
+    assert first.std == pytest.approx(combined.std)
+    assert first.percentile(95) == combined.percentile(95)
+    with pytest.raises(ValueError):
+        first.merge(LapStats(relative_accuracy=0.05))
+
+
+def test_lap_stats_add_many():
+    """Ensure adding a batch equals adding each value, also on top of
+    values already added
+    """
+    values = [random.choice([1e-7, 2.5e-7, 0.0, 0.01]) for _ in range(300)]
+    values += [random.uniform(0.001, 2) for _ in range(300)]
+    batched, single = LapStats(), LapStats()
+    batched.add(0.5)
+    batched.add_many(values)
+    batched.add_many([])
+    for value in [0.5] + values:
+        single.add(value)
+    assert batched.count == single.count
+    assert batched.total == pytest.approx(single.total)
+    assert batched.mean == pytest.approx(single.mean)
+    assert batched.std == pytest.approx(single.std)
+    assert (batched.min, batched.max) == (single.min, single.max)
+    for percent in (0, 25, 50, 99, 100):
+        assert batched.percentile(percent) == single.percentile(percent)
+
+
+def test_lap_stats_histogram():
+    """Ensure the histogram covers min to max and counts every value"""
+    stats = LapStats()
+    for value in [0.1, 0.2, 0.2, 0.9, 1.0]:
+        stats.add(value)
+    histogram = stats.histogram(3)
+    assert len(histogram) == 3
+    assert histogram[0][0] == 0.1
+    assert histogram[-1][1] == pytest.approx(1.0)
+    assert [x[2] for x in histogram] == [3, 0, 2]
+    output = stats.histogram_str(3)
+    print(output)
+    assert "###" in output
+    for bins in (0, -1):
+        with pytest.raises(ValueError):
+            stats.histogram(bins)
+        with pytest.raises(ValueError):
+            LapStats().histogram(bins)
+
+
+def test_lap_stats_table():
+    """Ensure a row is generated for each non empty stats"""
+    stats = LapStats()
+    stats.add(0.5)
+    output = lap_stats_table({"query": stats, "empty": LapStats()})
+    print(output)
+    assert "query" in output
+    assert "empty" not in output
+    assert "p99" in output
+
+
+def test_lap_throughput():
+    """Ensure rates are weighted by lap time and only count the laps that
+    recorded that work
+    """
+    throughput = LapThroughput()
+    assert not throughput
+    assert throughput.items_per_sec is None
+    throughput.add(1.0, items=100)
+    throughput.add(3.0, items=100, nbytes=3000)
+    throughput.add(5.0)
+    assert throughput
+    assert throughput.items_per_sec == 50
+    assert throughput.bytes_per_sec == 1000
+    other = LapThroughput()
+    other.add(1.0, nbytes=1000)
+    throughput.merge(other)
+    assert throughput.items_per_sec == 50
+    assert throughput.bytes_per_sec == 1000
+
+    output = lap_throughput_table(
+        {"parse": throughput, "empty": LapThroughput()}
+    )
+    print(output)
+    assert "| parse |   200 | 50.00 items/s | 3.91 KiB | 1000 B/s |" in output
+    assert "empty" not in output
@@ -0,0 +1,121 @@
+import gc
+import os
+
+import pytest
+
+from pytest_baseline.helpers.perf_env import (
+    NoiseReduction,
+    cpu_frequencies,
+    parse_cpu_list,
+)
+from pytest_baseline.helpers.timer_laps import LapWatch
+
+
+def test_parse_cpu_list():
+    """Ensure `taskset` style CPU lists are parsed"""
+    assert parse_cpu_list("0") == {0}
+    assert parse_cpu_list("0-3,6") == {0, 1, 2, 3, 6}
+    assert parse_cpu_list(" 2, 1 ,") == {1, 2}
+    with pytest.raises(ValueError):
+        parse_cpu_list(",")
+
+
+def test_cpu_frequencies_from_cpuinfo(tmp_path, monkeypatch):
+    """Ensure `/proc/cpuinfo` is read when cpufreq is not available"""
+    cpuinfo = tmp_path / "cpuinfo"
+    cpuinfo.write_text(
+        "processor\t: 0\ncpu MHz\t\t: 2100.000\n\n"
+        "processor\t: 1\ncpu MHz\t\t: 1800.500\n"
+    )
+    monkeypatch.setattr(
+        "pytest_baseline.helpers.perf_env.CPUFREQ_PATH",
+        str(tmp_path / "missing{cpu}")
+    )
+    monkeypatch.setattr(
+        "pytest_baseline.helpers.perf_env.CPUINFO_PATH", str(cpuinfo)
+    )
+    assert cpu_frequencies() == {0: 2100.0, 1: 1800.5}
+    assert cpu_frequencies([1]) == {1: 1800.5}
+
+    (tmp_path / "missing1").write_text("2400000\n")
+    assert cpu_frequencies([1]) == {1: 2400.0}
+
+
+def test_noise_reduction_restores_state():
+    """Ensure the GC and the CPU affinity are restored on exit and the
+    environment is recorded
+    """
+    assert gc.isenabled()
+    can_pin = hasattr(os, "sched_getaffinity")
+    affinity = os.sched_getaffinity(0) if can_pin else None
+    with NoiseReduction() as noise_reduction:
+        assert not gc.isenabled()
+        if can_pin:
+            assert os.sched_getaffinity(0) == {min(affinity)}
+    assert gc.isenabled()
+    if can_pin:
+        assert os.sched_getaffinity(0) == affinity
+    environment = noise_reduction.environment
+    assert environment["pinned_cpus"] == (
+        [min(affinity)] if can_pin else None
+    )
+    assert "load_average_end" in environment
+    report = noise_reduction.report()
+    print(report)
+    assert report.startswith("Noise reduction: cyclic GC disabled")
+    assert "  at start: load average " in report
+    assert "  at end: load average " in report
+
+    gc.disable()
+    try:
+        with NoiseReduction():
+            pass
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_setaffinity"), reason="CPU pinning not supported"
+)
+def test_noise_reduction_invalid_cpus(monkeypatch):
+    """Ensure CPUs the process cannot run on are refused before the GC is
+    disabled, and a failure after disabling it restores the GC and the CPU
+    affinity
+    """
+    affinity = os.sched_getaffinity(0)
+    with pytest.raises(ValueError, match="Cannot pin to CPUs 4096"):
+        with NoiseReduction(cpus={4096}):
+            pass
+    assert gc.isenabled()
+    assert os.sched_getaffinity(0) == affinity
+
+    def broken(*args):
+        raise OSError("no load average")
+
+    monkeypatch.setattr(
+        "pytest_baseline.helpers.perf_env.load_average", broken
+    )
+    with pytest.raises(OSError):
+        with NoiseReduction():
+            pass
+    assert gc.isenabled()
+    assert os.sched_getaffinity(0) == affinity
+
+
+def test_lap_watch_collects_between_laps():
+    """Ensure laps collect garbage out of the timed region when noise
+    reduction is attached and the report shows the environment
+    """
+    watch = LapWatch("perf")
+    with NoiseReduction() as noise_reduction:
+        watch.attach_noise_reduction(noise_reduction)
+        collections = gc.get_stats()[2]["collections"]
+        cycle = []
+        cycle.append(cycle)
+        del cycle
+        watch.lap("work")
+        assert gc.get_stats()[2]["collections"] == collections + 1
+        assert not watch.is_paused
+    assert watch.laps[0].lap_time == watch.laps[0].total_time
+    assert "Noise reduction: cyclic GC disabled" in watch.report()
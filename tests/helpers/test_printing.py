@@ -1,17 +1,31 @@
+import gc
+import json
+import weakref
 from datetime import datetime
 from random import randint
 from types import GeneratorType
 
 import pytest
 
-from pytest_baseline.helpers.printing import (block_center_str,
-                                              center_dict_str,
+from pytest_baseline.helpers.printing import (SLOW_ATTRIBUTES,
+                                              CustomEncoder,
+                                              SlowAttributes,
+                                              block_center_str,
+                                              bytes_to_str, center_dict_str,
                                               date_time_sentence_str,
                                               date_time_sentence_utc_str,
                                               date_time_str, date_time_utc_str,
                                               dir_str_of_object,
-                                              ellipsis_print, generate_table,
-                                              generate_table_iter, secs_to_str,
+                                              ellipsis_print,
+                                              generate_list_count_table,
+                                              generate_table,
+                                              generate_table_iter,
+                                              json_dump_iter, json_dumps,
+                                              list_compare_iter,
+                                              list_compare_printout,
+                                              rate_to_str,
+                                              secs_to_str, table_formatter,
+                                              TableFormatter,
                                               today_stamp_utc,
                                               yesterday_datetime,
                                               yesterday_stamp_utc)
@@ -139,6 +153,134 @@ def test_dir_str_of_object_bad_str_magic_method():
     )
 
 
+class LazyObj:
+    evaluations = 0
+
+    def __init__(self):
+        self.rows = list(range(10_000))
+        self.name = "lazy"
+
+    @property
+    def lazy_rows(self):
+        LazyObj.evaluations += 1
+        return self.rows
+
+    @property
+    def broken(self):
+        raise RuntimeError("no connection")
+
+    def method(self):
+        pass
+
+    def __repr__(self):
+        return "<LazyObj " + "x" * 10_000 + ">"
+
+
+def test_dir_str_of_object_evaluates_once():
+    """Ensure every attribute is evaluated once"""
+    LazyObj.evaluations = 0
+    dir_str_of_object(LazyObj(), filter_keys=["broken"])
+    assert LazyObj.evaluations == 1
+
+
+def test_dir_str_of_object_bounded():
+    """Ensure bounded dumps limit the size of values without building them
+    and print errors
+    """
+    dir_str = dir_str_of_object(LazyObj(), max_len=40, bounded=True)
+    print(dir_str)
+    lines = {
+        x.split(" : ")[0].strip("."): x.split(" : ")[1]
+        for x in dir_str.split(NL) if " : " in x
+    }
+    assert lines["rows"] == "[0, 1, 2, 3, 4, 5, ...]"
+    assert lines["name"] == "lazy"
+    assert lines["broken"] == "<RuntimeError raised: no connection>"
+    assert lines["method"] == "<bound method LazyObj.method>"
+    assert set(lines) == {
+        x.split(" : ")[0].strip(".")
+        for x in dir_str_of_object(
+            LazyObj(), filter_keys=["broken"]
+        ).split(NL) if " : " in x
+    } | {"broken"}
+
+
+def test_dir_str_of_object_bounded_time_limits():
+    """Ensure no attribute is evaluated past the dump time limit, and slow
+    attributes are not evaluated by later dumps of the type
+    """
+    class SlowObj:
+        calls = 0
+
+        @property
+        def slow(self):
+            SlowObj.calls += 1
+            return "slow"
+
+    dir_str = dir_str_of_object(SlowObj(), bounded=True, time_limit=-1)
+    assert ".slow : <not evaluated, dump time limit of" in dir_str
+    assert SlowObj.calls == 0
+
+    dir_str = dir_str_of_object(
+        SlowObj(), bounded=True, attribute_time_limit=-1
+    )
+    assert ".slow : slow" in dir_str
+    dir_str = dir_str_of_object(SlowObj(), bounded=True)
+    assert ".slow : <not evaluated, took" in dir_str
+    assert SlowObj.calls == 1
+    SLOW_ATTRIBUTES.reset()
+    dir_str = dir_str_of_object(SlowObj(), bounded=True)
+    assert ".slow : slow" in dir_str
+
+
+def test_slow_attributes():
+    """Ensure slow attributes are bounded, oldest forgotten first, and do not
+    keep their type alive
+    """
+    slow = SlowAttributes(max_size=2)
+    types = [type(f"Obj{x}", (), {}) for x in range(3)]
+    for cls in types:
+        slow.add(cls, "rows", 1.0)
+    assert len(slow) == 2
+    assert slow.get(types[0], "rows") is None
+    assert slow.get(types[2], "rows") == 1.0
+    assert slow.get(types[2], "other") is None
+
+    cls_ref = weakref.ref(types[2])
+    dir_str_of_object(types[2](), bounded=True)
+    del types, cls
+    gc.collect()
+    assert cls_ref() is None
+    slow.reset()
+    assert len(slow) == 0
+
+
+def test_dir_str_of_object_bounded_values():
+    """Ensure bytes, large integers and container subclasses are limited
+    before their whole string is built
+    """
+    class Rows(list):
+        pass
+
+    class Obj:
+        data = b"x" * 100
+        small = 12
+        huge = 1 << 20_000
+        rows = Rows(range(1000))
+        flag = True
+
+    dir_str = dir_str_of_object(Obj(), max_len=40, bounded=True)
+    lines = {
+        x.split(" : ")[0].strip("."): x.split(" : ")[1]
+        for x in dir_str.split(NL) if " : " in x
+    }
+    assert lines["data"] == repr(b"x" * 100)[0:40]
+    assert lines["small"] == "12"
+    assert lines["huge"] == "<int of 20,001 bits>"
+    assert lines["rows"] == "[0, 1, 2, 3, 4, 5, ...]"
+    assert lines["flag"] == "True"
+
+
 @pytest.mark.parametrize(
     "input_str, input_len",
     [
@@ -303,6 +445,82 @@ def test_center_dict_str_parameters_indent():
     assert all([x.startswith(" " * indent_len) for x in output.split("\n")])
 
 
+class CountedStr:
+    calls = 0
+
+    def __str__(self):
+        CountedStr.calls += 1
+        return "counted"
+
+
+def test_center_dict_str_nested_rendered_once():
+    """Ensure nested dictionaries are laid out once per indentation instead of
+    twice per level, so every value is converted to a string once
+    """
+    data = {"leaf": CountedStr()}
+    for depth in range(12):
+        data = {"depth": depth, "child": data}
+    CountedStr.calls = 0
+    output = center_dict_str(data)
+    assert CountedStr.calls == 1
+    lines = output.split(NL)
+    assert lines[0] == "depth : 11"
+    assert lines[-1].strip() == "child : leaf : counted"
+
+
+def test_center_dict_str_limits():
+    """Ensure deep dictionaries and the keys past `max_items` are elided"""
+    data = {
+        "a": {"b": {"c": 1}},
+        "z": 2,
+        "y": 3,
+        "x": 4,
+    }
+    assert center_dict_str(data, max_depth=1, max_items=2) == NL.join([
+        "  a : b : {... 1 keys}",
+        "  z : 2",
+        "... : 2 more keys",
+    ])
+    assert center_dict_str(data, max_depth=0).split(NL)[0] == (
+        "a : {... 1 keys}"
+    )
+    with pytest.raises(ValueError):
+        center_dict_str(data, max_items=0)
+
+
+class CountedRepr:
+    calls = 0
+
+    def __repr__(self):
+        CountedRepr.calls += 1
+        return "counted"
+
+    __str__ = __repr__
+
+
+def test_center_dict_str_limits_bound_the_work():
+    """Ensure the values of elided sub dictionaries and keys are never
+    converted to strings, only what is printed is
+    """
+    leaf = {"leaf": CountedRepr(), "rows": [CountedRepr()] * 1000}
+    data = {
+        f"key{index}": {"depth": index, "child": leaf}
+        for index in range(10_000)
+    }
+    for depth in range(50):
+        data = {"depth": depth, "child": data}
+    CountedRepr.calls = 0
+    output = center_dict_str(data, max_depth=3, max_items=5)
+    assert CountedRepr.calls == 0
+    assert len(output.split(NL)) == 5
+    assert output.split(NL)[-1].endswith("{... 2 keys}")
+
+    data = {f"key{index}": leaf for index in range(10_000)}
+    output = center_dict_str(data, max_depth=0, max_items=5)
+    assert CountedRepr.calls == 0
+    assert output.split(NL)[-1] == " ... : 9,995 more keys"
+
+
 def test_block_center_str_default():
     """Ensure default basic functionality works"""
     block_str = "\n".join([
@@ -413,6 +631,9 @@ def test_yesterday_datetime():
     (60, "1m 00.000s"),
     (36000, "10h 00m 00.000s"),
     (3599.9999, "1h 00m 00.000s"),
+    (0.0009999, "999.900µs"),
+    (0.000012345, "12.345µs"),
+    (0.0000005, "500ns"),
 ])
 def test_secs_to_str(input, expected):
     """Ensure `secs_to_str` function rounds, parses and outputs correctly"""
@@ -421,6 +642,32 @@ def test_secs_to_str(input, expected):
     assert output == expected
 
 
+@pytest.mark.parametrize("input, expected", [
+    (0, "0 B"),
+    (512, "512 B"),
+    (-1023, "-1023 B"),
+    (1536, "1.50 KiB"),
+    (-3.25 * 1024 ** 2, "-3.25 MiB"),
+    (5 * 1024 ** 3, "5.00 GiB"),
+    (2048 * 1024 ** 3, "2048.00 GiB"),
+])
+def test_bytes_to_str(input, expected):
+    """Ensure `bytes_to_str` picks the binary unit and keeps the sign"""
+    assert bytes_to_str(input) == expected
+
+
+@pytest.mark.parametrize("input, unit, expected", [
+    (None, "items", "--"),
+    (2.5, "items", "2.50 items/s"),
+    (12345.6, "items", "12,346 items/s"),
+    (12345.6, "rows", "12,346 rows/s"),
+    (1.5 * 1024 ** 2, "B", "1.50 MiB/s"),
+])
+def test_rate_to_str(input, unit, expected):
+    """Ensure `rate_to_str` formats items and bytes per second"""
+    assert rate_to_str(input, unit) == expected
+
+
 def test_generate_table():
     """Ensure that `generate_table` function passes everything on to
     `generate_table_iter` function
@@ -564,3 +811,309 @@ def test_generate_table_iter_jusification_list():
         "|       2 |    a    | ✗            |",
         "|_________|_________|______________|"
     ]) == output
+
+
+def test_table_formatter():
+    """Ensure the compiled lines match the formats of `generate_table_iter`
+    and formatters of the same layout are shared
+    """
+    formatter = TableFormatter([3, 5], ["<", ">"])
+    assert formatter.top == "._____________."
+    assert formatter.header(["A", "B"]) == "|  A  |   B   |"
+    assert formatter.divider == "|-----+-------|"
+    assert formatter.row(["a", "b"]) == "| a   |     b |"
+    assert formatter.row(["{x}", "{0}"]) == "| {x} |   {0} |"
+    assert formatter.row(["long", "b"]) == "| long |     b |"
+    assert formatter.bottom == "|_____|_______|"
+
+    formatter = TableFormatter([2, 2], ["^", "^"], border=False)
+    assert formatter.top is None and formatter.bottom is None
+    assert formatter.divider == "---+---"
+    assert formatter.row(["a", "b"]) == "a  | b "
+
+    with pytest.raises(TypeError):
+        TableFormatter([1, 2], ["<"])
+
+    assert table_formatter((1, 2), ("<", "<")) is table_formatter(
+        (1, 2), ("<", "<")
+    )
+    list(generate_table_iter(["ab", "c"], [["a", "b"]]))
+    assert table_formatter((2, 1), ("^", "^"), True) is table_formatter(
+        (2, 1), ("^", "^"), True
+    )
+
+
+def test_generate_table_iter_streaming():
+    """Ensure a generator can be streamed with widths from a sample or from
+    the caller, and the output matches the list output when the sample
+    covers every row
+    """
+    input_hdr = ["index", "A", "B"]
+    input_data = [
+        [0, "a", "y"],
+        [1, "hello", "Multi\nLine"],
+        "break",
+        [2, "a", "n"],
+    ]
+    expected = list(generate_table_iter(input_hdr, input_data,
+                                        use_checks=True))
+    streamed = generate_table_iter(
+        input_hdr, (x for x in input_data), use_checks=True, sample_size=10
+    )
+    assert list(streamed) == expected
+    assert input_data[0][2] == "y"
+
+    # Rows after the sample overflow their column
+    output = list(generate_table_iter(
+        ["A"], iter([["a"], ["longer"]]), border=False, sample_size=1
+    ))
+    assert output == ["A", "-", "a", "longer"]
+
+    # Caller supplied widths are a minimum, no row is read ahead
+    output = list(generate_table_iter(
+        None, iter([["a", "b"]]), border=False, justification="<",
+        widths=[3, 1]
+    ))
+    assert output == ["a   | b"]
+
+    with pytest.raises(TypeError):
+        list(generate_table_iter(["A"], iter([["a"]])))
+    with pytest.raises(TypeError):
+        list(generate_table_iter(["A"], [["a"]], widths=[1, 2]))
+    with pytest.raises(TypeError):
+        list(generate_table_iter(["A"], iter([["a", "b"]]), sample_size=1))
+
+
+def test_generate_table_max_rows():
+    """Ensure only the first and last rows are printed around the count and
+    numeric summary of the omitted rows, for sequences and iterators
+    """
+    rows = [[f"r{x}", x, x * 1.5, x % 2 == 0] for x in range(10)]
+    expected = NL.join([
+        ".___________________________________.",
+        "| Name |    N    |    F     | Even  |",
+        "|------+---------+----------+-------|",
+        "|  r0  |    0    |   0.0    | True  |",
+        "|  r1  |    1    |   1.5    | False |",
+        "|------+---------+----------+-------|",
+        "|      ... 6 rows omitted ...       |",
+        "|      | count 6 | count 6  |       |",
+        "|      |  min 2  |  min 3   |       |",
+        "|      |  max 7  | max 10.5 |       |",
+        "|------+---------+----------+-------|",
+        "|  r8  |    8    |   12.0   | True  |",
+        "|  r9  |    9    |   13.5   | False |",
+        "|______|_________|__________|_______|",
+    ])
+    headers = ["Name", "N", "F", "Even"]
+    assert generate_table(headers, rows, max_rows=4) == expected
+    assert generate_table(headers, iter(rows), max_rows=4) == expected
+    assert generate_table(headers, rows, max_rows=10) == generate_table(
+        headers, rows
+    )
+
+    # The omitted rows line widens the table, a single row has no tail
+    output = generate_table(
+        ["A"], (["a"] for _ in range(3)), max_rows=1,
+        summarize_omitted=False
+    ).split(NL)
+    print(NL.join(output))
+    assert output[3] == "|           a            |"
+    assert output[5] == "| ... 2 rows omitted ... |"
+    assert len(output) == 7
+
+    assert "... 1 row omitted ..." in generate_table(
+        None, [["a"], ["b"], ["c"]], max_rows=2
+    )
+    with pytest.raises(ValueError):
+        generate_table(["A"], [["a"]], max_rows=0)
+
+
+def test_generate_list_count_table():
+    """Ensure values of any iterable are counted, most common first then
+    first seen first
+    """
+    values = ["b", "a", "c", "a", "b", "a"]
+    assert generate_list_count_table(iter(values), border=False) == NL.join([
+        "Value | Count",
+        "------+------",
+        "  a   |   3  ",
+        "  b   |   2  ",
+        "  c   |   1  ",
+    ])
+
+
+def test_generate_list_count_table_top_n():
+    """Ensure only the most common values are listed with the others summed
+    """
+    values = (x % 4 if x % 2 else 0 for x in range(10))
+    output = generate_list_count_table(values, top_n=1, border=False)
+    assert output.split(NL) == [
+        "     Value       | Count",
+        "-----------------+------",
+        "       0         |   5  ",
+        "-----------------+------",
+        "Other (2 values) |   5  ",
+    ]
+    output = generate_list_count_table([1, 2], top_n=5, border=False)
+    assert "Other" not in output
+
+
+def test_generate_list_count_table_approximate():
+    """Ensure the approximate counts have their error and the evicted
+    counts are summed in the Other row
+    """
+    values = ["a", "a", "a", "a", "b", "b", "c", "d"]
+    output = generate_list_count_table(
+        values, max_counters=2, border=False, other_label="Rest"
+    )
+    assert output.split(NL) == [
+        "Value | Count | Error",
+        "------+-------+------",
+        "  a   |   4   |   0  ",
+        "  d   |   4   |   3  ",
+    ]
+    output = generate_list_count_table(
+        values, top_n=1, max_counters=2, border=False
+    )
+    assert output.split(NL)[-1] == "Other (1+ values) |   4   |      "
+    output = generate_list_count_table(
+        values, top_n=1, max_counters=4, border=False
+    )
+    assert output.split(NL)[-1] == "Other (3 values) |   4   |      "
+    output = generate_list_count_table(
+        ["a", "b", "c"], top_n=1, max_counters=2, border=False
+    )
+    assert output.split(NL)[-3:] == [
+        "        c         |   2   |   1  ",
+        "------------------+-------+------",
+        "Other (1+ values) |   1   |      ",
+    ]
+
+
+def test_list_compare_printout():
+    """Ensure every item of the lists has a row with `--` in the lists that
+    do not contain it
+    """
+    output = list_compare_printout(
+        ["A", "B", "C"], ["x", "y"], ["y", "z"], ["longer", "y"]
+    )
+    assert output == NL.join([
+        ".__________________.",
+        "| A  | B  |   C    |",
+        "|----+----+--------|",
+        "| -- | -- | longer |",
+        "| x  | -- |   --   |",
+        "| y  | y  |   y    |",
+        "| -- | z  |   --   |",
+        "|____|____|________|",
+    ])
+
+
+def test_list_compare_iter_differences_only():
+    """Ensure only the differing items are listed, followed by the counts
+    """
+    output = list(list_compare_iter(
+        ["Dev", "Prod"], iter(range(10)), {x for x in range(12) if x != 3},
+        differences_only=True, sample=2
+    ))
+    assert output == [
+        ".____________.",
+        "| Dev | Prod |",
+        "|-----+------|",
+        "|  3  |  --  |",
+        "| --  |  10  |",
+        "|_____|______|",
+        "12 items, 9 in every list, 3 differ",
+        "  missing from 'Dev': 2",
+        "  missing from 'Prod': 1",
+        "Showing the first 2 of 3 rows",
+    ]
+
+
+class StrOnly:
+    def __str__(self):
+        return "str only"
+
+
+JSON_DATA = {
+    "list": [1, 2.5, None, True, "caf\u00e9 \U0001f600"],
+    "nested": {"set": {1}, "object": StrOnly(), 3: "int key"},
+    "big": 2 ** 70,
+    "tuple": (1, "x"),
+    "empty": {},
+}
+
+
+@pytest.mark.parametrize("backend", [None, "json"])
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"ensure_ascii": False},
+    {"indent": None, "separators": (",", ":")},
+    {"indent": 4},
+    {"sort_keys": True},
+])
+def test_json_dumps_backends(backend, kwargs):
+    """Ensure every backend matches the json module with `CustomEncoder`,
+    in one string and in chunks
+    """
+    if kwargs.get("sort_keys"):
+        data = {"b": [2], "a": {"d": StrOnly(), "c": 1}}
+    else:
+        data = JSON_DATA
+    expected = json.dumps(data, **{"indent": 2, **kwargs}, cls=CustomEncoder)
+    assert json_dumps(data, backend=backend, **kwargs) == expected
+    for chunk_size in (1, 16, 65536):
+        chunks = list(json_dump_iter(
+            data, backend=backend, chunk_size=chunk_size, **kwargs
+        ))
+        assert "".join(chunks) == expected
+        assert all(len(x) >= chunk_size for x in chunks[:-1])
+
+
+@pytest.mark.parametrize("backend", [None, "json"])
+@pytest.mark.parametrize("kwargs", [
+    {}, {"indent": None, "separators": (",", ":")}
+])
+def test_json_dump_iter_nested(backend, kwargs):
+    """Ensure large nested containers are serialized entry by entry with the
+    layout of the whole document
+    """
+    data = {
+        "records": {
+            f"record-{x}": {"id": x, "tags": [x, StrOnly()]}
+            for x in range(70)
+        },
+        "rows": [[x, {"a": [x] * 70}] for x in range(70)],
+        "small": {"a": 1},
+    }
+    expected = json.dumps(data, **{"indent": 2, **kwargs}, cls=CustomEncoder)
+    chunks = list(json_dump_iter(
+        data, backend=backend, chunk_size=1, **kwargs
+    ))
+    assert "".join(chunks) == expected
+    assert len(chunks) > 140
+
+
+def test_json_dump_iter_scalars():
+    for value in ([], {}, 1, "x", [1], {"a": 1}):
+        assert "".join(json_dump_iter(value)) == json.dumps(value, indent=2)
+
+
+def test_custom_encoder_subclass():
+    """Ensure encoders based on `CustomEncoder` can serialize their own
+    types and fall back to `str()` for the rest
+    """
+    class DateMixin(json.JSONEncoder):
+        def default(self, obj):
+            if isinstance(obj, datetime):
+                return obj.strftime("%Y")
+            return super().default(obj)
+
+    class DateEncoder(CustomEncoder, DateMixin):
+        pass
+
+    value = [datetime(2020, 1, 1), StrOnly()]
+    assert json_dumps(value, cls=DateEncoder, indent=None) == (
+        '["2020", "str only"]'
+    )
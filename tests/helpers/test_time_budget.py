@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pytest_baseline.helpers.time_budget import (time_budget_action,
+                                                 time_budget_breaches,
+                                                 time_budget_for,
+                                                 unchecked_lap_budgets)
+from pytest_baseline.helpers.timer_laps import LapList, LapWatch
+
+
+def make_item(env: str = "DEFAULT", name: str = "test_a[1]", cls=None,
+              **module_vars):
+    """Minimal stand-in for a test item with module variables"""
+    return SimpleNamespace(
+        module=SimpleNamespace(__name__="test_module", **module_vars),
+        config=SimpleNamespace(getoption=lambda *args: env),
+        name=name,
+        originalname=name.split("[")[0],
+        cls=cls,
+    )
+
+
+def test_time_budget_for_names_and_env():
+    """Ensure budgets are found by number, by test name (with or without
+    the class and parametrization) and by environment
+    """
+    assert time_budget_for(make_item()) is None
+    assert time_budget_for(make_item(time_budget=2)) == 2
+    assert time_budget_for(
+        make_item(env="prd", time_budget=2, time_budget_PRD=0.5)
+    ) == 0.5
+    assert time_budget_for(make_item(time_budget={"test_a": 3})) == 3
+    assert time_budget_for(
+        make_item(time_budget={"test_a": 3, "test_a[1]": 1})
+    ) == 1
+    cls = type("TestCls", (), {})
+    assert time_budget_for(make_item(
+        cls=cls, time_budget={"test_a": 3, "TestCls.test_a": 4}
+    )) == 4
+    assert time_budget_for(make_item(time_budget={"test_b": 3})) is None
+
+
+def test_time_budget_action():
+    """Ensure the module variable overrides the default action"""
+    assert time_budget_action(make_item(), "fail") == "fail"
+    item = make_item(budget_action="xfail")
+    assert time_budget_action(item, "fail") == "xfail"
+    with pytest.raises(ValueError):
+        time_budget_action(make_item(budget_action="explode"), "fail")
+
+
+def test_time_budget_breaches():
+    """Ensure test and lap breaches are reported with the number of laps
+    over budget
+    """
+    watch = LapWatch("budget")
+    watch.laps = LapList()
+    for lap_time in (0.1, 0.7, 0.9):
+        watch.laps.add(lap_time, lap_time, "query")
+    watch.laps.add(1.0, 5.0, "parse")
+    item = make_item(
+        env="dev", time_budget=1, lap_budget_data={"query": 0.5, "x": 0}
+    )
+    assert time_budget_breaches(item, 0.5, watch) == [
+        "Lap 'query' took 0.900s, over its time budget of 0.500s in env "
+        "'dev' (2 of 3 laps over)"
+    ]
+    assert time_budget_breaches(item, 1.5) == [
+        "Test took 1.500s, over its time budget of 1.000s in env 'dev'"
+    ]
+
+
+def test_time_budget_throughput_breaches():
+    """Ensure lap budgets can be a minimum throughput"""
+    watch = LapWatch("budget")
+    watch.laps = LapList()
+    watch.laps.add(1.0, 1.0, "load", items=500, nbytes=4096)
+    watch.laps.add(3.0, 2.0, "load", items=500)
+    item = make_item(lap_budget_data={
+        "load": {"items_per_sec": 400, "bytes_per_sec": 1024, "seconds": 5}
+    })
+    assert time_budget_breaches(item, 3.0, watch) == [
+        "Lap 'load' processed 333 items/s, under its throughput budget of "
+        "400 items/s in env 'DEFAULT'"
+    ]
+    item = make_item(lap_budget_data={"load": {"rows_per_sec": 1}})
+    with pytest.raises(ValueError):
+        time_budget_breaches(item, 3.0, watch)
+
+
+def test_unchecked_lap_budgets():
+    """Ensure lap budgets are reported as unchecked when laps are not kept"""
+    item = make_item(lap_budget_data={"query": 0.5, "load": 1})
+    watch = LapWatch("budget")
+    watch.laps.add(1.0, 1.0, "query")
+    assert unchecked_lap_budgets(item, watch) == []
+    watch = LapWatch("budget", keep_laps=False)
+    assert unchecked_lap_budgets(item, watch) == []
+    watch.laps.add(1.0, 1.0, "query")
+    assert unchecked_lap_budgets(item, watch) == ["load", "query"]
+    assert unchecked_lap_budgets(make_item(), watch) == []
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pytest_baseline.helpers import timer as timer_module
+from pytest_baseline.helpers.timer import (TIMING_REGISTRY, Timer,
+                                           TimingRegistry, clockit,
+                                           current_task_key, running_task)
+
+
+class FakeClock:
+    """Clock returning a controlled count of nanoseconds"""
+    def __init__(self, start: int = 0):
+        self.now = start
+
+    def __call__(self) -> int:
+        return self.now
+
+
+def test_timer_default_clock_is_perf_counter():
+    """Ensure the default clock is the monotonic high resolution clock"""
+    timer = Timer()
+    assert timer._clock is time.perf_counter_ns
+    assert timer.cpu_elapsed is None
+
+
+def test_timer_custom_clock_elapsed():
+    """Ensure a passed clock is used and nanoseconds are converted to
+    seconds
+    """
+    clock = FakeClock(1_000)
+    timer = Timer(clock=clock)
+    clock.now += 1_500
+    assert timer.elapsed_ns == 1_500
+    assert timer.elapsed == 1.5e-6
+    assert str(timer) == "1.5e-06 sec"
+
+
+def test_timer_stop_freezes_wall_and_cpu():
+    """Ensure stop() freezes both the wall and cpu clock readings"""
+    clock = FakeClock()
+    cpu_clock = FakeClock()
+    timer = Timer(clock=clock, cpu_clock=cpu_clock)
+    clock.now += 2_000_000_000
+    cpu_clock.now += 500_000_000
+    assert timer.stop() == 2.0
+    clock.now += 1
+    cpu_clock.now += 1
+    assert timer.elapsed == 2.0
+    assert timer.cpu_elapsed == 0.5
+    assert timer.stop_time == 2.0
+
+
+def test_clockit_records_calls(capsys):
+    """Ensure `clockit` records calls into the registry without printing,
+    also when the function raises
+    """
+    registry = TimingRegistry()
+
+    @clockit(registry=registry)
+    def add(a, b):
+        if a is None:
+            raise ValueError("a")
+        return a + b
+
+    assert add(1, 2) == 3
+    assert add(3, 4) == 7
+    with pytest.raises(ValueError):
+        add(None, 1)
+    assert capsys.readouterr().out == ""
+    assert add.__name__ == "add"
+    stats = registry.stats()
+    name = f"{__name__}.test_clockit_records_calls.<locals>.add"
+    assert list(stats) == [name]
+    assert stats[name].count == 3
+    assert 0 < stats[name].min <= stats[name].max
+    assert stats[name].percentile(50) is not None
+    assert name.split(".")[-1] in registry.report()
+
+    registry.reset()
+    assert registry.stats() == {}
+    add(1, 1)
+    assert registry.stats()[name].count == 1
+
+
+def test_clockit_default_registry_and_name():
+    """Ensure bare `@clockit` uses the process wide registry and `name`
+    overrides the function name
+    """
+    @clockit
+    def bare():
+        pass
+
+    @clockit(name="custom")
+    def named():
+        pass
+
+    bare()
+    named()
+    stats = TIMING_REGISTRY.stats()
+    assert stats["custom"].count == 1
+    assert bare.timing.name.endswith("<locals>.bare")
+    TIMING_REGISTRY.reset()
+
+
+def test_clockit_folds_buffer(monkeypatch):
+    """Ensure call times are folded into the statistics once the buffer is
+    full, from several threads
+    """
+    monkeypatch.setattr(timer_module, "FOLD_SIZE", 10)
+    registry = TimingRegistry()
+
+    @clockit(registry=registry, name="hot")
+    def hot():
+        pass
+
+    def work():
+        for _ in range(1_000):
+            hot()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(hot.timing.buffer) < 10 + 4
+    assert registry.stats()["hot"].count == 4_000
+
+
+def test_timing_registry_merge():
+    """Ensure merging registries adds their statistics"""
+    session, test = TimingRegistry(), TimingRegistry()
+    test.timing("a").buffer.extend([1_000, 3_000])
+    session.merge(test)
+    session.merge(test)
+    stats = session.stats()["a"]
+    assert stats.count == 4
+    assert stats.total == pytest.approx(8e-6)
+    assert stats.max == pytest.approx(3e-6)
+
+
+def test_timer_pause_resume():
+    """Ensure paused time is excluded from wall and CPU elapsed time"""
+    clock, cpu_clock = FakeClock(), FakeClock()
+    timer = Timer(clock=clock, cpu_clock=cpu_clock)
+    clock.now += 1_000
+    cpu_clock.now += 100
+    timer.pause()
+    assert timer.is_paused
+    clock.now += 5_000
+    cpu_clock.now += 500
+    assert timer.elapsed_ns == 1_000
+    timer.pause()
+    timer.resume()
+    assert not timer.is_paused
+    clock.now += 2_000
+    cpu_clock.now += 200
+    assert timer.elapsed_ns == 3_000
+    assert timer.cpu_elapsed == 300e-9
+    with timer.paused():
+        clock.now += 10_000
+    assert timer.elapsed_ns == 3_000
+
+
+def test_timer_stop_while_paused():
+    """Ensure stopping a paused timer does not count the pause"""
+    clock = FakeClock()
+    timer = Timer(clock=clock)
+    clock.now += 1_000
+    timer.pause()
+    clock.now += 4_000
+    assert timer.stop() == 1e-6
+    clock.now += 4_000
+    timer.pause()
+    assert not timer.is_paused
+    assert timer.elapsed_ns == 1_000
+
+
+def test_current_task_key():
+    """Ensure tasks and threads are identified by identity, not by name"""
+    assert running_task() is None
+    assert current_task_key() == threading.get_ident()
+
+    async def key():
+        await asyncio.sleep(0)
+        assert running_task() is asyncio.current_task()
+        return current_task_key()
+
+    async def main():
+        tasks = [asyncio.create_task(key(), name="same") for _ in range(2)]
+        return tasks, await asyncio.gather(*tasks)
+
+    tasks, keys = asyncio.run(main())
+    assert keys == [id(x) for x in tasks]
+    assert running_task() is None
@@ -1,5 +1,18 @@
+import asyncio
+import gc
+import threading
+
 import pytest
 
+from pytest_baseline.helpers.timer import FOLD_SIZE
+from pytest_baseline.helpers.timer_laps import (
+    LapList,
+    LapWatch,
+    TimerLap,
+    _merge_intervals,
+    calibrate_lap_overhead,
+)
+
 
 @pytest.mark.skip(reason="Test not written yet")
 def test_TimerLap():
@@ -14,3 +27,530 @@ def test_LapWatch():
 @pytest.mark.skip(reason="Test not written yet")
 def test_LapList():
     pass
+
+
+class FakeClock:
+    """Clock returning a controlled count of nanoseconds"""
+    def __init__(self, start: int = 0):
+        self.now = start
+
+    def __call__(self) -> int:
+        return self.now
+
+
+def test_LapWatch_lap_times():
+    """Ensure lap times are the difference between consecutive laps"""
+    clock = FakeClock()
+    watch = LapWatch("test", clock=clock)
+    clock.now += 250_000
+    assert watch.lap("first") == 250e-6
+    clock.now += 750
+    assert watch.lap("second", tag="b") == pytest.approx(750e-9)
+    assert [x.lap_name for x in watch.laps] == ["first", "second"]
+    assert watch.laps[-1].total_time == pytest.approx(250.75e-6)
+    assert watch.laps[-1].cpu_time is None
+
+
+def test_LapWatch_cpu_time():
+    """Ensure CPU time is recorded per lap when a cpu clock is passed and
+    rendered as an extra column
+    """
+    clock = FakeClock()
+    cpu_clock = FakeClock()
+    watch = LapWatch("test", clock=clock, cpu_clock=cpu_clock)
+    clock.now += 2_000_000
+    cpu_clock.now += 1_000_000
+    watch.lap("first")
+    clock.now += 2_000_000
+    cpu_clock.now += 500
+    watch.lap("second")
+    assert [x.cpu_time for x in watch.laps] == pytest.approx([1e-3, 500e-9])
+    output = str(watch.laps)
+    print(output)
+    assert "CPU Time" in output
+    assert "500ns" in output
+
+
+def test_LapList_sub_millisecond_units():
+    """Ensure sub millisecond laps are not rounded to zero in the table"""
+    clock = FakeClock()
+    watch = LapWatch("test", clock=clock)
+    clock.now += 12_345
+    watch.lap("fast")
+    output = str(watch.laps)
+    print(output)
+    assert "12.345µs" in output
+    assert "CPU Time" not in output
+
+
+def make_lap_list() -> LapList:
+    return LapList([
+        TimerLap(1.0, 1.0, "a", "x"),
+        TimerLap(3.0, 2.0, "b", "y"),
+        TimerLap(3.5, 0.5, "a", None),
+        TimerLap(7.5, 4.0, "c", "x"),
+    ])
+
+
+def test_LapList_table_max_rows():
+    """Ensure the capped lap table prints the first and last laps"""
+    clock = FakeClock()
+    watch = LapWatch("test", clock=clock)
+    for index in range(7):
+        clock.now += 1_000_000
+        watch.lap(f"lap {index}")
+    assert watch.laps.table() == str(watch.laps)
+    assert watch.laps.table(max_rows=7) == str(watch.laps)
+    output = watch.laps.table(max_rows=3)
+    print(output)
+    assert "lap 1" in output and "lap 6" in output
+    assert "lap 2" not in output and "lap 5" not in output
+    assert "... 4 rows omitted ..." in output
+    assert "count" not in output
+
+
+def test_LapList_indexing_and_iteration():
+    """Ensure the array backed LapList keeps the list like API"""
+    laps = make_lap_list()
+    assert len(laps) == 4
+    assert laps[0] == TimerLap(1.0, 1.0, "a", "x")
+    assert laps[-1].lap_name == "c"
+    assert laps[-1][0] == 7.5
+    assert isinstance(laps[1:3], LapList)
+    assert [x.lap_name for x in laps[1:3]] == ["b", "a"]
+    assert list(laps) == [
+        TimerLap(1.0, 1.0, "a", "x"),
+        TimerLap(3.0, 2.0, "b", "y"),
+        TimerLap(3.5, 0.5, "a", None),
+        TimerLap(7.5, 4.0, "c", "x"),
+    ]
+    with pytest.raises(IndexError):
+        laps[4]
+    assert LapWatch.lap_tuple is TimerLap
+
+
+def test_LapList_interned_keys():
+    """Ensure laps with equal names, tags and tasks share one interned key,
+    whether or not the strings are the same objects
+    """
+    laps = LapList()
+    for index in range(6):
+        laps.add(index, 1.0, "".join(["que", "ry"]), ["a", "b"][index % 2])
+    laps.add(6.0, 1.0, "query", "a", task="worker")
+    assert len(laps._keys) == 3
+    assert [x.tag for x in laps] == ["a", "b", "a", "b", "a", "b", "a"]
+    assert [x.task for x in laps][-2:] == [None, "worker"]
+    assert list(laps.group_by_name()) == ["query"]
+    assert [x.total_time for x in laps.filter(["b"])] == [1, 3, 5]
+
+
+def test_LapList_aggregates():
+    """Ensure aggregates are computed from the stored lap times"""
+    laps = make_lap_list()
+    assert laps.sum() == 7.5
+    assert laps.average() == 1.875
+    assert laps.max().lap_name == "c"
+    assert laps.min().lap_name == "a"
+    assert LapList().average() == 0
+
+
+def test_LapList_filter_exclude():
+    """Ensure filter and exclude keep lap order and only matching tags"""
+    laps = make_lap_list()
+    assert [x.lap_name for x in laps.filter(["x"])] == ["a", "c"]
+    assert [x.lap_name for x in laps.filter(["x", None])] == ["a", "a", "c"]
+    assert [x.lap_name for x in laps.exclude(["x"])] == ["b", "a"]
+    assert len(laps.filter()) == 0
+    assert len(laps.exclude()) == 4
+    assert len(laps.filter(["not a tag"])) == 0
+
+
+def test_LapList_to_numpy():
+    """Ensure the numpy export is a view of the stored lap times"""
+    np = pytest.importorskip("numpy")
+    laps = make_lap_list()
+    arrays = laps.to_numpy()
+    assert np.array_equal(arrays["lap_time"], [1.0, 2.0, 0.5, 4.0])
+    assert np.isnan(arrays["cpu_time"]).all()
+
+
+def test_LapList_streaming_statistics():
+    """Ensure statistics are maintained overall and by tag"""
+    laps = make_lap_list()
+    assert laps.stats.count == 4
+    assert laps.std() == pytest.approx(1.3404, rel=1e-3)
+    assert laps.percentile(100) == 4.0
+    assert sum(x[2] for x in laps.histogram(4)) == 4
+    by_tag = laps.group_by_tag()
+    assert set(by_tag.keys()) == {"x", "y", None}
+    assert by_tag["x"].count == 2
+    assert by_tag["x"].total == 5.0
+    summary = laps.summary()
+    print(summary)
+    assert "Tag: x" in summary
+    assert "All Laps" in summary
+
+
+def test_LapList_statistics_folded_lazily():
+    """Ensure lap times are folded into the statistics when they are read,
+    and every `FOLD_SIZE` laps when laps are not kept
+    """
+    laps = make_lap_list()
+    assert laps.stats.count == 4
+    laps.add(8.0, 0.5, "d", "y")
+    assert laps._folded == 4
+    assert laps.group_by_tag()["y"].count == 2
+    assert laps.stats.count == 5 and laps._folded == 5
+
+    laps = LapList(keep_laps=False)
+    for index in range(FOLD_SIZE + 10):
+        laps.add(float(index), 1.0, "lap", "odd" if index % 2 else "even")
+    assert len(laps._pending_key) == 10
+    assert laps.stats.count == FOLD_SIZE + 10
+    assert len(laps._pending_key) == 0
+    assert laps.group_by_tag()["odd"].count == (FOLD_SIZE + 10) // 2
+    assert laps.sum() == FOLD_SIZE + 10
+
+
+def test_LapWatch_keep_laps_false():
+    """Ensure only statistics are kept when `keep_laps` is False"""
+    clock = FakeClock()
+    watch = LapWatch("soak", clock=clock, keep_laps=False)
+    for _ in range(1000):
+        clock.now += 1_000_000
+        watch.lap(tag="loop")
+    assert len(watch.laps) == 0
+    assert watch.laps.count == 1000
+    assert watch.laps.sum() == pytest.approx(1.0)
+    assert watch.laps.average() == pytest.approx(0.001)
+    assert watch.laps.group_by_tag()["loop"].count == 1000
+    clock.now += 1_000_000
+    assert watch.lap() == pytest.approx(0.001)
+    assert "All Laps" in str(watch)
+    watch.reset_laps()
+    assert watch.laps.keep_laps is False
+
+
+def test_LapWatch_report():
+    """Ensure the report lap table only includes the first and last laps
+    when there are more than `max_laps`
+    """
+    clock = FakeClock()
+    watch = LapWatch("report", clock=clock)
+    for _ in range(5):
+        clock.now += 1_000
+        watch.lap("step")
+    report = watch.report(max_laps=5)
+    print(report)
+    assert "All Laps" in report
+    assert "Lap Name" in report
+    assert "omitted" not in report
+    report = watch.report(max_laps=4)
+    assert "Lap Name" in report
+    assert "... 1 row omitted ..." in report
+    assert report.count("|   step   |") == 4
+
+
+def test_LapWatch_spans():
+    """Ensure spans recorded on the LapWatch are included in its output and
+    report, without empty lap tables when no laps were recorded
+    """
+    clock = FakeClock()
+    watch = LapWatch("spans", clock=clock)
+
+    @watch.timed("parse")
+    def parse():
+        clock.now += 1_000
+
+    with watch.span("query"):
+        parse()
+    report = watch.report()
+    print(report)
+    assert "|   parse |" in report
+    assert "Lap Name" not in report
+    assert "Lap Name" not in str(watch)
+    watch.lap("done")
+    assert "Lap Name" in watch.report()
+    assert "Span" in str(watch)
+
+
+def test_LapWatch_threads():
+    """Ensure laps from several threads are timed against the previous lap
+    of the same thread and are all recorded
+    """
+    watch = LapWatch("threads")
+    barrier = threading.Barrier(4)
+
+    def work():
+        watch.start_task()
+        barrier.wait()
+        for index in range(250):
+            watch.lap(f"step {index}", tag="work")
+
+    threads = [
+        threading.Thread(target=work, name=f"worker-{x}") for x in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert watch.laps.count == 1000
+    timelines = watch.laps.timelines()
+    assert sorted(timelines) == [f"worker-{x}" for x in range(4)]
+    for task, laps in timelines.items():
+        assert len(laps) == 250
+        assert {x.task for x in laps} == {task}
+        totals = [x.total_time for x in laps]
+        assert totals == sorted(totals)
+        for previous, lap in zip(laps, laps[1:]):
+            assert lap.lap_time == pytest.approx(
+                lap.total_time - previous.total_time
+            )
+
+
+def test_LapWatch_asyncio_tasks():
+    """Ensure laps are attributed to the asyncio task recording them"""
+    clock = FakeClock()
+    watch = LapWatch("tasks", clock=clock)
+
+    async def fetch(delay_ns: int):
+        watch.start_task()
+        for _ in range(2):
+            await asyncio.sleep(0)
+            clock.now += delay_ns
+            watch.lap("fetch")
+
+    async def main():
+        await asyncio.gather(
+            asyncio.create_task(fetch(1_000), name="fast"),
+            asyncio.create_task(fetch(5_000), name="slow"),
+        )
+
+    asyncio.run(main())
+    timelines = watch.laps.timelines()
+    assert sorted(timelines) == ["fast", "slow"]
+    # the clock is shared, each lap includes the other task's step
+    assert [x.lap_time for x in timelines["fast"]] == pytest.approx(
+        [1e-6, 6e-6]
+    )
+    assert [x.lap_time for x in timelines["slow"]] == pytest.approx(
+        [6e-6, 6e-6]
+    )
+    report = watch.report()
+    print(report)
+    assert "Max concurrent laps: 2" in report
+    assert "critical path: slow" in report
+
+
+def test_LapWatch_same_named_threads_and_tasks():
+    """Ensure threads and tasks sharing a name keep their own last lap and
+    are labelled apart, and a task created after a finished one starts from
+    the start of the LapWatch
+    """
+    clock = FakeClock()
+    watch = LapWatch("names", clock=clock)
+    barrier = threading.Barrier(2)
+
+    def work(delay_ns: int):
+        barrier.wait()
+        for _ in range(3):
+            with watch._lock:
+                clock.now += delay_ns
+            watch.lap("step")
+            barrier.wait()
+
+    threads = [
+        threading.Thread(target=work, args=(x,), name="worker")
+        for x in (1_000, 2_000)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    timelines = watch.laps.timelines()
+    assert sorted(timelines) == ["worker", "worker #2"]
+    for laps in timelines.values():
+        assert sum(x.lap_time for x in laps) == pytest.approx(
+            laps[-1].total_time
+        )
+
+    async def fetch():
+        clock.now += 1_000
+        watch.lap("fetch")
+
+    async def main():
+        for _ in range(2):
+            await asyncio.create_task(fetch(), name="fetch")
+
+    watch.reset_laps()
+    asyncio.run(main())
+    assert [x.task for x in watch.laps] == ["fetch", "fetch #2"]
+    assert [x.lap_time for x in watch.laps] == [
+        x.total_time for x in watch.laps
+    ]
+
+
+def test_merge_intervals():
+    """Ensure the wall time, overlap and max concurrency of intervals"""
+    assert _merge_intervals([]) == (0.0, 0.0, 0)
+    wall, overlap, max_active = _merge_intervals(
+        [(0.0, 4.0), (1.0, 2.0), (1.5, 3.0), (6.0, 7.0)]
+    )
+    assert wall == pytest.approx(5.0)
+    assert overlap == pytest.approx(2.0)
+    assert max_active == 3
+    # intervals touching at one point do not overlap
+    assert _merge_intervals([(0.0, 1.0), (1.0, 2.0)]) == (2.0, 0.0, 1)
+
+
+def test_LapWatch_single_task_report():
+    """Ensure the concurrency summary is only shown for several tasks"""
+    clock = FakeClock()
+    watch = LapWatch("single", clock=clock)
+    clock.now += 1_000
+    watch.lap("one")
+    assert "Max concurrent laps" not in watch.report()
+
+
+def test_LapWatch_bench_calibration():
+    """Ensure `bench` calibrates the calls per round, discards the warm-up
+    and records each round as a lap with the time per call
+    """
+    clock = FakeClock()
+    watch = LapWatch("bench", clock=clock)
+    calls = []
+
+    def work(value, step=1_000):
+        calls.append(value)
+        clock.now += step
+
+    stats = watch.bench(work, "x", rounds=3, warmup=2, min_time=10e-6)
+    # calibration 1 + 2 + 5 + 10 calls, then 2 warm-up and 3 rounds of 10
+    assert len(calls) == 18 + 50
+    assert set(calls) == {"x"}
+    assert stats.count == 3
+    assert stats.mean == pytest.approx(1e-6)
+    assert len(watch.laps) == 3
+    assert {x.lap_name for x in watch.laps} == {
+        "test_LapWatch_bench_calibration.<locals>.work"
+    }
+    assert watch.laps.group_by_tag()["bench"].count == 3
+    assert watch.laps[-1].total_time == pytest.approx(68e-6)
+
+    # the next lap is measured from the end of the benchmark
+    clock.now += 5_000
+    assert watch.lap("after") == pytest.approx(5e-6)
+
+
+def test_LapWatch_bench_options():
+    """Ensure `number`, `lap_name`, `tag` and keyword arguments are used and
+    the garbage collector is restored
+    """
+    clock = FakeClock()
+    cpu_clock = FakeClock()
+    watch = LapWatch("bench", clock=clock, cpu_clock=cpu_clock)
+
+    def work(step):
+        clock.now += step
+        cpu_clock.now += step // 2
+
+    stats = watch.bench(
+        work, step=2_000, number=4, rounds=2, warmup=0, lap_name="work",
+        tag="micro"
+    )
+    assert stats.count == 2
+    assert [x.lap_time for x in watch.laps] == pytest.approx([2e-6, 2e-6])
+    assert [x.cpu_time for x in watch.laps] == pytest.approx([1e-6, 1e-6])
+    assert [x.tag for x in watch.laps] == ["micro", "micro"]
+    assert gc.isenabled()
+    with pytest.raises(ValueError):
+        watch.bench(work, 1, rounds=0)
+
+
+def test_LapWatch_bench_real_clock():
+    """Ensure a benchmark with the real clock gives sensible statistics"""
+    watch = LapWatch("bench")
+    stats = watch.bench(sorted, range(100), rounds=5, min_time=0.001)
+    assert stats.count == 5
+    assert 0 < stats.min <= stats.percentile(50) <= stats.max < 0.001
+    assert "bench" in watch.report()
+
+
+def test_LapWatch_pause_excludes_setup():
+    """Ensure time spent paused is left out of the lap times"""
+    clock = FakeClock()
+    watch = LapWatch("paused", clock=clock)
+    with watch.paused():
+        clock.now += 50_000
+    clock.now += 1_000
+    assert watch.lap("work") == pytest.approx(1e-6)
+    watch.pause()
+    clock.now += 50_000
+    watch.resume()
+    clock.now += 2_000
+    assert watch.lap("more work") == pytest.approx(2e-6)
+    assert watch.laps[-1].total_time == pytest.approx(3e-6)
+
+
+def test_LapWatch_overhead_subtraction():
+    """Ensure the overhead is subtracted from lap times, never below zero,
+    and totals are kept
+    """
+    clock = FakeClock()
+    watch = LapWatch("overhead", clock=clock, overhead=500e-9)
+    clock.now += 2_000
+    assert watch.lap("a") == pytest.approx(1.5e-6)
+    clock.now += 100
+    assert watch.lap("b") == 0.0
+    assert watch.laps[-1].total_time == pytest.approx(2.1e-6)
+
+
+def test_calibrate_lap_overhead():
+    """Ensure the calibrated overhead is a small positive time"""
+    overhead = calibrate_lap_overhead(lap_count=200)
+    assert 0 < overhead < 0.001
+
+
+def test_LapWatch_lap_throughput():
+    """Ensure laps record their items and bytes, rendered as rate columns,
+    and the throughput is summarized by tag and by lap name
+    """
+    watch = LapWatch("throughput")
+    watch.lap("parse", tag="io", items=100, nbytes=2048)
+    watch.lap("check")
+    watch.lap("parse", tag="io", items=300)
+    parse = watch.laps[0]
+    assert parse.items == 100
+    assert parse.nbytes == 2048
+    assert watch.laps[1].items is None
+    assert watch.laps[2].nbytes is None
+    output = str(watch.laps)
+    print(output)
+    header = [x.strip() for x in output.splitlines()[1].split("|")]
+    assert header[4:8] == ["Items", "Items/s", "Bytes", "Bytes/s"]
+    check_row = [x.strip() for x in output.splitlines()[4].split("|")]
+    assert check_row[4:8] == ["--", "--", "--", "--"]
+
+    by_name = watch.laps.throughput_by_name()
+    assert list(by_name) == ["parse"]
+    assert by_name["parse"].items == 400
+    assert by_name["parse"].nbytes == 2048
+    by_tag = watch.laps.throughput_by_tag()
+    assert list(by_tag) == ["io"]
+    assert by_tag["io"].items_per_sec == pytest.approx(
+        400 / (watch.laps[0].lap_time + watch.laps[2].lap_time)
+    )
+    summary = watch.laps.summary()
+    print(summary)
+    assert "| Tag: io  |   400 |" in summary
+    assert "Items/s" in summary
+
+
+def test_LapList_throughput_without_laps():
+    """Ensure the throughput by tag is kept when laps are not"""
+    laps = LapList(keep_laps=False)
+    laps.add(1.0, 1.0, "load", items=10)
+    laps.add(3.0, 2.0, "load", items=20)
+    assert laps.throughput_by_name() == {}
+    assert laps.throughput_by_tag()[None].items_per_sec == 10
+    assert "10.00 items/s" in laps.summary()
@@ -0,0 +1,71 @@
+from pytest_baseline.helpers.timer_laps import LapWatch
+from pytest_baseline.helpers.timer_rollup import LapWatchRollup
+
+
+def make_watch(laps, keep_laps=True) -> LapWatch:
+    watch = LapWatch("test", keep_laps=keep_laps)
+    total = 0.0
+    for lap_time, lap_name, tag in laps:
+        total += lap_time
+        watch.laps.add(total, lap_time, lap_name, tag)
+    return watch
+
+
+def test_lap_watch_rollup_totals():
+    """Ensure laps are rolled up by name/tag, module, class and tag"""
+    rollup = LapWatchRollup(top=2)
+    rollup.add(
+        make_watch([(1.0, "query", "db"), (0.5, "parse", None)]),
+        "mod_a.py::TestCommon::test_a", "mod_a", "TestCommon"
+    )
+    rollup.add(
+        make_watch([(3.0, "query", "db")]),
+        "mod_b.py::test_b", "mod_b"
+    )
+    rollup.add(make_watch([]), "mod_b.py::test_c", "mod_b")
+    assert rollup.watch_count == 2
+    assert rollup.lap_count == 3
+    assert rollup.by_name_tag[("query", "db")].total == 4.0
+    assert rollup.by_module["mod_a"].count == 2
+    assert set(rollup.by_class.keys()) == {"TestCommon"}
+    assert rollup.by_tag["db"].total == 4.0
+    assert rollup.slowest_laps() == [
+        (3.0, "mod_b.py::test_b", "query", "db"),
+        (1.0, "mod_a.py::TestCommon::test_a", "query", "db"),
+    ]
+    titles = [x[0] for x in rollup.summary_sections()]
+    assert titles == [
+        "Slowest 2 laps",
+        "Laps by name and tag",
+        "Laps by module",
+        "Laps by common class",
+        "Total time per tag",
+    ]
+
+
+def test_lap_watch_rollup_laps_not_kept():
+    """Ensure statistics only LapWatches are still rolled up"""
+    rollup = LapWatchRollup()
+    rollup.add(
+        make_watch([(1.0, "a", "x"), (2.0, "a", "x")], keep_laps=False),
+        "mod.py::test", "mod"
+    )
+    assert rollup.lap_count == 2
+    assert rollup.by_tag["x"].total == 3.0
+    assert rollup.slowest_laps() == [
+        (2.0, "mod.py::test", "(laps not kept)", "x")
+    ]
+
+
+def test_lap_watch_rollup_empty():
+    """Ensure nothing is reported when no laps were recorded"""
+    assert LapWatchRollup().summary_sections() == []
+
+
+def test_lap_watch_rollup_disabled():
+    """Ensure no laps are aggregated when `top` is 0"""
+    rollup = LapWatchRollup(top=0)
+    rollup.add(make_watch([(1.0, "query", "db")]), "mod_a.py::test_a", "mod_a")
+    assert rollup.lap_count == 0
+    assert rollup.by_name_tag == {}
+    assert rollup.summary_sections() == []
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from pytest_baseline.helpers.timer_spans import SpanTree
+
+
+class FakeClock:
+    """Clock returning a controlled count of nanoseconds"""
+    def __init__(self, start: int = 0):
+        self.now = start
+
+    def __call__(self) -> int:
+        return self.now
+
+
+def build_tree() -> SpanTree:
+    clock = FakeClock()
+    tree = SpanTree(clock)
+
+    @tree.timed("parse")
+    def parse():
+        clock.now += 1_000_000
+
+    with tree.span("query"):
+        clock.now += 2_000_000
+        for _ in range(3):
+            with tree.span("chunk"):
+                clock.now += 500_000
+                parse()
+    with tree.span("assert"):
+        clock.now += 1_500_000
+    return tree
+
+
+def test_span_tree_times():
+    """Ensure spans nest, aggregate repeated spans and compute self and
+    child time
+    """
+    tree = build_tree()
+    query = tree.root.children["query"]
+    chunk = query.children["chunk"]
+    parse = chunk.children["parse"]
+    assert list(tree.root.children) == ["query", "assert"]
+    assert query.count == 1
+    assert query.total_time == pytest.approx(6.5e-3)
+    assert query.child_time == pytest.approx(4.5e-3)
+    assert query.self_time == pytest.approx(2e-3)
+    assert chunk.count == 3
+    assert chunk.self_time == pytest.approx(1.5e-3)
+    assert parse.count == 3
+    assert parse.self_time == pytest.approx(3e-3)
+    assert [(d, n.name) for d, n in tree.root.walk()] == [
+        (0, "query"), (1, "chunk"), (2, "parse"), (0, "assert")
+    ]
+
+
+def test_span_tree_exception_closes_span():
+    """Ensure a span is closed when the enclosed code raises"""
+    clock = FakeClock()
+    tree = SpanTree(clock)
+    with pytest.raises(ValueError):
+        with tree.span("fails"):
+            clock.now += 10
+            raise ValueError()
+    with tree.span("after"):
+        pass
+    assert list(tree.root.children) == ["fails", "after"]
+    assert tree.root.children["fails"].total_ns == 10
+
+
+def test_span_tree_timed_default_name():
+    """Ensure the decorator defaults to the function's qualified name and
+    keeps the function's metadata and return value
+    """
+    tree = SpanTree(FakeClock())
+
+    @tree.timed()
+    def helper(value):
+        """helper doc"""
+        return value * 2
+
+    assert helper(2) == 4
+    assert helper.__doc__ == "helper doc"
+    assert list(tree.root.children) == [helper.__qualname__]
+
+
+def test_span_tree_rendering():
+    """Ensure the table indents children and the icicle chart is drawn"""
+    tree = build_tree()
+    table = tree.table()
+    print(table)
+    assert "|   chunk   |" in table
+    assert "|     parse |" in table
+    assert "81.2%" in table
+    flame = tree.flame(width=16)
+    print(flame)
+    assert flame.split("\n") == [
+        "############# query (0.006s)",
+        "######### chunk (0.004s)",
+        "###### parse (0.003s)",
+        "             ### assert (0.002s)",
+    ]
+    assert not SpanTree(FakeClock())
+    assert SpanTree(FakeClock()).flame() == ""
+
+
+def test_span_tree_threads():
+    """Ensure each thread nests spans on its own stack"""
+    tree = SpanTree(FakeClock())
+    barrier = threading.Barrier(3)
+
+    def work():
+        with tree.span("request"):
+            barrier.wait()
+            for _ in range(10):
+                with tree.span("query"):
+                    pass
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert list(tree.root.children) == ["request"]
+    request = tree.root.children["request"]
+    assert request.count == 3
+    assert list(request.children) == ["query"]
+    assert request.children["query"].count == 30
+    assert tree._stacks == {}
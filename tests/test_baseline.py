@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import gc
+from pathlib import Path
+
 import pytest
 from pytest import Pytester
 
@@ -620,3 +623,492 @@ def test_module_variable_fixture_env_dependant(testdir: Pytester):
 
     # make sure that that we get a '0' exit code for the testsuite
     assert result.ret == 0
+
+
+def test_timer_fixture_cpu_time(testdir: Pytester):
+    """Ensure `--baseline-cpu-time` configures the `timer` fixture to record
+    CPU time for each lap
+    """
+    testdir.makepyfile("""
+        def test_cpu(timer):
+            timer.lap("spin")
+            assert timer.laps[0].cpu_time is not None
+            assert "CPU Time" in str(timer)
+
+        def test_no_cpu(timer):
+            timer.lap("spin")
+            assert timer.laps[0].cpu_time is None
+            assert "CPU Time" not in str(timer)
+    """)
+    result = testdir.runpytest(
+        "-v", "--baseline-cpu-time=process", "-k", "test_cpu"
+    )
+    result.stdout.fnmatch_lines(['*::test_cpu PASSED*'])
+    assert result.ret == 0
+
+    result = testdir.runpytest("-v", "-k", "test_no_cpu")
+    result.stdout.fnmatch_lines(['*::test_no_cpu PASSED*'])
+    assert result.ret == 0
+
+
+def test_timer_summary(testdir: Pytester):
+    """Ensure the laps of all `timer` fixtures are summarized at the end of
+    the session
+    """
+    testdir.makepyfile("""
+        class TestCommon:
+            def test_a(self, timer):
+                timer.lap("query", "db")
+
+        def test_b(timer):
+            timer.lap("parse")
+    """)
+    result = testdir.runpytest("-v")
+    result.stdout.fnmatch_lines([
+        "*baseline timer summary (2 laps in 2 tests)*",
+        "Slowest 10 laps:",
+        "*Laps by name and tag:",
+        "*query ?db?*",
+        "*Laps by module:",
+        "*Laps by common class:",
+        "*TestCommon*",
+        "*Total time per tag:",
+    ])
+    assert result.ret == 0
+
+
+def test_timer_summary_disabled(testdir: Pytester):
+    """Ensure `--baseline-timer-summary=0` disables the timer summary only,
+    the clockit and GC summaries are still printed
+    """
+    testdir.makepyfile("""
+        from pytest_baseline.helpers.timer import clockit
+
+        @clockit
+        def helper():
+            return 1
+
+        def test_b(timer):
+            helper()
+            timer.lap("parse")
+    """)
+    result = testdir.runpytest(
+        "-v", "--baseline-timer-summary=0", "--baseline-gc-monitor"
+    )
+    result.stdout.no_fnmatch_line("*baseline timer summary*")
+    result.stdout.fnmatch_lines([
+        "*baseline clockit summary (1 calls of 1 functions)*",
+        "Top 10 functions by total time:",
+        "*baseline GC summary*",
+    ])
+    assert result.ret == 0
+
+
+def test_timer_lap_baseline_regression(testdir: Pytester):
+    """Ensure laps are persisted per `--env` and a slower lap fails the test
+    on the next run with `--baseline-regression=fail`
+    """
+    test_file = """
+        import time
+
+        def test_query(timer):
+            time.sleep({sleep})
+            timer.lap("query")
+    """
+    testdir.makepyfile(test_file.format(sleep=0))
+    # Baselines are neither recorded nor compared by default
+    result = testdir.runpytest("-v", "--env=dev")
+    assert result.ret == 0
+    assert not list(Path(testdir.tmpdir).glob(".pytest_cache/**/dev"))
+    result = testdir.runpytest("-v", "--env=dev", "--baseline-regression=warn")
+    assert result.ret == 0
+    assert list(Path(testdir.tmpdir).glob(".pytest_cache/**/dev"))
+
+    testdir.makepyfile(test_file.format(sleep=0.05))
+    result = testdir.runpytest("-v", "--env=dev", "--baseline-regression=fail")
+    result.stdout.fnmatch_lines([
+        "*::test_query FAILED*",
+        "*Lap 'query' regressed in env 'dev'*",
+    ])
+
+    # Other environments have their own baselines
+    result = testdir.runpytest("-v", "--env=prd", "--baseline-regression=fail")
+    assert result.ret == 0
+
+    # Off by default, warn does not fail, update accepts the new numbers
+    result = testdir.runpytest("-v", "--env=dev")
+    result.stdout.no_fnmatch_line("*LapRegressionWarning*")
+    assert result.ret == 0
+    result = testdir.runpytest("-v", "--env=dev", "--baseline-regression=warn")
+    result.stdout.fnmatch_lines(["*LapRegressionWarning*"])
+    assert result.ret == 0
+    result = testdir.runpytest(
+        "-v", "--env=dev", "--baseline-regression=warn", "--baseline-update"
+    )
+    assert result.ret == 0
+    # a loose relative threshold keeps sleep jitter from failing the run
+    result = testdir.runpytest(
+        "-v", "--env=dev", "--baseline-regression=fail",
+        "--baseline-rel-threshold=1.0"
+    )
+    assert result.ret == 0
+
+
+def test_timer_profile_laps(testdir: Pytester):
+    """Ensure `--baseline-profile-laps` and the `baseline_profile` marker
+    profile the `timer` fixture laps and dump the profiles
+    """
+    testdir.makepyfile("""
+        import pytest
+
+        def work():
+            return sorted(range(10_000), reverse=True)
+
+        def test_profiled(timer):
+            work()
+            timer.lap("work")
+            assert timer.profiler.mode == "cprofile"
+            assert timer.profiler.lap_names == ["work"]
+
+        @pytest.mark.baseline_profile("sample")
+        def test_marked(timer):
+            assert timer.profiler.mode == "sample"
+
+        def test_not_profiled(timer):
+            timer.lap("work")
+    """)
+    result = testdir.runpytest(
+        "-v", "-k", "not profiled", "--baseline-regression=off"
+    )
+    result.stdout.fnmatch_lines(["*::test_marked PASSED*"])
+    assert result.ret == 0
+
+    result = testdir.runpytest(
+        "-v", "-k", "profiled and not not_profiled",
+        "--baseline-profile-laps=cprofile", "--baseline-profile-dir=profiles",
+        "--baseline-regression=off"
+    )
+    assert result.ret == 0
+    profiles = [x.basename for x in testdir.tmpdir.join("profiles").listdir()]
+    assert profiles == [
+        "test_timer_profile_laps.py_test_profiled-000-work.pstats"
+    ]
+
+    # without the option the profiles go to the pytest cache
+    result = testdir.runpytest(
+        "-v", "-k", "test_profiled", "--baseline-profile-laps=cprofile"
+    )
+    assert result.ret == 0
+    cache_dir = testdir.tmpdir.join(".pytest_cache/d/pytest_baseline_profiles")
+    assert cache_dir.check(dir=True)
+
+
+def test_timer_memory(testdir: Pytester):
+    """Ensure `--baseline-memory` records the memory delta and peak of each
+    `timer` fixture lap
+    """
+    testdir.makepyfile("""
+        def test_memory(timer):
+            data = bytearray(1024 * 1024)
+            timer.lap("allocate")
+            assert timer.laps[0].mem_delta >= 1024 * 1024
+            assert "Mem Peak" in str(timer)
+            assert "Top allocation sites" in timer.report()
+
+        def test_no_memory(timer):
+            timer.lap("allocate")
+            assert timer.laps[0].mem_delta is None
+    """)
+    result = testdir.runpytest("-v", "--baseline-memory", "-k", "test_memory")
+    result.stdout.fnmatch_lines(["*::test_memory PASSED*"])
+    assert result.ret == 0
+    result = testdir.runpytest("-v", "-k", "test_no_memory")
+    result.stdout.fnmatch_lines(["*::test_no_memory PASSED*"])
+    assert result.ret == 0
+
+
+def test_clockit_summary(testdir: Pytester):
+    """Ensure functions decorated with `clockit` are summarized at the end
+    of the session and the registry is reset after every test
+    """
+    testdir.makepyfile("""
+        from pytest_baseline.helpers.timer import TIMING_REGISTRY, clockit
+
+        @clockit
+        def helper():
+            return 1
+
+        def test_a():
+            for _ in range(10):
+                helper()
+
+        def test_b():
+            assert TIMING_REGISTRY.stats() == {}
+            helper()
+    """)
+    result = testdir.runpytest("-v")
+    result.stdout.fnmatch_lines([
+        "*baseline clockit summary (11 calls of 1 functions)*",
+        "Top 10 functions by total time:",
+        "*| test_clockit_summary.helper |*11*|*",
+    ])
+    assert result.ret == 0
+
+
+def test_time_budgets(testdir: Pytester):
+    """Ensure tests and `timer` laps over their `--env` dependent module
+    configured budget fail, and the breach is added to the LapWatch findings
+    """
+    testdir.makepyfile("""
+        import time
+
+        time_budget = {"test_fast": 60, "TestSlow.test_slow": 0.0}
+        time_budget_DEV = 60
+        lap_budget_data = {"query": 0.0, "parse": 60}
+
+        def test_fast():
+            pass
+
+        class TestSlow:
+            def test_slow(self):
+                time.sleep(0.001)
+
+        def test_laps(timer):
+            time.sleep(0.001)
+            timer.lap("query")
+            timer.lap("parse")
+            timer.lap("other")
+    """)
+    result = testdir.runpytest("-v", "--baseline-regression=off")
+    result.stdout.fnmatch_lines([
+        "*::test_fast PASSED*",
+        "*::TestSlow::test_slow FAILED*",
+        "*::test_laps FAILED*",
+        "*Test took *, over its time budget of 0.000s in env 'DEFAULT'",
+        "*Lap 'query' took *, over its time budget of 0.000s in env 'DEFAULT'",
+    ])
+    result.stdout.no_fnmatch_line("*Lap 'parse'*")
+
+    # `time_budget_DEV` replaces the module wide budget
+    result = testdir.runpytest(
+        "-v", "--env=dev", "--baseline-regression=off", "-k", "slow"
+    )
+    result.stdout.fnmatch_lines(["*::TestSlow::test_slow PASSED*"])
+
+
+def test_time_budgets_laps_not_kept(testdir: Pytester):
+    """Ensure lap budgets that cannot be checked because the laps are not
+    kept issue a warning
+    """
+    testdir.makepyfile("""
+        from pytest_baseline.helpers.timer_laps import LapList
+
+        lap_budget_data = {"query": 0.0}
+
+        def test_laps(timer):
+            timer.laps = LapList(keep_laps=False)
+            timer.lap("query")
+    """)
+    result = testdir.runpytest("-v")
+    result.stdout.fnmatch_lines([
+        "*::test_laps PASSED*",
+        "*LapBudgetWarning: Lap budgets of 'query' are not checked, the "
+        "`timer` fixture laps are not kept",
+    ])
+    assert result.ret == 0
+
+
+def test_time_budgets_xfail(testdir: Pytester):
+    """Ensure `budget_action` and `--baseline-budget-action` xfail or ignore
+    tests over their budget
+    """
+    testdir.makepyfile("""
+        import time
+
+        time_budget = 0.0
+        budget_action_DEV = "xfail"
+
+        def test_slow():
+            time.sleep(0.001)
+    """)
+    result = testdir.runpytest("-v", "-rx", "--env=dev")
+    result.stdout.fnmatch_lines([
+        "*::test_slow XFAIL*",
+        "*Test took *, over its time budget of 0.000s in env 'dev'*",
+    ])
+    assert result.ret == 0
+    result = testdir.runpytest("-v", "--baseline-budget-action=xfail")
+    result.stdout.fnmatch_lines(["*::test_slow XFAIL*"])
+    result = testdir.runpytest("-v", "--baseline-budget-action=off")
+    result.stdout.fnmatch_lines(["*::test_slow PASSED*"])
+
+
+def test_timer_lap_overhead(testdir: Pytester):
+    """Ensure the lap overhead is only measured, shown in the header and
+    subtracted with `--baseline-subtract-overhead`
+    """
+    testdir.makepyfile("""
+        def test_overhead(timer, request):
+            plugin = request.config._baseline
+            if plugin.subtract_overhead:
+                assert plugin.lap_overhead > 0
+                assert timer.overhead == plugin.lap_overhead
+            else:
+                assert plugin.lap_overhead is None
+                assert timer.overhead == 0
+    """)
+    result = testdir.runpytest("-v")
+    result.stdout.fnmatch_lines(["*::test_overhead PASSED*"])
+    result.stdout.no_fnmatch_line("baseline lap overhead:*")
+    result = testdir.runpytest("-v", "--baseline-subtract-overhead")
+    result.stdout.fnmatch_lines([
+        "baseline lap overhead: * per `timer` lap, subtracted from lap times",
+        "*::test_overhead PASSED*",
+    ])
+
+
+def test_timer_baseline_perf(testdir: Pytester):
+    """Ensure `baseline_perf` tests run with the cyclic GC disabled, pinned
+    to a CPU, and the `timer` report includes the recorded environment
+    """
+    testdir.makepyfile("""
+        import gc
+        import os
+
+        import pytest
+
+        @pytest.mark.baseline_perf(cpus="0")
+        def test_perf(timer):
+            assert not gc.isenabled()
+            if hasattr(os, "sched_getaffinity"):
+                assert os.sched_getaffinity(0) == {0}
+            timer.lap("work")
+            assert timer.noise_reduction is not None
+            assert not timer.is_paused
+
+        def test_normal(timer):
+            assert gc.isenabled()
+            assert timer.noise_reduction is None
+    """)
+    result = testdir.runpytest("-v", "--baseline-regression=off")
+    result.stdout.fnmatch_lines([
+        "*::test_perf PASSED*",
+        "*::test_normal PASSED*",
+    ])
+    assert result.ret == 0
+    result = testdir.runpytest(
+        "-v", "--baseline-regression=off", "--baseline-perf",
+        "--baseline-perf-cpus=0", "-k", "test_perf"
+    )
+    assert result.ret == 0
+
+
+def test_timer_baseline_perf_invalid_cpus(testdir: Pytester):
+    """Ensure a test pinned to CPUs the process cannot run on fails without
+    leaving the cyclic GC disabled for the following tests
+    """
+    testdir.makepyfile("""
+        import gc
+
+        import pytest
+
+        @pytest.mark.baseline_perf(cpus="4096")
+        def test_a():
+            pass
+
+        def test_b():
+            assert gc.isenabled()
+    """)
+    result = testdir.runpytest("-v")
+    result.stdout.fnmatch_lines(["*::test_b PASSED*"])
+    result.assert_outcomes(passed=1, failed=1)
+
+
+def test_timer_gc_monitor(testdir: Pytester):
+    """Ensure `--baseline-gc-monitor` attributes collections to the tests
+    and `timer` laps and prints a GC summary
+    """
+    testdir.makepyfile("""
+        import gc
+
+        def test_collect(timer):
+            gc.collect()
+            timer.lap("collect")
+            assert timer.laps[0].gc_collections >= 1
+            assert "GC Pause" in str(timer)
+
+        def test_quiet():
+            pass
+    """)
+    result = testdir.runpytest("-v", "--baseline-gc-monitor")
+    result.stdout.fnmatch_lines([
+        "*::test_collect PASSED*",
+        "*baseline GC summary (* collections, * paused)*",
+        "*| Generation | Collections |*",
+        "Top 10 tests by GC pause:",
+        "*| test_timer_gc_monitor.py::test_collect *|*",
+    ])
+    assert result.ret == 0
+    # the monitor is removed at the end of the session
+    assert not any(
+        getattr(x, "__qualname__", "") == "GCMonitor._callback"
+        for x in gc.callbacks
+    )
+
+    result = testdir.runpytest("-v", "-k", "test_quiet")
+    result.stdout.no_fnmatch_line("*baseline GC summary*")
+
+
+def test_time_budgets_throughput(testdir: Pytester):
+    """Ensure `timer` laps under their throughput budget fail"""
+    testdir.makepyfile("""
+        lap_budget_data = {
+            "load": {"items_per_sec": 1e15},
+            "parse": {"items_per_sec": 1},
+        }
+
+        def test_laps(timer):
+            rows = list(range(1000))
+            timer.lap("load", items=len(rows))
+            timer.lap("parse", items=len(rows))
+            assert "Items/s" in str(timer)
+    """)
+    result = testdir.runpytest("-v", "--baseline-regression=off")
+    result.stdout.fnmatch_lines([
+        "*::test_laps FAILED*",
+        "*Lap 'load' processed * items/s, under its throughput budget of "
+        "1,000,000,000,000,000 items/s in env 'DEFAULT'",
+    ])
+    result.stdout.no_fnmatch_line("*Lap 'parse'*")
+
+
+def test_timer_lap_matrix(testdir: Pytester):
+    """Ensure a lap much slower in one parametrization than in the others is
+    reported and the matrix is written to csv
+    """
+    testdir.makepyfile("""
+        import pytest
+
+        @pytest.mark.parametrize("table", ["a", "b", "c", "d", "slow"])
+        def test_row_count(timer, table):
+            lap_time = 1.0 if table == "slow" else 0.01
+            timer.laps.add(lap_time, lap_time, "query")
+    """)
+    result = testdir.runpytest(
+        "-v", "--baseline-regression=off",
+        "--baseline-lap-matrix-csv=out/matrix.csv"
+    )
+    result.stdout.fnmatch_lines([
+        "*baseline lap matrix (1 laps x 5 modules/params)*",
+        "1 laps over 3x the median of the same lap in the other "
+        "modules/params, top 10:",
+        "*| test_row_count | query    | test_timer_lap_matrix[[]slow[]] |*",
+        "Lap matrix written to: *matrix.csv",
+    ])
+    assert result.ret == 0
+    assert testdir.tmpdir.join("out", "matrix.csv").check(file=True)
+
+    result = testdir.runpytest(
+        "-v", "--baseline-regression=off", "--baseline-lap-matrix-factor=0"
+    )
+    result.stdout.no_fnmatch_line("*baseline lap matrix*")
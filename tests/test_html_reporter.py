@@ -421,3 +421,45 @@ def test_html_report_environment(testdir: Pytester):
     env_table = f"&#34;{env}&#34"
     assert env_table in report
     assert result.ret == 0
+
+
+def test_html_report_extra_timer_summary(testdir: Pytester):
+    """Ensure the `timer` fixture extra shows the lap statistics and only
+    the first and last laps of the lap table for a large number of laps
+    """
+    testdir.makepyfile(
+        """
+        def test_something(timer):
+            for _ in range(1000):
+                timer.lap("loop")
+        """
+    )
+    result, report = run(testdir, "report.html", "-v")
+    file_path = (
+        "assets/test_html_report_extra_timer_summary.py__test_something_0_0"
+        ".txt"
+    )
+    extra_str = read_file(testdir.tmpdir.join(file_path))
+    assert "All Laps" in extra_str
+    assert "... 900 rows omitted ..." in extra_str
+    assert extra_str.count("|   loop   |") == 100
+    assert result.ret == 0
+
+
+def test_html_report_gc_columns(testdir: Pytester):
+    """Ensure `--baseline-gc-monitor` adds the GC columns to the report"""
+    testdir.makepyfile(
+        """
+        import gc
+
+        def test_something():
+            gc.collect()
+        """
+    )
+    result, report = run(testdir, "report.html", "-v", "--baseline-gc-monitor")
+    assert "GC Collections" in report
+    assert "GC Pause" in report
+    assert result.ret == 0
+
+    result, report = run(testdir, "report.html", "-v")
+    assert "GC Pause" not in report